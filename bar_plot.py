@@ -8,6 +8,10 @@ from scipy import stats
 from argparse import ArgumentParser
 import matplotlib.pyplot as plt
 
+# timing_store lives in common/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "common"))
+import timing_store
+
 np.set_printoptions(edgeitems=10, linewidth=100000)
 
 def extractMeshSizes(data):
@@ -63,6 +67,18 @@ def createDicByRomSize(data):
       dic[thisRomSize] = [data[i][2]]
   return dic
 
+def createErrDicByRomSize(summary):
+  # same as createDicByRomSize but for the error bars from the summary
+  # (mesh, rom, mean, ciLow, ciHigh, ...): value = [mean-ciLow, ciHigh-mean]
+  dic = {}
+  for i in range(summary.shape[0]):
+    thisRomSize = str(int(summary[i][1]))
+    err = [summary[i][2]-summary[i][3], summary[i][4]-summary[i][2]]
+    dic.setdefault(thisRomSize, [[], []])
+    dic[thisRomSize][0].append(err[0])
+    dic[thisRomSize][1].append(err[1])
+  return dic
+
 
 #=====================================================================
 #
@@ -160,7 +176,8 @@ def autolabel(ax, rects, ovhead):
 # this means that for both cpp and python and a given romsize,
 # we plot the bars at each meshsize
 #=====================================================================
-def plotBarSet(ax, xLoc, width, romSize, cppDic, pyDic, barColors, hatches, maxY):
+def plotBarSet(ax, xLoc, width, romSize, cppDic, pyDic, barColors, hatches, maxY,
+               cppErrDic=None, pyErrDic=None):
   cppVal = cppDic[romSize]
   diffVal= np.asarray(pyDic[romSize]) - np.asarray(cppVal)
   # compute overhead in % wrt cpp case
@@ -170,11 +187,16 @@ def plotBarSet(ax, xLoc, width, romSize, cppDic, pyDic, barColors, hatches, maxY
 
   # plot bar cpp
   leg = 'c++, n=' + str(romSize)
-  cppH = ax.bar(xLoc, cppVal, width, alpha=0.5, color=barColors['cpp'], hatch=hatches['cpp'], edgecolor='k')
+  cppErr = None if cppErrDic is None else cppErrDic[romSize]
+  cppH = ax.bar(xLoc, cppVal, width, alpha=0.5, color=barColors['cpp'], hatch=hatches['cpp'],
+                edgecolor='k', yerr=cppErr, capsize=2)
   # plot bar for the difference
   leg = 'py, n=' + str(romSize)
+  # the error bar on top of the stack is the one of python
+  pyErr = None if pyErrDic is None else pyErrDic[romSize]
   diffH = ax.bar(xLoc, diffVal, width, bottom=cppVal, alpha=0.5,
-                  color=barColors['diff'], hatch=hatches['diff'], edgecolor='k')
+                  color=barColors['diff'], hatch=hatches['diff'], edgecolor='k',
+                  yerr=pyErr, capsize=2)
   # display text for overhead as percent on top of bar
   autolabel(ax, cppH, ovhead)
 
@@ -184,7 +206,8 @@ def plotBarSet(ax, xLoc, width, romSize, cppDic, pyDic, barColors, hatches, maxY
 #  do bar plot with stacking to show the differences
 #
 #=====================================================================
-def plotBarStacked(cppDic, pyDic, meshLabels, romSizes, romSizesStr):
+def plotBarStacked(cppDic, pyDic, meshLabels, romSizes, romSizesStr,
+                   cppErrDic=None, pyErrDic=None):
   # if len(romSizes) != 3:
   #   raise Exception('The style for the bar plot currently support 3 rom sizes only')
 
@@ -217,7 +240,8 @@ def plotBarStacked(cppDic, pyDic, meshLabels, romSizes, romSizesStr):
     shift = width*it
     xLoc = [p+shift for p in pos]
     currRomSize = romSizesStr[it]
-    plotBarSet(ax, xLoc, width, currRomSize, cppDic, pyDic, colors, hatches, maxY)
+    plotBarSet(ax, xLoc, width, currRomSize, cppDic, pyDic, colors, hatches, maxY,
+               cppErrDic, pyErrDic)
     xTicksBars += [p+shift for p in pos]
     xTlabels += [romSizesStr[it] for i in range(numMeshes)]
 
@@ -261,7 +285,9 @@ def main(cppFile, pyFile, romName, barType, statType):
     raise Exception('The file {} does not exist. '.format(pyFile))
 
   # load data
-  cppData, pyData = np.loadtxt(cppFile), np.loadtxt(pyFile)
+  # either the legacy *_timings.txt or the *_timings.jsonl store
+  cppData = timing_store.loadTimingsMatrix(cppFile)
+  pyData  = timing_store.loadTimingsMatrix(pyFile)
 
   # convert from sec to milliseconds
   cppData[:,2:] *= 1000
@@ -286,8 +312,17 @@ def main(cppFile, pyFile, romName, barType, statType):
   print(romSizesStr)
 
   # compute the avg timings
-  cppDataAvg = computeTimingsStat(cppData, "c++", statType)
-  pyDataAvg  = computeTimingsStat(pyData, "py", statType)
+  cppErrDic, pyErrDic = None, None
+  if statType == "ci":
+    # mean and confidence interval from all the replicas, in milliseconds
+    cppDataAvg = timing_store.loadTimingsSummary(cppFile)
+    pyDataAvg  = timing_store.loadTimingsSummary(pyFile)
+    cppDataAvg[:, 2:6] *= 1000
+    pyDataAvg[:, 2:6] *= 1000
+    cppErrDic, pyErrDic = createErrDicByRomSize(cppDataAvg), createErrDicByRomSize(pyDataAvg)
+  else:
+    cppDataAvg = computeTimingsStat(cppData, "c++", statType)
+    pyDataAvg  = computeTimingsStat(pyData, "py", statType)
 
   # create dictionary for bar plotting
   cppDic, pyDic = createDicByRomSize(cppDataAvg), createDicByRomSize(pyDataAvg)
@@ -296,7 +331,7 @@ def main(cppFile, pyFile, romName, barType, statType):
   if barType == "default":
     plotBarRegular(cppDic, pyDic, meshLabels, romSizes, romSizesStr)
   elif barType == "stacked":
-    plotBarStacked(cppDic, pyDic, meshLabels, romSizes, romSizesStr)
+    plotBarStacked(cppDic, pyDic, meshLabels, romSizes, romSizesStr, cppErrDic, pyErrDic)
   else:
     raise Exception('Invalid choice for bar type {} '.format(barType))
   plt.show()
@@ -305,8 +340,10 @@ def main(cppFile, pyFile, romName, barType, statType):
 #////////////////////////////////////////////
 if __name__== "__main__":
   parser = ArgumentParser()
-  parser.add_argument("-cpp-file", "--cpp-file", dest="cppFile")
-  parser.add_argument("-py-file",  "--py-file", dest="pyFile")
+  parser.add_argument("-cpp-file", "--cpp-file", dest="cppFile",
+                      help = "timings of the c++ runs, .txt or .jsonl")
+  parser.add_argument("-py-file",  "--py-file", dest="pyFile",
+                      help = "timings of the python runs, .txt or .jsonl")
   parser.add_argument("-method",       "--method", dest="romName",
                       help = "The ROM method you are trying to plot: lspg or galerkin" )
   parser.add_argument("-bar-type",     "--bar-type", dest="barType",
@@ -315,7 +352,9 @@ if __name__== "__main__":
                       help = "Which statistic to compute from data: \
                               mean, gmean (geometric mean), q50 (50th percentile), \
                               worst (min of c++ and max of Python to show worst case),\
-                              best (max of c++ and min of Python to show best case)")
+                              best (max of c++ and min of Python to show best case),\
+                              ci (mean without outliers with 95% confidence interval \
+                              error bars, from all replicas of the .jsonl store)")
   args = parser.parse_args()
   main(args.cppFile, args.pyFile, args.romName, args.barType, args.statType)
 #////////////////////////////////////////////
@@ -28,6 +28,26 @@ for option; do
 	    JACOBIANTYPE=`expr "x$option" : "x-*jac-type=\(.*\)"`
 	    ;;
 
+	-backend=* | --backend=* )
+	    BACKEND=`expr "x$option" : "x-*backend=\(.*\)"`
+	    ;;
+
+	-num-workers=* | --num-workers=* )
+	    NUMWORKERS=`expr "x$option" : "x-*num-workers=\(.*\)"`
+	    ;;
+
+	-threads-per-worker=* | --threads-per-worker=* )
+	    THREADSPERWORKER=`expr "x$option" : "x-*threads-per-worker=\(.*\)"`
+	    ;;
+
+	-serial-mesh-size=* | --serial-mesh-size=* )
+	    SERIALMESHSIZE=`expr "x$option" : "x-*serial-mesh-size=\(.*\)"`
+	    ;;
+
+	-aot-kernels=* | --aot-kernels=* )
+	    AOTKERNELS=`expr "x$option" : "x-*aot-kernels=\(.*\)"`
+	    ;;
+
 	-native-eigen=* | --native-eigen=* )
 	    WITHNATIVEEIGEN=`expr "x$option" : "x-*native-eigen=\(.*\)"`
 	    ;;
@@ -68,10 +88,36 @@ Configuration:
 --do=					which task to execute
 					default = none, must be set
 
---jac-type=[sparse/dense]		if yes, use dense jacobian.
+--jac-type=[sparse/dense/banded]	if dense, use dense jacobian.
+					banded (python only) stores just
+					the two nonzero diagonals.
 					Only matters for bdf1 or lspg.
 					default = sparse
 
+--backend=[pressio4py/native]		python only: run the ROM through the
+					pressio4py bindings or with the native
+					python implementation (no bindings needed).
+					default = pressio4py
+
+--num-workers=				number of timing/basis jobs run concurrently,
+					each in its own scratch dir.
+					default = 1 (serial)
+
+--threads-per-worker=			cores pinned to each job, also sets
+					OMP/BLAS/NUMBA thread counts.
+					default = 1
+
+--serial-mesh-size=			jobs with mesh size >= this are run
+					alone after all the others.
+					default = none
+
+--aot-kernels=[yes/no]			python only: if yes, build the burgers1d
+					kernels ahead of time (numba.pycc) in the
+					run dir and use them instead of the jit ones.
+					The jit ones are cached in NUMBA_CACHE_DIR
+					(default = working-dir/python/numba_cache).
+					default = no
+
 --native-eigen=[yes/no]			if yes, use native eigen, no blas/lapack
 					default = no
 
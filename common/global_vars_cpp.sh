@@ -27,6 +27,19 @@ JACOBIANTYPE=empty
 # name of the task to run
 WHICHTASK=
 
+# sweep scheduler (common/sweep_scheduler.py): number of concurrent jobs,
+# cores/threads per job, and mesh size from which jobs are run alone
+NUMWORKERS=1
+THREADSPERWORKER=1
+SERIALMESHSIZE=
+
+# options passed to the run scripts for the sweep scheduler
+function scheduler_args(){
+    local args="--num-workers=${NUMWORKERS} --threads-per-worker=${THREADSPERWORKER}"
+    [[ ! -z ${SERIALMESHSIZE} ]] && args="${args} --serial-mesh-size=${SERIALMESHSIZE}"
+    echo ${args}
+}
+
 # env script
 SETENVscript=
 
@@ -58,6 +71,9 @@ function print_global_vars(){
     echo "SETENVscript		= $SETENVscript"
     echo "TASKNAME		= $TASKNAME"
     echo "JACOBIANTYPE		= $JACOBIANTYPE"
+    echo "NUMWORKERS		= $NUMWORKERS"
+    echo "THREADSPERWORKER	= $THREADSPERWORKER"
+    echo "SERIALMESHSIZE		= $SERIALMESHSIZE"
     echo "WITHNATIVEEIGEN	= $WITHNATIVEEIGEN"
     echo "ARCH			= $ARCH"
     echo "WITHDBGPRINT		= $WITHDBGPRINT"
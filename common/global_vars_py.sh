@@ -29,6 +29,25 @@ JACOBIANTYPE=empty
 # name of the task to run
 WHICHTASK=
 
+# which backend to use for the rom: pressio4py or native
+BACKEND=pressio4py
+
+# sweep scheduler (common/sweep_scheduler.py): number of concurrent jobs,
+# cores/threads per job, and mesh size from which jobs are run alone
+NUMWORKERS=1
+THREADSPERWORKER=1
+SERIALMESHSIZE=
+
+# options passed to the run scripts for the sweep scheduler
+function scheduler_args(){
+    local args="--num-workers=${NUMWORKERS} --threads-per-worker=${THREADSPERWORKER}"
+    [[ ! -z ${SERIALMESHSIZE} ]] && args="${args} --serial-mesh-size=${SERIALMESHSIZE}"
+    echo ${args}
+}
+
+# yes/no build the burgers1d kernels ahead of time (see python/src/build_aot_kernels.py)
+AOTKERNELS=no
+
 # env script
 SETENVscript=
 
@@ -60,6 +79,11 @@ function print_global_vars(){
     echo "SETENVscript		= $SETENVscript"
     echo "TASKNAME		= $TASKNAME"
     echo "JACOBIANTYPE		= $JACOBIANTYPE"
+    echo "NUMWORKERS		= $NUMWORKERS"
+    echo "THREADSPERWORKER	= $THREADSPERWORKER"
+    echo "SERIALMESHSIZE		= $SERIALMESHSIZE"
+    echo "BACKEND		= $BACKEND"
+    echo "AOTKERNELS		= $AOTKERNELS"
     echo "ARCH			= $ARCH"
     echo "WITHDBGPRINT		= $WITHDBGPRINT"
     echo "Pressio branch		= $pressioBranch"
@@ -76,14 +100,15 @@ function check_minimum_vars_set(){
 
 function check_jacobian_var(){
     if [ $JACOBIANTYPE = empty ]; then
-	echo "--jac-type is empty, must be set to dense or sparse"
+	echo "--jac-type is empty, must be set to dense, sparse or banded"
 	exit 11
     fi
     if [ ${JACOBIANTYPE} != dense ] &&\
-	   [ ${JACOBIANTYPE} != sparse ];
+	   [ ${JACOBIANTYPE} != sparse ] &&\
+	   [ ${JACOBIANTYPE} != banded ];
     then
 	echo "--jac-type is set to non-admissible value"
-	echo "choose one of: dense, sparse"
+	echo "choose one of: dense, sparse, banded"
 	exit 0
     fi
 }
@@ -97,12 +122,28 @@ function check_minimum_vars_set_python(){
 	check_jacobian_var
     fi
 
+    if [ ${BACKEND} != pressio4py ] &&\
+	   [ ${BACKEND} != native ];
+    then
+	echo "--backend is set to non-admissible value"
+	echo "choose one of: pressio4py, native"
+	exit 0
+    fi
+
     if [ ${WHICHTASK} != build ] &&\
 	   [ ${WHICHTASK} != lspg ] &&\
-	   [ ${WHICHTASK} != galerkin ];
+	   [ ${WHICHTASK} != galerkin ] &&\
+	   [ ${WHICHTASK} != fom_bdf1_timing ] &&\
+	   [ ${WHICHTASK} != fom_rk4_timing ] &&\
+	   [ ${WHICHTASK} != fom_bdf1_basis ] &&\
+	   [ ${WHICHTASK} != fom_rk4_basis ] &&\
+	   [ ${WHICHTASK} != callback_overhead ] &&\
+	   [ ${WHICHTASK} != import_time ];
     then
 	echo "--do is set to non-admissible value"
-	echo "choose one of: build, lspg, galerkin"
+	echo "choose one of: build, lspg, galerkin,"
+	echo "fom_bdf1_timing, fom_rk4_timing, fom_bdf1_basis, fom_rk4_basis,"
+	echo "callback_overhead, import_time"
 	exit 0
     fi
 }
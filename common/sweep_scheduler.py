@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+import sys, os, time
+import subprocess
+import threading
+import queue
+
+#-------------------------------------------------------
+# scheduler for the mesh x rom size sweeps (timing and basis runs).
+#
+# Each SweepJob is a command run as its own process inside its own
+# scratch directory, so jobs never share input.txt/basis.txt/output files.
+# The available cores are split into numWorkers disjoint slots of
+# threadsPerWorker cores: a job is pinned to the cores of the slot it runs
+# on (sched_setaffinity) and its BLAS/OpenMP/Numba thread counts are set
+# to threadsPerWorker, so concurrent jobs do not oversubscribe the cores.
+#
+# serialize-largest policy: jobs with meshSize >= serialMeshSize are not
+# run concurrently with anything else. They are run one at a time after
+# all the other jobs are done, still pinned to one slot and with the same
+# thread count, so that their timings are comparable with the others but
+# not skewed by memory bandwidth contention.
+#-------------------------------------------------------
+
+threadEnvVars = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                 'NUMBA_NUM_THREADS']
+
+class SweepJob:
+  # setupFnc(scratchDir) is called before launching, e.g. to write the
+  # input file or link the basis, args is the command run in scratchDir
+  def __init__(self, name, args, meshSize=0, setupFnc=None):
+    self.name_     = name
+    self.args_     = [str(a) for a in args]
+    self.meshSize_ = meshSize
+    self.setupFnc_ = setupFnc
+
+
+class SweepJobResult:
+  def __init__(self, job, scratchDir, returnCode, output, elapsed, cores):
+    self.job_        = job
+    self.scratchDir_ = scratchDir
+    self.returnCode_ = returnCode
+    self.output_     = output
+    self.elapsed_    = elapsed
+    self.cores_      = cores
+
+
+class SweepScheduler:
+  def __init__(self, workDir, numWorkers=1, threadsPerWorker=1,
+               pinCores=True, serialMeshSize=None, extraEnv={}):
+    self.workDir_ = os.path.abspath(workDir)
+    self.threadsPerWorker_ = threadsPerWorker
+    self.pinCores_ = pinCores and hasattr(os, 'sched_setaffinity')
+    self.serialMeshSize_ = serialMeshSize
+    self.extraEnv_ = extraEnv
+
+    # split the cores we are allowed to run on into disjoint slots
+    if hasattr(os, 'sched_getaffinity'):
+      cores = sorted(os.sched_getaffinity(0))
+    else:
+      cores = list(range(os.cpu_count()))
+    maxWorkers = max(1, len(cores)//threadsPerWorker)
+    if numWorkers > maxWorkers:
+      print("sweep scheduler: only {} cores, using {} workers instead of {}".format(
+        len(cores), maxWorkers, numWorkers))
+    self.numWorkers_ = min(numWorkers, maxWorkers)
+    self.slots_ = [cores[i*threadsPerWorker:(i+1)*threadsPerWorker]
+                   for i in range(self.numWorkers_)]
+
+  def scratchDir(self, job):
+    return os.path.join(self.workDir_, job.name_)
+
+  def jobEnv(self):
+    env = dict(os.environ)
+    for var in threadEnvVars:
+      env[var] = str(self.threadsPerWorker_)
+    env.update(self.extraEnv_)
+    return env
+
+  def runJob(self, job, cores):
+    scratchDir = self.scratchDir(job)
+    startTime = time.perf_counter()
+    popen = subprocess.Popen(job.args_, cwd=scratchDir, env=self.jobEnv(),
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    # pin right after launch (preexec_fn is not safe with threads): the job
+    # is still starting up, the BLAS/Numba threads it creates later inherit this
+    if self.pinCores_:
+      try:
+        os.sched_setaffinity(popen.pid, cores)
+      except ProcessLookupError:
+        pass
+    output, _ = popen.communicate()
+    elapsed = time.perf_counter() - startTime
+    if popen.returncode != 0:
+      print("sweep scheduler: job {} failed with return code {}".format(
+        job.name_, popen.returncode))
+    return SweepJobResult(job, scratchDir, popen.returncode,
+                          output.decode(errors='replace'), elapsed, cores)
+
+  # runs jobs with the worker slots, returns the results in the same
+  # order as jobs. Jobs are set up serially here before any is launched
+  # since setup functions may go through the current directory.
+  # onJobDone(result), if given, is called as soon as each job is done
+  # (one call at a time), e.g. to store its timings before the sweep ends.
+  def run(self, jobs, onJobDone=None):
+    for job in jobs:
+      scratchDir = self.scratchDir(job)
+      os.makedirs(scratchDir, exist_ok=True)
+      if job.setupFnc_ is not None:
+        job.setupFnc_(scratchDir)
+
+    isSerial = lambda job: self.serialMeshSize_ is not None \
+                           and job.meshSize_ >= self.serialMeshSize_
+    parallelIds = [i for i, job in enumerate(jobs) if not isSerial(job)]
+    serialIds   = [i for i, job in enumerate(jobs) if isSerial(job)]
+    results = [None]*len(jobs)
+    doneLock = threading.Lock()
+    def finish(i, result):
+      results[i] = result
+      if onJobDone is not None:
+        with doneLock:
+          onJobDone(result)
+
+    # parallel phase: each thread owns one slot and pulls jobs, the
+    # actual work is done in the job processes
+    pending = queue.Queue()
+    for i in parallelIds: pending.put(i)
+    def worker(cores):
+      while True:
+        try:
+          i = pending.get_nowait()
+        except queue.Empty:
+          return
+        print("sweep scheduler: running {} on cores {}".format(jobs[i].name_, cores))
+        finish(i, self.runJob(jobs[i], cores))
+
+    threads = [threading.Thread(target=worker, args=(cores,)) for cores in self.slots_]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    # serial phase for the largest meshes
+    for i in serialIds:
+      print("sweep scheduler: running {} alone on cores {}".format(jobs[i].name_, self.slots_[0]))
+      finish(i, self.runJob(jobs[i], self.slots_[0]))
+
+    return results
+
+
+# command line options shared by the run scripts using the scheduler
+def addSchedulerArgs(parser):
+  parser.add_argument("-num-workers", "--num-workers", dest="numWorkers", type=int, default=1,
+                      help="number of concurrent jobs, 1 runs the sweep serially as before")
+  parser.add_argument("-threads-per-worker", "--threads-per-worker", dest="threadsPerWorker",
+                      type=int, default=1,
+                      help="cores pinned to each job and value of OMP/BLAS/NUMBA thread counts")
+  parser.add_argument("-serial-mesh-size", "--serial-mesh-size", dest="serialMeshSize",
+                      type=int, default=None,
+                      help="jobs with mesh size >= this are run alone after all others")
+  parser.add_argument("-no-pin", "--no-pin", dest="pinCores", action="store_false",
+                      help="do not pin jobs to cores")
+
+def createScheduler(args, workDir):
+  return SweepScheduler(workDir, args.numWorkers, args.threadsPerWorker,
+                        args.pinCores, args.serialMeshSize)
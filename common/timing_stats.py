@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import numpy as np
+from scipy import stats
+
+#-------------------------------------------------------
+# statistics of the timing replicas, used by the adaptive benchmark
+# mode of the timing harness and by the plot scripts.
+#
+# outliers: modified z-score (Iglewicz & Hoaglin) based on the median and
+# the median absolute deviation, |x - median| * 0.6745/MAD > threshold,
+# robust to the outliers themselves unlike mean/std.
+# confidence interval: Student t interval of the mean of the non-outliers.
+#-------------------------------------------------------
+
+def outlierMask(x, threshold=3.5):
+  x = np.asarray(x)
+  med = np.median(x)
+  mad = np.median(np.abs(x - med))
+  if mad == 0.:
+    return np.zeros(len(x), dtype=bool)
+  return 0.6745*np.abs(x - med)/mad > threshold
+
+
+# mean and its confidence interval (lo, hi) of samples x
+def confidenceInterval(x, confidence=0.95):
+  x = np.asarray(x)
+  n = len(x)
+  mean = np.mean(x)
+  if n < 2:
+    return mean, -np.inf, np.inf
+  halfWidth = stats.t.ppf(0.5*(1.+confidence), n-1) * np.std(x, ddof=1)/np.sqrt(n)
+  return mean, mean-halfWidth, mean+halfWidth
+
+
+# summary of samples x with outliers excluded from the mean/CI
+def summarize(x, confidence=0.95, outlierThreshold=3.5):
+  x = np.asarray(x, dtype=float)
+  outliers = outlierMask(x, outlierThreshold)
+  mean, lo, hi = confidenceInterval(x[~outliers], confidence)
+  return {'mean': mean, 'ciLow': lo, 'ciHigh': hi,
+          'relCiWidth': (hi-lo)/mean if mean != 0. else np.inf,
+          'median': np.median(x), 'min': np.min(x), 'max': np.max(x),
+          'numSamples': len(x), 'numOutliers': int(np.sum(outliers)),
+          'outliers': [int(i) for i in np.nonzero(outliers)[0]],
+          'confidence': confidence}
+
+
+# for a legacy timing matrix (mesh, rom, replicas...) returns the matrix
+#   mesh, rom, mean, ciLow, ciHigh, median, numSamples, numOutliers
+def summarizeTimingsMatrix(data, confidence=0.95, outlierThreshold=3.5):
+  res = np.zeros((data.shape[0], 8))
+  res[:, 0:2] = data[:, 0:2]
+  for i in range(data.shape[0]):
+    s = summarize(data[i, 2:], confidence, outlierThreshold)
+    res[i, 2:] = [s['mean'], s['ciLow'], s['ciHigh'], s['median'],
+                  s['numSamples'], s['numOutliers']]
+  return res
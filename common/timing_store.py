@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+import sys, os, time
+import json
+import platform
+import subprocess
+import numpy as np
+
+import timing_stats
+
+#-------------------------------------------------------
+# append-only store for the timing runs, as JSON Lines: one row
+# (one json object per line) for each replica, written and flushed as
+# soon as the replica is done, so a crashed sweep keeps all the completed
+# replicas and can be restarted where it stopped.
+#
+# Each row holds:
+#   config     : what identifies the sweep (exename, backend, jacobian, mode...)
+#   meshSize, romSize (0 for the fom), replica, numSteps
+#   time       : timed part of the replica (s), timePerStep = time/numSteps
+#   phases     : other measured phases (s), e.g. setup, warmup, process wall time
+#   threads    : thread count env vars of the process doing the run
+#   gitRev, host, timestamp
+# plus optional extra keys given by the caller (e.g. 'instrumentation').
+#
+# A restarted sweep with the same config skips the (meshSize, romSize,
+# replica) tuples already in the file, see completedReplicas.
+# loadTimingsMatrix returns the legacy <exe>_timings.txt layout and
+# loadTimingsSummary the mean with its confidence interval per config.
+#-------------------------------------------------------
+
+threadEnvVars = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                 'NUMBA_NUM_THREADS']
+
+# git revision of the sources: the run dirs are outside the repo so the
+# do_all scripts export GIT_REVISION, else try git in the current dir
+def gitRevision():
+  if 'GIT_REVISION' in os.environ:
+    return os.environ['GIT_REVISION']
+  try:
+    out = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL, check=True)
+    return out.stdout.decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return "unknown"
+
+def hostInfo():
+  return {'node': platform.node(), 'machine': platform.machine(),
+          'processor': platform.processor(), 'system': platform.platform(),
+          'cpuCount': os.cpu_count(), 'python': platform.python_version(),
+          'numpy': np.__version__}
+
+def threadInfo(env=None):
+  env = os.environ if env is None else env
+  return {var: env.get(var, None) for var in threadEnvVars}
+
+
+class TimingStore:
+  def __init__(self, fileName, config):
+    self.fileName_ = fileName
+    # plain str/int values so that they compare equal after a json round trip
+    self.config_ = {k: (v if v is None or isinstance(v, (int, float)) else str(v))
+                    for k, v in config.items()}
+    self.gitRev_ = gitRevision()
+    self.host_ = hostInfo()
+
+  def rows(self):
+    return loadRows(self.fileName_, self.config_)
+
+  # set of (meshSize, romSize, replica) already in the store for this config
+  def completedReplicas(self):
+    return set((r['meshSize'], r['romSize'], r['replica']) for r in self.rows())
+
+  def isComplete(self, meshSize, romSize, replica):
+    return (int(meshSize), int(romSize), int(replica)) in self.completedReplicas()
+
+  # replicas of (meshSize, romSize) among range(numReplicas) still to run
+  def missingReplicas(self, meshSize, romSize, numReplicas):
+    done = self.completedReplicas()
+    return [i for i in range(numReplicas) if (int(meshSize), int(romSize), i) not in done]
+
+  def append(self, meshSize, romSize, replica, numSteps, elapsed, phases={}, threads=None,
+             extra=None):
+    row = {'config': self.config_,
+           'meshSize': int(meshSize), 'romSize': int(romSize), 'replica': int(replica),
+           'numSteps': int(numSteps), 'time': float(elapsed),
+           'timePerStep': float(elapsed)/float(numSteps),
+           'phases': {k: (None if v is None else float(v)) for k, v in phases.items()},
+           'threads': threadInfo() if threads is None else threads,
+           'gitRev': self.gitRev_, 'host': self.host_,
+           'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S")}
+    if extra is not None:
+      row.update(extra)
+    # one write per row and flush to disk, so an interrupted run
+    # leaves at most a truncated last line (skipped when reading)
+    with open(self.fileName_, "a") as fout:
+      fout.write(json.dumps(row) + "\n")
+      fout.flush()
+      os.fsync(fout.fileno())
+
+  # legacy matrix for the replicas completed so far
+  def timingsMatrix(self, withRomSize=True):
+    return rowsToMatrix(self.rows(), withRomSize)
+
+
+def loadRows(fileName, config=None):
+  rows = []
+  if not os.path.isfile(fileName):
+    return rows
+  with open(fileName, "rt") as fin:
+    for line in fin:
+      try:
+        row = json.loads(line)
+      except ValueError:
+        # truncated line of a crashed run
+        continue
+      if config is None or row['config'] == config:
+        rows.append(row)
+  return rows
+
+
+# (meshSize, romSize) -> {replica: time per step}
+def timesPerStepByConfig(rows):
+  byConfig = {}
+  for r in rows:
+    # a rerun replica replaces the older one
+    byConfig.setdefault((r['meshSize'], r['romSize']), {})[r['replica']] = r['timePerStep']
+  return byConfig
+
+# rows -> legacy layout of <exe>_timings.txt:
+#   mesh size, [rom size,] time per step of each replica
+# sorted by mesh and rom size; if some configs have fewer replicas
+# (interrupted sweep) all are truncated to the smallest count
+def rowsToMatrix(rows, withRomSize=True):
+  byConfig = timesPerStepByConfig(rows)
+  if len(byConfig) == 0:
+    return np.zeros((0, 2 if withRomSize else 1))
+
+  numReplicas = min(len(v) for v in byConfig.values())
+  if numReplicas < max(len(v) for v in byConfig.values()):
+    print("timing store: configs with missing replicas, keeping {} per config".format(numReplicas))
+  nKeys = 2 if withRomSize else 1
+  data = np.zeros((len(byConfig), nKeys+numReplicas))
+  for iRow, key in enumerate(sorted(byConfig.keys())):
+    data[iRow, :nKeys] = key[:nKeys]
+    times = byConfig[key]
+    data[iRow, nKeys:] = [times[i] for i in sorted(times.keys())[:numReplicas]]
+  return data
+
+
+# matrix in the legacy layout from either a .jsonl store (all configs in
+# the file, or only those matching config) or a legacy .txt file
+def loadTimingsMatrix(fileName, config=None, withRomSize=True):
+  if fileName.endswith(".jsonl"):
+    return rowsToMatrix(loadRows(fileName, config), withRomSize)
+  return np.loadtxt(fileName, ndmin=2)
+
+
+# summary (see common/timing_stats.py) of each (mesh, rom) config, with
+# all its replicas even if configs have different counts (adaptive mode):
+#   mesh, rom, mean, ciLow, ciHigh, median, numSamples, numOutliers
+def loadTimingsSummary(fileName, config=None, confidence=0.95):
+  if not fileName.endswith(".jsonl"):
+    return timing_stats.summarizeTimingsMatrix(np.loadtxt(fileName, ndmin=2), confidence)
+  byConfig = timesPerStepByConfig(loadRows(fileName, config))
+  res = np.zeros((len(byConfig), 8))
+  for iRow, key in enumerate(sorted(byConfig.keys())):
+    st = timing_stats.summarize(list(byConfig[key].values()), confidence)
+    res[iRow] = [key[0], key[1], st['mean'], st['ciLow'], st['ciHigh'], st['median'],
+                 st['numSamples'], st['numOutliers']]
+  return res
@@ -10,11 +10,11 @@ import constants
 # store current directory
 pwd = os.getcwd()
 
-def createInputFileFomTiming(meshSize):
+def createInputFileFomTiming(meshSize, fileName="input.txt"):
   # copy template
-  os.system('cp input.template input.txt')
+  os.system('cp input.template ' + fileName)
 
-  fin = open("input.txt", "rt")
+  fin = open(fileName, "rt")
   data = fin.read()
   data = data.replace("numCellValue",   str(meshSize) )
   data = data.replace("dtValue",        str(constants.dt) )
@@ -23,18 +23,18 @@ def createInputFileFomTiming(meshSize):
   data = data.replace("romOnValue",     str(0) )
   fin.close()
 
-  fin = open("input.txt", "wt")
+  fin = open(fileName, "wt")
   fin.write(data)
   fin.close()
 
 
-def createInputFileFomForBasis(meshSize, samplingFreq):
-  createInputFileFomTiming(meshSize)
+def createInputFileFomForBasis(meshSize, samplingFreq, fileName="input.txt"):
+  createInputFileFomTiming(meshSize, fileName)
 
   # copy template
-  os.system('cp input.template input.txt')
+  os.system('cp input.template ' + fileName)
 
-  fin = open("input.txt", "rt")
+  fin = open(fileName, "rt")
   data = fin.read()
   data = data.replace("numCellValue",           str(meshSize) )
   data = data.replace("dtValue",                str(constants.dt) )
@@ -46,16 +46,16 @@ def createInputFileFomForBasis(meshSize, samplingFreq):
   data = data.replace("basisFileNameValue",     "basis.txt")
   fin.close()
 
-  fin = open("input.txt", "wt")
+  fin = open(fileName, "wt")
   fin.write(data)
   fin.close()
 
 
-def createInputFileRom(meshSize, romSize):
+def createInputFileRom(meshSize, romSize, fileName="input.txt"):
   # copy template
-  os.system('cp input.template input.txt')
+  os.system('cp input.template ' + fileName)
 
-  fin = open("input.txt", "rt")
+  fin = open(fileName, "rt")
   data = fin.read()
   data = data.replace("numCellValue",           str(meshSize) )
   data = data.replace("dtValue",                str(constants.dt) )
@@ -66,6 +66,30 @@ def createInputFileRom(meshSize, romSize):
   data = data.replace("romSizeValue",           str(romSize) )
   fin.close()
 
-  fin = open("input.txt", "wt")
+  fin = open(fileName, "wt")
   fin.write(data)
   fin.close()
+
+
+#-------------------------------------------------------
+# left singular vectors of the snapshot matrix A (N x nSnap)
+# - gesdd: thin svd via scipy, divide-and-conquer driver
+# - randomized: range finder with power iterations (Halko et al.),
+#   cheaper when numModes << nSnap
+#-------------------------------------------------------
+def computeLeftSingularVectors(A, numModes, svdType="gesdd", oversampling=10, powerIters=2):
+  from scipy import linalg
+  if svdType == "gesdd":
+    U, s, VT = linalg.svd(A, full_matrices=False, lapack_driver='gesdd')
+    return U[:, :numModes], s
+  elif svdType == "randomized":
+    rng = np.random.default_rng(12345)
+    l = min(numModes + oversampling, A.shape[1])
+    Q, _ = linalg.qr(A.dot(rng.standard_normal((A.shape[1], l))), mode='economic')
+    for i in range(powerIters):
+      Q, _ = linalg.qr(A.T.dot(Q), mode='economic')
+      Q, _ = linalg.qr(A.dot(Q), mode='economic')
+    Ub, s, VT = linalg.svd(Q.T.dot(A), full_matrices=False, lapack_driver='gesdd')
+    return Q.dot(Ub[:, :numModes]), s
+  else:
+    raise Exception('Invalid choice for the svdType = {}'.format(svdType))
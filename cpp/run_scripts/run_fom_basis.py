@@ -8,12 +8,42 @@ from argparse import ArgumentParser
 import re
 
 import myutils, constants
-
-def main(exeName):
+import sweep_scheduler
+
+#-------------------------------------------------------
+# per-rom-size mode: one fom run (and svd) for each rom size,
+# where only the sampling frequency changes
+#-------------------------------------------------------
+# fom runs for basis as jobs of the sweep scheduler, fomRuns is a list
+# of (name, meshSize, samplingFreq): each run gets its own scratch dir
+def runFomJobs(exeName, fomRuns, schedArgs):
+  scheduler = sweep_scheduler.createScheduler(schedArgs, "sweep_jobs")
+  jobs = []
+  for name, meshSize, samplingFreq in fomRuns:
+    setupFnc = lambda scratchDir, meshSize=meshSize, samplingFreq=samplingFreq: \
+      myutils.createInputFileFomForBasis(meshSize, samplingFreq, scratchDir+"/input.txt")
+    jobs.append(sweep_scheduler.SweepJob(name, (os.path.abspath(exeName), "input.txt"),
+                                         int(meshSize), setupFnc))
+  results = {}
+  for res in scheduler.run(jobs):
+    if res.returnCode_ != 0:
+      print(res.output_)
+      sys.exit("job " + res.job_.name_ + " failed")
+    results[res.job_.name_] = res.scratchDir_ + "/"
+  return results
+
+
+def mainPerRomSize(exeName, schedArgs):
   # args for the executable
   args = ("./"+exeName, "input.txt")
   print("Starting basis runs")
 
+  if schedArgs.numWorkers > 1:
+    fomRuns = [("meshSize{}_basis{}".format(meshSize, romSize), meshSize,
+                int(constants.numStepsBasis/romSize))
+               for meshSize in constants.mesh_sizes for romSize in constants.rom_sizes]
+    jobDirs = runFomJobs(exeName, fomRuns, schedArgs)
+
   # loop over mesh sizes
   for iMesh in range(0, constants.num_meshes):
 
@@ -36,23 +66,92 @@ def main(exeName):
       assert(constants.numStepsBasis % romSize == 0)
       samplingFreq = int(constants.numStepsBasis/romSize)
 
-      # create input file
-      myutils.createInputFileFomForBasis(currentMeshSize, samplingFreq)
+      if schedArgs.numWorkers > 1:
+        # already run by the scheduler
+        srcDir = jobDirs["meshSize{}_basis{}".format(currentMeshSize, romSize)]
+      else:
+        # create input file
+        myutils.createInputFileFomForBasis(currentMeshSize, samplingFreq)
 
-      os.system("./" + exeName + " input.txt")
-      #popen = subprocess.Popen(args, stdout=subprocess.PIPE)
-      #popen.wait()
-      #output = popen.stdout.read()
+        os.system("./" + exeName + " input.txt")
+        #popen = subprocess.Popen(args, stdout=subprocess.PIPE)
+        #popen.wait()
+        #output = popen.stdout.read()
+        srcDir = ""
 
       # create dir for this number of basis
       childDir=parentDir + '/basis' + str(romSize)
       if not os.path.exists(childDir): os.system('mkdir ' + childDir)
 
       # copy files there
-      os.system('mv input.txt ' + childDir)
-      os.system('mv basis.txt ' + childDir)
-      os.system('mv snapshots.txt ' + childDir)
-      os.system('mv yFom.txt ' + childDir)
+      os.system('mv ' + srcDir + 'input.txt ' + childDir)
+      os.system('mv ' + srcDir + 'basis.txt ' + childDir)
+      os.system('mv ' + srcDir + 'snapshots.txt ' + childDir)
+      os.system('mv ' + srcDir + 'yFom.txt ' + childDir)
+
+  print("Done with basis runs")
+
+
+#-------------------------------------------------------
+# nested mode: one fom run per mesh, sampled for the largest rom size,
+# and one svd whose leading columns give every smaller basis.
+# The full left singular vectors are stored once as meshSize*/basis.npy
+# (column-major, same format as python/src/basis_io.py) and each
+# meshSize*/basis*/ gets its prefix as basis.txt plus a link to that
+# basis.npy, so the ROM timing scripts find the same layout as before.
+#-------------------------------------------------------
+def mainNested(exeName, svdType, schedArgs):
+  print("Starting nested basis runs")
+
+  maxRomSize = int(np.max(constants.rom_sizes))
+  assert(constants.numStepsBasis % maxRomSize == 0)
+  samplingFreq = int(constants.numStepsBasis/maxRomSize)
+
+  if schedArgs.numWorkers > 1:
+    fomRuns = [("meshSize{}".format(meshSize), meshSize, samplingFreq)
+               for meshSize in constants.mesh_sizes]
+    jobDirs = runFomJobs(exeName, fomRuns, schedArgs)
+
+  for iMesh in range(0, constants.num_meshes):
+    currentMeshSize = constants.mesh_sizes[iMesh]
+    print("Current currentMeshSize = ", currentMeshSize)
+
+    parentDir='meshSize' + str(currentMeshSize)
+    if not os.path.exists(parentDir):
+      os.system('mkdir ' + parentDir)
+
+    # single fom run for this mesh
+    if schedArgs.numWorkers > 1:
+      # already run by the scheduler
+      srcDir = jobDirs["meshSize{}".format(currentMeshSize)]
+    else:
+      myutils.createInputFileFomForBasis(currentMeshSize, samplingFreq)
+      os.system("./" + exeName + " input.txt")
+      srcDir = ""
+    for f in ['input.txt', 'snapshots.txt', 'yFom.txt']:
+      os.system('mv ' + srcDir + f + ' ' + parentDir)
+    # the basis from the fom run is superseded by the one computed below
+    os.system('rm -f ' + srcDir + 'basis.txt')
+
+    # single svd for this mesh
+    snapshots = np.loadtxt(parentDir + '/snapshots.txt', ndmin=2)
+    startTime = time.time()
+    U, s = myutils.computeLeftSingularVectors(snapshots, maxRomSize, svdType)
+    print("svd time = ", time.time()-startTime)
+    np.save(parentDir + '/basis.npy', np.asfortranarray(U))
+    np.savetxt(parentDir + '/singular_values.txt', s, fmt='%.15e')
+
+    for i in range(0, constants.num_rom_sizes):
+      romSize = int(constants.rom_sizes[i])
+      print("Current romSize = ", romSize)
+      childDir = parentDir + '/basis' + str(romSize)
+      if not os.path.exists(childDir): os.system('mkdir ' + childDir)
+
+      np.savetxt(childDir + '/basis.txt', U[:, :romSize], fmt='%.15f')
+      # the ROM drivers load basis.npy and keep only the leading romSize columns
+      for f in ['basis.npy', 'input.txt', 'snapshots.txt', 'yFom.txt']:
+        os.system('rm -f ' + childDir + '/' + f)
+        os.system('ln -s ../' + f + ' ' + childDir + '/' + f)
 
   print("Done with basis runs")
 
@@ -61,5 +160,16 @@ if __name__== "__main__":
   parser = ArgumentParser()
   parser.add_argument("-exe", "--exe", dest="exeName",
                       help="generate basis for fom")
+  parser.add_argument("-mode", "--mode", dest="mode", default="nested",
+                      choices=["nested", "per-rom-size"],
+                      help="nested: one fom run and svd per mesh (default), \
+                            per-rom-size: one fom run per mesh and rom size")
+  parser.add_argument("-svd", "--svd", dest="svdType", default="gesdd",
+                      choices=["gesdd", "randomized"],
+                      help="svd used in nested mode")
+  sweep_scheduler.addSchedulerArgs(parser)
   args = parser.parse_args()
-  main(args.exeName)
+  if args.mode == "nested":
+    mainNested(args.exeName, args.svdType, args)
+  else:
+    mainPerRomSize(args.exeName, args)
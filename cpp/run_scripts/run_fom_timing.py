@@ -8,45 +8,87 @@ import re
 from argparse import ArgumentParser
 
 import myutils, constants
+import sweep_scheduler, timing_store
+
+# time of the run from the executable output
+def findTiming(output):
+  res = re.search(constants.timerRegExp, str(output))
+  return float(res.group().split()[2])
 
-def main(exename):
-  # col0 :      mesh size
-  # col1,2...:  all timings
-  data = np.zeros( (constants.num_meshes, constants.numSamplesForTiming+1) )
+
+def main(exename, schedArgs):
+  # one row per replica goes to the store (the fom has romSize = 0),
+  # replicas already in there from an interrupted run are not rerun
+  store = timing_store.TimingStore(exename+"_timings.jsonl",
+                                   {'exename': exename, 'dt': float(constants.dt)})
+  numSteps = lambda meshSize: int(constants.numStepsTiming[meshSize])
 
   # args for the executable
   args = ("./"+exename, "input.txt")
 
-  #----------------------------
-  #--- loop over mesh sizes ---
-  for iMesh in range(0, constants.num_meshes):
+  # with more than one worker every replica is a job of the sweep
+  # scheduler running in its own scratch dir with its own input.txt
+  if schedArgs.numWorkers > 1:
+    scheduler = sweep_scheduler.createScheduler(schedArgs, "sweep_jobs")
+    jobs, jobKeys = [], {}
+    for iMesh in range(0, constants.num_meshes):
+      meshSize = constants.mesh_sizes[iMesh]
+      for i in store.missingReplicas(meshSize, 0, constants.numSamplesForTiming):
+        setupFnc = lambda scratchDir, meshSize=meshSize: \
+          myutils.createInputFileFomTiming(meshSize, scratchDir+"/input.txt")
+        name = "meshSize{}_replica{}".format(meshSize, i)
+        jobs.append(sweep_scheduler.SweepJob(name, (os.path.abspath(exename), "input.txt"),
+                                             int(meshSize), setupFnc))
+        jobKeys[name] = (meshSize, i)
+
+    def onJobDone(res):
+      if res.returnCode_ != 0:
+        print(res.output_)
+        return
+      meshSize, i = jobKeys[res.job_.name_]
+      time = findTiming(res.output_)
+      print("meshSize = ", meshSize, " replica # = ", i, " time = ", time)
+      store.append(meshSize, 0, i, numSteps(meshSize), time,
+                   {'processWall': res.elapsed_},
+                   timing_store.threadInfo(scheduler.jobEnv()))
 
-    currentMeshSize = constants.mesh_sizes[iMesh]
-    print("Current currentMeshSize = ", currentMeshSize)
-    # store the current mesh size
-    data[iMesh][0] = currentMeshSize
+    for res in scheduler.run(jobs, onJobDone):
+      if res.returnCode_ != 0:
+        sys.exit("job " + res.job_.name_ + " failed")
 
-    # create input file (we only need one since the same
-    # is used to run multiple replica runs
-    myutils.createInputFileFomTiming(currentMeshSize)
+  else:
+    #----------------------------
+    #--- loop over mesh sizes ---
+    for iMesh in range(0, constants.num_meshes):
 
-    # --- loop over replicas runs ---
-    for i in range(0, constants.numSamplesForTiming):
-      print("replica # = ", i)
+      currentMeshSize = constants.mesh_sizes[iMesh]
+      print("Current currentMeshSize = ", currentMeshSize)
 
-      # run with subprocess
-      popen = subprocess.Popen(args, stdout=subprocess.PIPE)
-      popen.wait()
-      # get output
-      output = popen.stdout.read()
+      # create input file (we only need one since the same
+      # is used to run multiple replica runs
+      myutils.createInputFileFomTiming(currentMeshSize)
 
-      # find timing
-      res = re.search(constants.timerRegExp, str(output))
-      time = float(res.group().split()[2])
-      # store time for this replica
-      data[iMesh][i+1] = time/float(constants.numStepsTiming[currentMeshSize])
-      print("time = ", time)
+      # --- loop over replicas runs ---
+      for i in store.missingReplicas(currentMeshSize, 0, constants.numSamplesForTiming):
+        print("replica # = ", i)
 
+        # run with subprocess
+        startTime = time.perf_counter()
+        popen = subprocess.Popen(args, stdout=subprocess.PIPE)
+        popen.wait()
+        wallTime = time.perf_counter() - startTime
+        # get output
+        output = popen.stdout.read()
+
+        # find timing and store it for this replica
+        elapsed = findTiming(output)
+        store.append(currentMeshSize, 0, i, numSteps(currentMeshSize), elapsed,
+                     {'processWall': wallTime})
+        print("time = ", elapsed)
+
+  # col0 :      mesh size
+  # col1,2...:  all timings (per step)
+  data = store.timingsMatrix(withRomSize=False)
   # save to text
   np.savetxt(exename+"_timings.txt", data, fmt='%.15f')
   # make sure the data table is not wrapped over multiple lines
@@ -58,5 +100,6 @@ if __name__== "__main__":
   parser = ArgumentParser()
   parser.add_argument("-exe", "--exe", dest="exename",
                       help="run timings for fom")
+  sweep_scheduler.addSchedulerArgs(parser)
   args = parser.parse_args()
-  main(args.exename)
+  main(args.exename, args)
@@ -8,20 +8,36 @@ import re
 from argparse import ArgumentParser
 
 import myutils, constants
+import sweep_scheduler, timing_store
 
 #-------------------------------------------------------
 # scope: generate timings for C++ Burgers1D rom
 #-------------------------------------------------------
 
-def main(exeName, basisDirName):
-
-  # data stored as:
-  # - first col  = mesh size
-  # - second col = rom size
-  # - then       = timings
-  nRows = constants.num_meshes * len(constants.rom_sizes)
-  nCols = constants.numSamplesForTiming+2
-  data = np.zeros((nRows, nCols))
+# time of the run from the executable output
+def findTiming(output):
+  res = re.search(constants.timerRegExp, str(output))
+  return float(res.group().split()[2])
+
+# save output data (e.g. state and gen coords) for one replica run only
+# since they are all equivalent, beside the timing
+def saveOutputs(outDir, meshSize, romSize):
+  destDir = "meshSize" + str(meshSize) + "/basis" + str(romSize)
+  if os.path.isfile(destDir + "/input.txt"):
+    return
+  os.system("mkdir -p " + destDir)
+  for f in ['yFomReconstructed.txt', 'final_generalized_coords.txt']:
+    if os.path.isfile(outDir + f):
+      os.system("mv " + outDir + f + " " + destDir)
+  os.system("cp " + outDir + "input.txt " + destDir)
+
+
+def main(exeName, basisDirName, schedArgs):
+  # one row per replica goes to the store, replicas already
+  # in there from an interrupted run are not rerun
+  store = timing_store.TimingStore(exeName+"_timings.jsonl",
+                                   {'exename': exeName, 'dt': float(constants.dt)})
+  numSteps = lambda meshSize: int(constants.numStepsTiming[meshSize])
 
   # args for the executable
   args = ("./"+exeName, "input.txt")
@@ -29,73 +45,95 @@ def main(exeName, basisDirName):
   # store parent directory where all basis are stored
   basisParentDir = os.getcwd() + "/../data_" + basisDirName
 
-  # loop over mesh sizes
-  iRow = -1
-  for iMesh in range(0, constants.num_meshes):
-    currMeshSize = constants.mesh_sizes[iMesh]
-    print("Current currMeshSize = ", currMeshSize)
-
-    # loop over ROM sizes
-    for iRom in range(0, constants.num_rom_sizes):
-      # iRow keeps strack of where to store into data
-      iRow += 1
-      # print current rom size
-      romSize = constants.rom_sizes[iRom]
-      print("Current romSize = ", romSize)
-
-      # store mesh size and rom size
-      data[iRow][0] = currMeshSize
-      data[iRow][1] = romSize
-
-      # create input file (we only need one since the same
-      # is used to run multiple replicas)
-      myutils.createInputFileRom(currMeshSize, romSize)
-
-      # link basis file
-      subs1 = "meshSize" + str(currMeshSize)
-      subs2 = "basis" + str(romSize)
-      basisDir = basisParentDir + "/" + subs1 + "/" + subs2
-      # always remove the link to basis to make sure we link the right one
-      os.system("rm -rf ./basis.txt")
-      os.system("ln -s "+basisDir+"/basis.txt ./basis.txt")
-
-      #--- loop over samples ---
-      for i in range(0, constants.numSamplesForTiming):
-        popen = subprocess.Popen(args, stdout=subprocess.PIPE)
-        popen.wait()
-        output = popen.stdout.read()
-        #print( str(output))
-        #os.system("./" + exeName + " input.txt")
-
-        # find timing
-        res = re.search(constants.timerRegExp, str(output))
-        time = float(res.group().split()[2])
-        print("time = ", time)
-        # store
-        data[iRow][i+2] = time/float(constants.numStepsTiming[currMeshSize])
-
-        # while running, overwrite the timings
-        timingFile = exeName+"_timings.txt"
-        if os.path.isfile(timingFile):
-          os.system("rm -rf " + timingFile)
-        np.savetxt(timingFile, data, fmt='%.15f')
-
-        # save output data (e.g. state and gen coords) for one replica run only
-        # since they are all equivalent, beside the timing
-        if i==0:
-          destDir = "meshSize" + str(currMeshSize) + "/basis" + str(romSize)
-          os.system("mkdir -p " + destDir)
-          if os.path.isfile('yFomReconstructed.txt'):
-            os.system("mv yFomReconstructed.txt " + destDir)
-          if os.path.isfile('final_generalized_coords.txt'):
-            os.system("mv final_generalized_coords.txt " + destDir)
-          os.system("cp input.txt " + destDir)
-
-  # write timings file
-  timingFile = exeName+"_timings.txt"
-  if os.path.isfile(timingFile):
-    os.system("rm -rf " + timingFile)
-  np.savetxt(timingFile, data, fmt='%.15f')
+  # with more than one worker every replica is a job of the sweep
+  # scheduler running in its own scratch dir with its own input.txt and basis link
+  if schedArgs.numWorkers > 1:
+    scheduler = sweep_scheduler.createScheduler(schedArgs, "sweep_jobs")
+    jobs, jobKeys = [], {}
+    for iMesh in range(0, constants.num_meshes):
+      meshSize = constants.mesh_sizes[iMesh]
+      for iRom in range(0, constants.num_rom_sizes):
+        romSize = constants.rom_sizes[iRom]
+        basisDir = basisParentDir + "/meshSize" + str(meshSize) + "/basis" + str(romSize)
+        def setupFnc(scratchDir, meshSize=meshSize, romSize=romSize, basisDir=basisDir):
+          myutils.createInputFileRom(meshSize, romSize, scratchDir+"/input.txt")
+          os.system("rm -rf "+scratchDir+"/basis.txt")
+          os.system("ln -s "+basisDir+"/basis.txt "+scratchDir+"/basis.txt")
+        for i in store.missingReplicas(meshSize, romSize, constants.numSamplesForTiming):
+          name = "meshSize{}_basis{}_replica{}".format(meshSize, romSize, i)
+          jobs.append(sweep_scheduler.SweepJob(name, (os.path.abspath(exeName), "input.txt"),
+                                               int(meshSize), setupFnc))
+          jobKeys[name] = (meshSize, romSize, i)
+
+    def onJobDone(res):
+      if res.returnCode_ != 0:
+        print(res.output_)
+        return
+      meshSize, romSize, i = jobKeys[res.job_.name_]
+      time = findTiming(res.output_)
+      print("meshSize = ", meshSize, " romSize = ", romSize, " replica # = ", i, " time = ", time)
+      store.append(meshSize, romSize, i, numSteps(meshSize), time,
+                   {'processWall': res.elapsed_},
+                   timing_store.threadInfo(scheduler.jobEnv()))
+      # outputs of the replica are in its scratch dir
+      saveOutputs(res.scratchDir_ + "/", meshSize, romSize)
+
+    for res in scheduler.run(jobs, onJobDone):
+      if res.returnCode_ != 0:
+        sys.exit("job " + res.job_.name_ + " failed")
+
+  else:
+    # loop over mesh sizes
+    for iMesh in range(0, constants.num_meshes):
+      currMeshSize = constants.mesh_sizes[iMesh]
+      print("Current currMeshSize = ", currMeshSize)
+
+      # loop over ROM sizes
+      for iRom in range(0, constants.num_rom_sizes):
+        # print current rom size
+        romSize = constants.rom_sizes[iRom]
+        print("Current romSize = ", romSize)
+
+        replicas = store.missingReplicas(currMeshSize, romSize, constants.numSamplesForTiming)
+        if len(replicas) == 0:
+          print("already done, skipping")
+          continue
+
+        # create input file (we only need one since the same
+        # is used to run multiple replicas)
+        myutils.createInputFileRom(currMeshSize, romSize)
+
+        # link basis file
+        subs1 = "meshSize" + str(currMeshSize)
+        subs2 = "basis" + str(romSize)
+        basisDir = basisParentDir + "/" + subs1 + "/" + subs2
+        # always remove the link to basis to make sure we link the right one
+        os.system("rm -rf ./basis.txt")
+        os.system("ln -s "+basisDir+"/basis.txt ./basis.txt")
+
+        #--- loop over samples ---
+        for i in replicas:
+          startTime = time.perf_counter()
+          popen = subprocess.Popen(args, stdout=subprocess.PIPE)
+          popen.wait()
+          wallTime = time.perf_counter() - startTime
+          output = popen.stdout.read()
+          #print( str(output))
+          #os.system("./" + exeName + " input.txt")
+
+          # find timing and store it
+          elapsed = findTiming(output)
+          print("time = ", elapsed)
+          store.append(currMeshSize, romSize, i, numSteps(currMeshSize), elapsed,
+                       {'processWall': wallTime})
+          saveOutputs("", currMeshSize, romSize)
+
+  # write timings file with time per step:
+  # - first col  = mesh size
+  # - second col = rom size
+  # - then       = timings
+  data = store.timingsMatrix()
+  np.savetxt(exeName+"_timings.txt", data, fmt='%.15f')
 
   np.set_printoptions(edgeitems=10, linewidth=100000)
   print(data)
@@ -106,5 +144,6 @@ if __name__== "__main__":
   parser.add_argument("-exe", "--exe", dest="exeName")
   parser.add_argument("-basis-dir-name", "--basis-dir-name",
                       dest="basisDirName")
+  sweep_scheduler.addSchedulerArgs(parser)
   args = parser.parse_args()
-  main(args.exeName, args.basisDirName)
+  main(args.exeName, args.basisDirName, args)
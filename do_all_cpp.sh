@@ -26,6 +26,9 @@ else
     echo "--with-env-script NOT set, so we assume env is set already"
 fi
 
+# revision of these sources, recorded with each timing (see common/timing_store.py)
+export GIT_REVISION=$(git -C ${TOPDIR} rev-parse HEAD 2>/dev/null || echo unknown)
+
 # create working dir if not existing
 [[ ! -d ${WORKINGDIR} ]] && mkdir ${WORKINGDIR}
 
@@ -71,6 +74,9 @@ if [[ $WHICHTASK == *"fom"* ]]; then
     [[ $WHICHTASK == *"rk4"* ]] && cp ${TOPDIR}/common/constants_galerkin.py ${destDir}/constants.py
     cp ${TOPDIR}/cpp/src/input.template ${destDir}
     cp ${TOPDIR}/cpp/run_scripts/myutils.py ${destDir}/
+    cp ${TOPDIR}/common/sweep_scheduler.py ${destDir}/
+    cp ${TOPDIR}/common/timing_store.py ${destDir}/
+    cp ${TOPDIR}/common/timing_stats.py ${destDir}/
 
     if [[ $WHICHTASK == *"timing"* ]]; then
 	cp ${TOPDIR}/cpp/run_scripts/run_fom_timing.py ${destDir}/
@@ -88,7 +94,7 @@ if [[ $WHICHTASK == *"fom"* ]]; then
 
     # enter and run
     cd ${destDir}
-    python ${PYTHONEXE} --exe ${EXENAME}
+    python ${PYTHONEXE} --exe ${EXENAME} $(scheduler_args)
     cd ${TOPDIR}
 fi
 
@@ -129,12 +135,15 @@ then
 
     # copy all python scripts there
     cp ${TOPDIR}/cpp/run_scripts/myutils.py ${destDir}/
+    cp ${TOPDIR}/common/sweep_scheduler.py ${destDir}/
+    cp ${TOPDIR}/common/timing_store.py ${destDir}/
+    cp ${TOPDIR}/common/timing_stats.py ${destDir}/
     cp ${TOPDIR}/cpp/run_scripts/run_rom_timing.py ${destDir}/
     [[ $WHICHTASK = "lspg" ]] && cp ${TOPDIR}/common/constants_lspg.py ${destDir}/constants.py
     [[ $WHICHTASK = "galerkin" ]] && cp ${TOPDIR}/common/constants_galerkin.py ${destDir}/constants.py
 
     # enter there and run
     cd ${destDir}
-    python run_rom_timing.py --exe ${EXENAME} --basis-dir-name=${BASISDIRNAME}
+    python run_rom_timing.py --exe ${EXENAME} --basis-dir-name=${BASISDIRNAME} $(scheduler_args)
     cd ${TOPDIR}
 fi
@@ -26,6 +26,9 @@ else
     echo "--with-env-script NOT set, so we assume env is set already"
 fi
 
+# revision of these sources, recorded with each timing (see common/timing_store.py)
+export GIT_REVISION=$(git -C ${TOPDIR} rev-parse HEAD 2>/dev/null || echo unknown)
+
 # create working dir if not existing
 [[ ! -d ${WORKINGDIR} ]] && mkdir ${WORKINGDIR}
 
@@ -33,6 +36,20 @@ fi
 PYWORKINGDIR=${WORKINGDIR}/python
 [[ ! -d ${PYWORKINGDIR} ]] && mkdir ${PYWORKINGDIR}
 
+# numba kernels are cached on disk (cache=True) in one place shared by
+# all the run dirs, so only the first process pays for the compilation
+export NUMBA_CACHE_DIR=${NUMBA_CACHE_DIR:-${PYWORKINGDIR}/numba_cache}
+
+# builds the ahead of time compiled kernels in the run dir $1, where
+# burgers1d.py must already be, and makes burgers1d.py use them
+function build_aot_kernels(){
+    cp ${TOPDIR}/python/src/build_aot_kernels.py $1/
+    cd $1
+    python build_aot_kernels.py
+    cd ${TOPDIR}
+    export BURGERS1D_AOT=1
+}
+
 ## wipe everything if set to 1
 #[[ $WIPEEXISTING = 1 ]] && rm -rf ${PYWORKINGDIR}/*
 
@@ -43,13 +60,102 @@ if [ $WHICHTASK = "build" ]; then
     source ${TOPDIR}/python/build_scripts/build.sh
 fi
 
+#---------------------------
+# fom timing or basis with the python fom
+#---------------------------
+if [[ $WHICHTASK == *"fom"* ]]; then
+    # create folder inside workindir
+    destDir=${PYWORKINGDIR}/"data_"${WHICHTASK}
+    [[ ! -d ${destDir} ]] && mkdir ${destDir}
+
+    # python counterparts of the c++ executables
+    EXENAME=
+    [[ $WHICHTASK == *"fom_bdf1"* ]] && EXENAME=main_fom_bdf1.py
+    [[ $WHICHTASK == *"fom_rk4"* ]] && EXENAME=main_fom_rk4.py
+
+    # copy the template input, the run scripts shared with c++ and the sources
+    [[ $WHICHTASK == *"bdf1"* ]] && cp ${TOPDIR}/common/constants_lspg.py ${destDir}/constants.py
+    [[ $WHICHTASK == *"rk4"* ]] && cp ${TOPDIR}/common/constants_galerkin.py ${destDir}/constants.py
+    cp ${TOPDIR}/cpp/src/input.template ${destDir}
+    cp ${TOPDIR}/cpp/run_scripts/myutils.py ${destDir}/
+    cp ${TOPDIR}/common/sweep_scheduler.py ${destDir}/
+    cp ${TOPDIR}/common/timing_store.py ${destDir}/
+    cp ${TOPDIR}/common/timing_stats.py ${destDir}/
+    cp ${TOPDIR}/cpp/run_scripts/run_fom_timing.py ${destDir}/
+    cp ${TOPDIR}/cpp/run_scripts/run_fom_basis.py ${destDir}/
+    for f in burgers1d.py fom.py incremental_svd.py adaptive_stepping.py basis_io.py main_fom_bdf1.py main_fom_rk4.py; do
+	cp ${TOPDIR}/python/src/${f} ${destDir}/
+    done
+    [[ ${AOTKERNELS} == yes ]] && build_aot_kernels ${destDir}
+
+    PYTHONEXE=
+    [[ $WHICHTASK == *"timing"* ]] && PYTHONEXE=run_fom_timing.py
+    [[ $WHICHTASK == *"basis"* ]] && PYTHONEXE=run_fom_basis.py
+
+    # enter and run
+    cd ${destDir}
+    python ${PYTHONEXE} --exe ${EXENAME} $(scheduler_args)
+    cd ${TOPDIR}
+fi
+
+#---------------------------
+# callback overhead microbenchmarks
+#---------------------------
+if [ $WHICHTASK = "callback_overhead" ]; then
+    destDir=${PYWORKINGDIR}/"data_"${WHICHTASK}
+    [[ ! -d ${destDir} ]] && mkdir ${destDir}
+
+    # the pressio4py cases are skipped if the bindings are not built
+    if [[ -f ${PYWORKINGDIR}/build/pressio4pyGalerkin.so ]]; then
+	[[ -f ${destDir}/pressio4pyGalerkin.so ]] && rm ${destDir}/pressio4pyGalerkin.so
+	ln -s ${PYWORKINGDIR}/build/pressio4pyGalerkin.so ${destDir}
+    fi
+
+    cp ${TOPDIR}/python/run_scripts/run_callback_overhead.py ${destDir}/
+    cp ${TOPDIR}/common/timing_store.py ${destDir}/
+    cp ${TOPDIR}/common/timing_stats.py ${destDir}/
+    cp ${TOPDIR}/common/constants_galerkin.py ${destDir}/constants.py
+    cp ${TOPDIR}/python/src/burgers1d.py ${destDir}/
+
+    cd ${destDir}
+    python run_callback_overhead.py
+    cd ${TOPDIR}
+fi
+
+#---------------------------
+# startup (import time) benchmark of the rom drivers, fails if over budget
+#---------------------------
+if [ $WHICHTASK = "import_time" ]; then
+    destDir=${PYWORKINGDIR}/"data_"${WHICHTASK}
+    [[ ! -d ${destDir} ]] && mkdir ${destDir}
+
+    # main_rom_galerkin is skipped if the bindings are not built
+    if [[ -f ${PYWORKINGDIR}/build/pressio4pyGalerkin.so ]]; then
+	[[ -f ${destDir}/pressio4pyGalerkin.so ]] && rm ${destDir}/pressio4pyGalerkin.so
+	ln -s ${PYWORKINGDIR}/build/pressio4pyGalerkin.so ${destDir}
+    fi
+
+    cp ${TOPDIR}/python/run_scripts/run_import_time.py ${destDir}/
+    cp ${TOPDIR}/common/timing_store.py ${destDir}/
+    cp ${TOPDIR}/common/timing_stats.py ${destDir}/
+    for f in burgers1d.py basis_io.py instrumentation.py precision.py rom_galerkin.py rom_lspg.py \
+	     main_rom_galerkin.py main_rom_galerkin_native.py main_rom_lspg.py; do
+	cp ${TOPDIR}/python/src/${f} ${destDir}/
+    done
+    [[ ${AOTKERNELS} == yes ]] && build_aot_kernels ${destDir}
+
+    cd ${destDir}
+    python run_import_time.py
+    cd ${TOPDIR}
+fi
+
 #---------------------------
 # rom: lspg or galerkin
 #---------------------------
 if [ $WHICHTASK = "lspg" ] || [ $WHICHTASK = "galerkin" ];
 then
-    # check if the build was already done
-    if [ ! -d ${PYWORKINGDIR}/build ]; then
+    # check if the build was already done (only needed for the bindings)
+    if [[ ${BACKEND} == pressio4py && ! -d ${PYWORKINGDIR}/build ]]; then
 	echo "there is no build in the target folder, do that first"
 	exit 0
     fi
@@ -71,34 +177,56 @@ then
     EXENAME=
     [[ $WHICHTASK = "lspg" ]] && EXENAME=main_rom_lspg
     [[ $WHICHTASK = "galerkin" ]] && EXENAME=main_rom_galerkin
+    [[ $WHICHTASK = "galerkin" && ${BACKEND} == native ]] && EXENAME=main_rom_galerkin_native
 
     # link the bindings library
-    if [ $WHICHTASK = "lspg" ]; then
+    if [[ $WHICHTASK = "lspg" && ${BACKEND} == pressio4py ]]; then
 	[[ -f ${destDir}/pressio4pyLspg.so ]] && rm ${destDir}/pressio4pyLspg.so
 	ln -s ${PYWORKINGDIR}/build/pressio4pyLspg.so ${destDir}
     fi
-    if [ $WHICHTASK = "galerkin" ]; then
+    if [[ $WHICHTASK = "galerkin" && ${BACKEND} == pressio4py ]]; then
 	[[ -f ${destDir}/pressio4pyGalerkin.so ]] && rm ${destDir}/pressio4pyGalerkin.so
 	ln -s ${PYWORKINGDIR}/build/pressio4pyGalerkin.so ${destDir}
     fi
 
     # copy all pything scripts there
     cp ${TOPDIR}/python/run_scripts/run_rom_timing.py ${destDir}/
+    cp ${TOPDIR}/python/run_scripts/timing_harness.py ${destDir}/
+    cp ${TOPDIR}/common/sweep_scheduler.py ${destDir}/
+    cp ${TOPDIR}/common/timing_store.py ${destDir}/
+    cp ${TOPDIR}/common/timing_stats.py ${destDir}/
     cp ${TOPDIR}/python/src/burgers1d.py ${destDir}/
+    cp ${TOPDIR}/python/src/hyperreduction.py ${destDir}/
+    cp ${TOPDIR}/python/src/basis_io.py ${destDir}/
+    cp ${TOPDIR}/python/src/instrumentation.py ${destDir}/
+    cp ${TOPDIR}/python/src/precision.py ${destDir}/
+    cp ${TOPDIR}/python/src/main_sample_mesh.py ${destDir}/
     if [ $WHICHTASK = "lspg" ]; then
 	cp ${TOPDIR}/python/src/main_rom_lspg.py ${destDir}/
+	cp ${TOPDIR}/python/src/rom_lspg.py ${destDir}/
 	cp ${TOPDIR}/common/constants_lspg.py ${destDir}/constants.py
     fi
     if [ $WHICHTASK = "galerkin" ]; then
 	cp ${TOPDIR}/python/src/main_rom_galerkin.py ${destDir}/
+	cp ${TOPDIR}/python/src/main_rom_galerkin_native.py ${destDir}/
+	cp ${TOPDIR}/python/src/rom_galerkin.py ${destDir}/
+	cp ${TOPDIR}/python/src/adaptive_stepping.py ${destDir}/
 	cp ${TOPDIR}/common/constants_galerkin.py ${destDir}/constants.py
     fi
+    [[ ${AOTKERNELS} == yes ]] && build_aot_kernels ${destDir}
 
     USEDENSE=0
     [[ ${JACOBIANTYPE} == dense ]] && USEDENSE=1
+    [[ ${JACOBIANTYPE} == banded ]] && USEDENSE=2
+
+    # store a binary copy of each basis next to its txt (no-op if up to date)
+    cp ${TOPDIR}/python/src/convert_basis.py ${destDir}/
+    cd ${destDir}
+    python convert_basis.py --root-dir=${WORKINGDIR}/cpp
+    cd ${TOPDIR}
 
     # enter there and run
     cd ${destDir}
-    python run_rom_timing.py --exe=${EXENAME} --basis-dir-name=${BASISDIRNAME} -dense-jac=${USEDENSE}
+    python run_rom_timing.py --exe=${EXENAME} --basis-dir-name=${BASISDIRNAME} -dense-jac=${USEDENSE} --backend=${BACKEND} $(scheduler_args)
     cd ${TOPDIR}
 fi
@@ -8,6 +8,10 @@ from scipy import stats
 from argparse import ArgumentParser
 import matplotlib.pyplot as plt
 
+# timing_store lives in common/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "common"))
+import timing_store
+
 np.set_printoptions(edgeitems=10, linewidth=100000)
 
 def extractMeshSizes(data):
@@ -63,8 +67,21 @@ def createDicByRomSize(data):
       dic[thisRomSize] = [data[i][2]]
   return dic
 
+def createErrDicByRomSize(summary):
+  # same as createDicByRomSize but for the error bars from the summary
+  # (mesh, rom, mean, ciLow, ciHigh, ...): value = [mean-ciLow, ciHigh-mean]
+  dic = {}
+  for i in range(summary.shape[0]):
+    thisRomSize = str(int(summary[i][1]))
+    err = [summary[i][2]-summary[i][3], summary[i][4]-summary[i][2]]
+    dic.setdefault(thisRomSize, [[], []])
+    dic[thisRomSize][0].append(err[0])
+    dic[thisRomSize][1].append(err[1])
+  return dic
 
-def doPlot(cppDic, pyDic, meshSizes, meshLabels, romSizes, romSizesStr, fileName):
+
+def doPlot(cppDic, pyDic, meshSizes, meshLabels, romSizes, romSizesStr, fileName,
+           cppErrDic=None, pyErrDic=None):
   # number of mesh sizes to deal with
   numMeshes = len(meshLabels)
 
@@ -85,6 +102,12 @@ def doPlot(cppDic, pyDic, meshSizes, meshLabels, romSizes, romSizesStr, fileName
              markerfacecolor='none', color=colors['cpp'], linewidth=lw)
     plt.plot(meshSizes, pyData,  '-', marker=mark[it], markersize=ms,
              markerfacecolor='none', color=colors['py'], linewidth=lw)
+    # confidence intervals
+    if cppErrDic is not None:
+      plt.errorbar(meshSizes, cppData, yerr=np.asarray(cppErrDic[currRomSize])*1000,
+                   fmt='none', ecolor=colors['cpp'], capsize=3)
+      plt.errorbar(meshSizes, pyData, yerr=np.asarray(pyErrDic[currRomSize])*1000,
+                   fmt='none', ecolor=colors['py'], capsize=3)
 
   plt.xscale('log')
   plt.yscale('log')
@@ -129,7 +152,9 @@ def main(cppFile, pyFile, romName, statType, fileName):
     raise Exception('The file {} does not exist. '.format(pyFile))
 
   # load data
-  cppData, pyData = np.loadtxt(cppFile), np.loadtxt(pyFile)
+  # either the legacy *_timings.txt or the *_timings.jsonl store
+  cppData = timing_store.loadTimingsMatrix(cppFile)
+  pyData  = timing_store.loadTimingsMatrix(pyFile)
 
   # extract mesh sizes from cpp and python
   cppMeshSizes, pyMeshSizes = extractMeshSizes(cppData), extractMeshSizes(pyData)
@@ -150,8 +175,15 @@ def main(cppFile, pyFile, romName, statType, fileName):
   print(romSizesStr)
 
   # compute the timings stat
-  cppDataAvg = computeTimingsStat(cppData, "c++", statType)
-  pyDataAvg  = computeTimingsStat(pyData, "py", statType)
+  cppErrDic, pyErrDic = None, None
+  if statType == "ci":
+    # mean and confidence interval from all the replicas
+    cppDataAvg = timing_store.loadTimingsSummary(cppFile)
+    pyDataAvg  = timing_store.loadTimingsSummary(pyFile)
+    cppErrDic, pyErrDic = createErrDicByRomSize(cppDataAvg), createErrDicByRomSize(pyDataAvg)
+  else:
+    cppDataAvg = computeTimingsStat(cppData, "c++", statType)
+    pyDataAvg  = computeTimingsStat(pyData, "py", statType)
   print(cppDataAvg)
   print(pyDataAvg)
 
@@ -159,21 +191,26 @@ def main(cppFile, pyFile, romName, statType, fileName):
   cppDic, pyDic = createDicByRomSize(cppDataAvg), createDicByRomSize(pyDataAvg)
 
   #do regular or stacked plot
-  doPlot(cppDic, pyDic, meshSizes, meshLabels, romSizes, romSizesStr, fileName)
+  doPlot(cppDic, pyDic, meshSizes, meshLabels, romSizes, romSizesStr, fileName,
+         cppErrDic, pyErrDic)
   plt.show()
 
 #////////////////////////////////////////////
 if __name__== "__main__":
   parser = ArgumentParser()
-  parser.add_argument("-cpp-file", "--cpp-file", dest="cppFile")
-  parser.add_argument("-py-file",  "--py-file", dest="pyFile")
+  parser.add_argument("-cpp-file", "--cpp-file", dest="cppFile",
+                      help = "timings of the c++ runs, .txt or .jsonl")
+  parser.add_argument("-py-file",  "--py-file", dest="pyFile",
+                      help = "timings of the python runs, .txt or .jsonl")
   parser.add_argument("-method",       "--method", dest="romName",
                       help = "The ROM method you are trying to plot: lspg or galerkin" )
   parser.add_argument("-stat-type",    "--stat-type", dest="statType",
                       help = "Which statistic to compute from data: \
                               mean, gmean (geometric mean), q50 (50th percentile), \
                               worst (min of c++ and max of Python to show worst case),\
-                              best (max of c++ and min of Python to show best case)")
+                              best (max of c++ and min of Python to show best case),\
+                              ci (mean without outliers with 95% confidence interval \
+                              error bars, from all replicas of the .jsonl store)")
   parser.add_argument("-filename",       "--filename", dest="fileName",
                       help = "The file name to print figure")
   args = parser.parse_args()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+import sys, os, time
+import numpy as np
+from scipy.linalg import blas
+from numba import njit
+from argparse import ArgumentParser
+
+import constants
+import timing_store
+from burgers1d import Burgers1dDenseJacobian, velocityImplNumba
+
+#-------------------------------------------------------------------------
+# microbenchmarks of the cost of one python callback as done by the
+# pressio C++ core (see playground/main_rom_galerkin_play.py), one layer
+# at a time so the layers can be subtracted from each other:
+#
+#   loop                    : empty python loop, baseline of all the others
+#   emptyCallback           : bound method doing nothing, looked up once
+#   emptyCallbackAttrLookup : same but obj.method looked up at every call
+#   numpyView               : numpy array wrapping existing memory without
+#                             copy, as the bindings do for each argument
+#   numbaDispatch           : empty numba kernel with the velocity signature,
+#                             i.e. only the type checks of the dispatcher
+#   blasDgemv               : phi^T f through scipy.linalg.blas (per rom size)
+#   velocityKernel          : numba velocity kernel called directly
+#   velocity                : full app.velocity(u, t)
+#   pressio4pyApplyMapping  : decoder.applyMapping (per rom size), only if
+#                             the pressio4pyGalerkin bindings can be imported
+#
+# Each case is a function (meshSize, romSize) -> run(nRounds) doing nRounds
+# calls. Every replica goes to the timing store (common/timing_store.py)
+# with numSteps = nRounds, so timePerStep is the time of one call, and
+# config {'benchmark': 'callbackOverhead', 'case': name}.
+#-------------------------------------------------------------------------
+
+@njit(["void(float64[:], f8, float64[:], float64[:], f8, f8)"])
+def emptyKernelNumba(u, t, f, expVec, dxInvHalf, mu0):
+  pass
+
+
+class EmptyCallbackApp:
+  def __init__(self, Ncell):
+    self.f_ = np.zeros(Ncell)
+
+  def velocity(self, u, t):
+    return self.f_
+
+
+def loopCase(meshSize, romSize):
+  def run(nRounds):
+    for i in range(nRounds):
+      pass
+  return run
+
+def emptyCallbackCase(meshSize, romSize):
+  u = np.ones(meshSize)
+  fnc = EmptyCallbackApp(meshSize).velocity
+  def run(nRounds):
+    for i in range(nRounds):
+      fnc(u, 0.)
+  return run
+
+def emptyCallbackAttrLookupCase(meshSize, romSize):
+  u = np.ones(meshSize)
+  appObj = EmptyCallbackApp(meshSize)
+  def run(nRounds):
+    for i in range(nRounds):
+      appObj.velocity(u, 0.)
+  return run
+
+def numpyViewCase(meshSize, romSize):
+  u = np.ones(meshSize)
+  def run(nRounds):
+    for i in range(nRounds):
+      np.ndarray(u.shape, dtype=np.float64, buffer=u)
+  return run
+
+def numbaDispatchCase(meshSize, romSize):
+  appObj = Burgers1dDenseJacobian(meshSize)
+  u, f = np.ones(meshSize), np.zeros(meshSize)
+  expVec, dxInvHalf, mu0 = appObj.expVec_, appObj.dxInvHalf_, appObj.mu_[0]
+  def run(nRounds):
+    for i in range(nRounds):
+      emptyKernelNumba(u, 0., f, expVec, dxInvHalf, mu0)
+  return run
+
+def blasDgemvCase(meshSize, romSize):
+  phi = np.asfortranarray(np.random.rand(meshSize, romSize))
+  f, rhs = np.ones(meshSize), np.zeros(romSize)
+  def run(nRounds):
+    for i in range(nRounds):
+      blas.dgemv(1., phi, f, 0., rhs, trans=1, overwrite_y=1)
+  return run
+
+def velocityKernelCase(meshSize, romSize):
+  appObj = Burgers1dDenseJacobian(meshSize)
+  u, f = np.ones(meshSize), np.zeros(meshSize)
+  expVec, dxInvHalf, mu0 = appObj.expVec_, appObj.dxInvHalf_, appObj.mu_[0]
+  def run(nRounds):
+    for i in range(nRounds):
+      velocityImplNumba(u, 0., f, expVec, dxInvHalf, mu0)
+  return run
+
+def velocityCase(meshSize, romSize):
+  u = np.ones(meshSize)
+  fnc = Burgers1dDenseJacobian(meshSize).velocity
+  def run(nRounds):
+    for i in range(nRounds):
+      fnc(u, 0.)
+  return run
+
+def pressio4pyApplyMappingCase(meshSize, romSize):
+  import pressio4pyGalerkin
+  decoder = pressio4pyGalerkin.LinearDecoder(np.random.rand(meshSize, romSize))
+  yRom, yFom = np.ones(romSize), np.zeros(meshSize)
+  def run(nRounds):
+    for i in range(nRounds):
+      decoder.applyMapping(yRom, yFom)
+  return run
+
+
+# name -> (case function, depends on rom size, needs the pressio4py bindings)
+cases = {'loop'                   : (loopCase, False, False),
+         'emptyCallback'          : (emptyCallbackCase, False, False),
+         'emptyCallbackAttrLookup': (emptyCallbackAttrLookupCase, False, False),
+         'numpyView'              : (numpyViewCase, False, False),
+         'numbaDispatch'          : (numbaDispatchCase, False, False),
+         'blasDgemv'              : (blasDgemvCase, True, False),
+         'velocityKernel'         : (velocityKernelCase, False, False),
+         'velocity'               : (velocityCase, False, False),
+         'pressio4pyApplyMapping' : (pressio4pyApplyMappingCase, True, True)}
+
+
+def havePressio4py():
+  try:
+    import pressio4pyGalerkin
+    return True
+  except ImportError:
+    return False
+
+
+def createStore(fileName, caseName, numRounds):
+  return timing_store.TimingStore(fileName, {'benchmark': 'callbackOverhead',
+                                             'case': caseName, 'numRounds': int(numRounds)})
+
+
+def runCase(store, caseName, meshSize, romSize, numRounds, numReplicas):
+  replicas = store.missingReplicas(meshSize, romSize, numReplicas)
+  if len(replicas) == 0:
+    print(caseName, " meshSize = ", meshSize, " romSize = ", romSize, " already done, skipping")
+    return
+  caseFnc, _, _ = cases[caseName]
+  run = caseFnc(int(meshSize), int(romSize))
+  # warm up: numba dispatch caches, blas/bindings first calls
+  run(10)
+  for replica in replicas:
+    startTime = time.perf_counter()
+    run(numRounds)
+    elapsed = time.perf_counter() - startTime
+    store.append(meshSize, romSize, replica, numRounds, elapsed)
+
+
+def main(storeFile, caseNames, meshSizes, romSizes, numRounds, numReplicas):
+  withPressio = havePressio4py()
+  for caseName in caseNames:
+    _, perRomSize, needsPressio = cases[caseName]
+    if needsPressio and not withPressio:
+      print("pressio4pyGalerkin not found, skipping ", caseName)
+      continue
+
+    store = createStore(storeFile, caseName, numRounds)
+    for meshSize in meshSizes:
+      for romSize in (romSizes if perRomSize else [0]):
+        runCase(store, caseName, meshSize, romSize, numRounds, numReplicas)
+
+    # median time per call of each (mesh, rom)
+    summary = timing_store.loadTimingsSummary(storeFile, store.config_)
+    for row in summary:
+      print("{:24s} meshSize = {:6d} romSize = {:4d}  time/call = {:.3e} s".format(
+        caseName, int(row[0]), int(row[1]), row[5]))
+
+
+if __name__== "__main__":
+  parser = ArgumentParser()
+  parser.add_argument("-store", "--store", dest="storeFile", default="callback_overhead.jsonl")
+  parser.add_argument("-cases", "--cases", dest="caseNames", nargs="+",
+                      default=list(cases.keys()), choices=list(cases.keys()))
+  parser.add_argument("-mesh-sizes", "--mesh-sizes", dest="meshSizes", type=int, nargs="+",
+                      default=[int(m) for m in constants.mesh_sizes])
+  parser.add_argument("-rom-sizes", "--rom-sizes", dest="romSizes", type=int, nargs="+",
+                      default=[int(r) for r in constants.rom_sizes],
+                      help="only used by the rom size dependent cases")
+  parser.add_argument("-num-rounds", "--num-rounds", dest="numRounds", type=int, default=10000,
+                      help="calls per replica")
+  parser.add_argument("-num-replicas", "--num-replicas", dest="numReplicas", type=int,
+                      default=constants.numSamplesForTiming)
+  args = parser.parse_args()
+  main(os.path.abspath(args.storeFile), args.caseNames, args.meshSizes, args.romSizes,
+       args.numRounds, args.numReplicas)
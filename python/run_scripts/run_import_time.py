@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import sys, os, time
+import subprocess
+import numpy as np
+from argparse import ArgumentParser
+
+import timing_store
+
+#-------------------------------------------------------------------------
+# startup benchmark of the python ROM entry points: each module is
+# imported in a fresh "python -X importtime -c 'import <module>'" and the
+# cumulative import time of the module itself is read from the report
+# (which, for the drivers, includes numpy/numba/scipy, loading the cached
+# numba kernels, ...). One untimed import first fills the numba cache, so
+# what is measured is what every replica after the first one pays.
+#
+# Each replica goes to the timing store (common/timing_store.py) with
+# meshSize = romSize = 0, numSteps = 1 and config
+# {'benchmark': 'importTime', 'module': name, 'gitRev': revision}, so that
+# the budget is checked on runs of the current sources only. The median
+# of each module is checked against its budget (s) and the script exits
+# with an error if any is over budget; the heaviest imports (self time)
+# are printed to see what to blame.
+# Modules that cannot be imported (e.g. no pressio4py bindings) are skipped.
+#-------------------------------------------------------------------------
+
+importTimeBudgets = {'main_rom_galerkin_native': 1.0,
+                     'main_rom_lspg'           : 1.0,
+                     'main_rom_galerkin'       : 1.0}
+
+# {module: (self, cumulative)} times in seconds from the -X importtime report
+def importTimes(moduleName):
+  args = [sys.executable, "-X", "importtime", "-c", "import " + moduleName]
+  popen = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  if popen.returncode != 0:
+    return None
+  res = {}
+  for line in popen.stderr.decode().splitlines():
+    # import time: self [us] | cumulative | imported package
+    if not line.startswith("import time:") or "imported package" in line:
+      continue
+    selfUs, cumulativeUs, name = line[len("import time:"):].split("|")
+    # a module appears once, the first time it is imported
+    res[name.strip()] = (int(selfUs)*1e-6, int(cumulativeUs)*1e-6)
+  return res
+
+
+def printHeaviest(times, numTop):
+  print("heaviest imports (self time):")
+  for name, (selfTime, cumTime) in sorted(times.items(), key=lambda v: -v[1][0])[:numTop]:
+    print("  {:40s} self = {:.4f} s  cumulative = {:.4f} s".format(name, selfTime, cumTime))
+
+
+def main(storeFile, moduleNames, numReplicas, budgets, numTop):
+  overBudget = []
+  for moduleName in moduleNames:
+    # untimed: fills the numba cache, and checks the module can be imported
+    if importTimes(moduleName) is None:
+      print(moduleName, " cannot be imported, skipping")
+      continue
+
+    store = timing_store.TimingStore(storeFile, {'benchmark': 'importTime',
+                                                 'module': moduleName,
+                                                 'gitRev': timing_store.gitRevision()})
+    for replica in store.missingReplicas(0, 0, numReplicas):
+      times = importTimes(moduleName)
+      store.append(0, 0, replica, 1, times[moduleName][1])
+    printHeaviest(importTimes(moduleName), numTop)
+
+    median = np.median([r['time'] for r in store.rows()])
+    budget = budgets.get(moduleName, None)
+    print("{:28s} import time median = {:.4f} s  budget = {}".format(moduleName, median, budget))
+    if budget is not None and median > budget:
+      overBudget.append(moduleName)
+
+  if len(overBudget) > 0:
+    sys.exit("import time over budget: " + " ".join(overBudget))
+
+
+if __name__== "__main__":
+  parser = ArgumentParser()
+  parser.add_argument("-store", "--store", dest="storeFile", default="import_time.jsonl")
+  parser.add_argument("-modules", "--modules", dest="moduleNames", nargs="+",
+                      default=list(importTimeBudgets.keys()))
+  parser.add_argument("-num-replicas", "--num-replicas", dest="numReplicas", type=int, default=10)
+  parser.add_argument("-budget", "--budget", dest="budget", type=float, default=None,
+                      help="budget (s) for all the modules instead of the default ones")
+  parser.add_argument("-num-top", "--num-top", dest="numTop", type=int, default=10,
+                      help="number of heaviest imports printed per module")
+  args = parser.parse_args()
+  budgets = dict(importTimeBudgets)
+  if args.budget is not None:
+    budgets = {m: args.budget for m in args.moduleNames}
+  main(os.path.abspath(args.storeFile), args.moduleNames, args.numReplicas, budgets, args.numTop)
@@ -1,108 +1,166 @@
 #!/usr/bin/env python
 
 import sys, os, time
-import subprocess
 import numpy as np
 import os.path
-import re
 from argparse import ArgumentParser
 
 import constants
-
-def main(exename, basisDirName, denseJac):
-
-  # data stored as:
-  # - first col  = mesh size
-  # - second col = rom size
-  # - then       = timings
-  nRows = constants.num_meshes * constants.num_rom_sizes
-  nCols = constants.numSamplesForTiming+2
-  data = np.zeros((nRows, nCols))
+import timing_harness, timing_store
+import sweep_scheduler
+
+# links basis.txt (and basis.npy if present) of basisDir into destDir
+def linkBasis(basisDir, destDir):
+  # always remove the link to basis to make sure we link the right one
+  os.system("rm -rf "+destDir+"/basis.txt "+destDir+"/basis.npy")
+  os.system("ln -s "+basisDir+"/basis.txt "+destDir+"/basis.txt")
+  # binary basis (see convert_basis.py) is picked over the txt if present
+  if os.path.isfile(basisDir+"/basis.npy"):
+    os.system("ln -s "+basisDir+"/basis.npy "+destDir+"/basis.npy")
+
+
+# mean time per step of each instrumented phase per (mesh, rom) config:
+#   meshSize, romSize, then one col per phase (sorted by name)
+def savePhasesSummary(store, fileName):
+  byConfig = {}
+  for r in store.rows():
+    byConfig.setdefault((r['meshSize'], r['romSize']), []).append(r['instrumentation'])
+  if len(byConfig) == 0: return
+  names = sorted(n for n, v in list(byConfig.values())[0][0].items() if isinstance(v, dict))
+  data = np.zeros((len(byConfig), 2+len(names)))
+  for iRow, key in enumerate(sorted(byConfig.keys())):
+    data[iRow, :2] = key
+    data[iRow, 2:] = [np.mean([rep[n]['timePerStep'] for rep in byConfig[key]]) for n in names]
+  np.savetxt(fileName, data, fmt='%.15e', header="meshSize romSize " + " ".join(names))
+
+
+# cold start (see timing_harness.timeInSubprocess) per (mesh, rom) config:
+#   meshSize, romSize, mean, median, min, max (s)
+def saveColdStartSummary(store, fileName):
+  byConfig = {}
+  for r in store.rows():
+    # rows stored before the cold start was measured have none
+    if r['phases'].get('coldStart') is not None:
+      byConfig.setdefault((r['meshSize'], r['romSize']), []).append(r['phases']['coldStart'])
+  data = np.zeros((len(byConfig), 6))
+  for iRow, key in enumerate(sorted(byConfig.keys())):
+    x = byConfig[key]
+    data[iRow] = [key[0], key[1], np.mean(x), np.median(x), np.min(x), np.max(x)]
+  np.savetxt(fileName, data, fmt='%.15e', header="meshSize romSize mean median min max")
+
+
+def main(exename, basisDirName, denseJac, backend, mode, schedArgs, adaptiveOptions=None,
+         instrument=False):
+
+  # one row per replica goes to the store, which is also used to
+  # restart an interrupted sweep: done replicas are not rerun
+  storeFile = os.path.abspath(exename+"_timings.jsonl")
+  store = timing_harness.createStore(storeFile, exename, denseJac, backend, mode, constants.dt,
+                                     adaptiveOptions, instrument)
 
   # store parent directory where all basis are stored
   basisParentDir = os.getcwd() + "/../../cpp/data_" + basisDirName
 
-  # loop over mesh sizes
-  iRow = -1
+  # list all configurations that still have replicas to run
+  configs = []
   for iMesh in range(0, constants.num_meshes):
     meshSize = constants.mesh_sizes[iMesh]
-    print("Current meshSize = ", meshSize)
-
     # get the number of steps to do for this case
     currNumSteps = int(constants.numStepsTiming[int(meshSize)])
-
-    # loop over ROM sizes
     for iRom in range(0, constants.num_rom_sizes):
-      iRow+=1
       romSize = constants.rom_sizes[iRom]
-      print("Current romSize = ", romSize)
-
-      data[iRow][0], data[iRow][1] = meshSize, romSize
-
-      # link basis here
-      subs1 = "meshSize" + str(meshSize)
-      subs2 = "basis" + str(romSize)
-      basisDir = basisParentDir + "/" + subs1 + "/" + subs2
-      # always remove the link to basis to make sure we link the right one
-      os.system("rm -rf ./basis.txt")
-      os.system("ln -s "+basisDir+"/basis.txt ./basis.txt")
-
-      # args to run (args changes since each replica
-      # is done with different values of inputs)
-      argsLspg = ("python", exename+".py",
-                  str(meshSize), str(romSize),
-                  str(currNumSteps), str(constants.dt), str(denseJac))
-
-      argsGalerkin = ("python", exename+".py",
-                      str(meshSize), str(romSize),
-                      str(currNumSteps), str(constants.dt))
-
-      for i in range(0, constants.numSamplesForTiming):
-        if ("lspg" in exename):
-          popen = subprocess.Popen(argsLspg, stdout=subprocess.PIPE)
-        else:
-          popen = subprocess.Popen(argsGalerkin, stdout=subprocess.PIPE)
-
-        popen.wait()
-        output = popen.stdout.read()
-
-        # find timing
-        res = re.search(constants.timerRegExp, str(output))
-        time = float(res.group().split()[2])
-        print("time = ", time)
-        # store
-        data[iRow][i+2] = time/float(currNumSteps)
-
-        # while running, overwrite the timings
-        timingFile = exename+"_timings.txt"
-        if os.path.isfile(timingFile):
-          os.system("rm -rf " + timingFile)
-        np.savetxt(timingFile, data, fmt='%.15f')
-
-        # save output data (e.g. state and gen coords) for one replica run only
-        # since they are all equivalent, beside the timing
-        if i==0:
-          destDir = "meshSize" + str(meshSize) + "/basis" + str(romSize)
-          os.system("mkdir -p " + destDir)
-          if os.path.isfile('yFomReconstructed.txt'):
-            os.system("mv yFomReconstructed.txt " + destDir)
-          if os.path.isfile('final_generalized_coords.txt'):
-            os.system("mv final_generalized_coords.txt " + destDir)
-
-  # write timings file
-  timingFile = exename+"_timings.txt"
-  if os.path.isfile(timingFile):
-    os.system("rm -rf " + timingFile)
-  np.savetxt(timingFile, data, fmt='%.15f')
+      replicas = timing_harness.replicasToRun(store, meshSize, romSize,
+                                              constants.numSamplesForTiming, adaptiveOptions)
+      if len(replicas) == 0:
+        print("meshSize = ", meshSize, " romSize = ", romSize, " already done, skipping")
+        continue
+      configs.append((meshSize, romSize, currNumSteps, replicas))
+
+  if schedArgs.numWorkers > 1:
+    # each configuration is a job running in its own scratch dir
+    scheduler = sweep_scheduler.createScheduler(schedArgs, "sweep_jobs")
+    harness = os.path.abspath("timing_harness.py")
+    jobs = []
+    for meshSize, romSize, currNumSteps, replicas in configs:
+      basisDir = basisParentDir + "/meshSize" + str(meshSize) + "/basis" + str(romSize)
+      args = ["python", harness, "--exe", exename, "--mesh-size", meshSize,
+              "--rom-size", romSize, "--num-steps", currNumSteps, "--dt", constants.dt,
+              "--num-replicas", constants.numSamplesForTiming, "--dense-jac", denseJac,
+              "--backend", backend, "--mode", mode, "--store", storeFile] \
+             + timing_harness.adaptiveArgsList(adaptiveOptions) \
+             + (["--instrument"] if instrument else [])
+      jobs.append(sweep_scheduler.SweepJob(
+        "meshSize{}_basis{}".format(meshSize, romSize), args, int(meshSize),
+        lambda scratchDir, basisDir=basisDir: linkBasis(basisDir, scratchDir)))
+    results = scheduler.run(jobs)
+
+  for iConfig, (meshSize, romSize, currNumSteps, replicas) in enumerate(configs):
+    print("Current meshSize = ", meshSize, " romSize = ", romSize)
+
+    # save output data (e.g. state and gen coords) once
+    # since all replicas are equivalent, beside the timing
+    destDir = "meshSize" + str(meshSize) + "/basis" + str(romSize)
+    os.system("mkdir -p " + destDir)
+
+    if schedArgs.numWorkers > 1:
+      # the job already appended its replicas to the store
+      res = results[iConfig]
+      if res.returnCode_ != 0:
+        print(res.output_)
+        sys.exit("job " + res.job_.name_ + " failed")
+      os.system("mv " + res.scratchDir_ + "/final_generalized_coords.txt " + destDir)
+    else:
+      linkBasis(basisParentDir + "/" + destDir, ".")
+      result = timing_harness.timeConfigAndStore(store, mode, exename, meshSize, romSize,
+                                                 currNumSteps, constants.dt, replicas,
+                                                 denseJac, backend, adaptiveOptions, instrument)
+      if mode == "in-process":
+        print("setup time = ", result['setupTime'], " warmup time = ", result['warmupTime'])
+      else:
+        print("process wall times = ", result['wallTimes'])
+        print("cold start times = ", result['coldStarts'])
+      print("times = ", result['times'])
+      timing_harness.saveGeneralizedCoords(result, destDir+"/final_generalized_coords.txt")
+      os.system("rm -f final_generalized_coords.txt")
+      if os.path.isfile('yFomReconstructed.txt'):
+        os.system("mv yFomReconstructed.txt " + destDir)
+
+  # legacy timings file with time per step:
+  # - first col  = mesh size
+  # - second col = rom size
+  # - then       = timings
+  data = store.timingsMatrix()
+  np.savetxt(exename+"_timings.txt", data, fmt='%.15f')
+
+  # mean time per step with its 95% confidence interval, outliers excluded
+  summary = timing_store.loadTimingsSummary(storeFile, store.config_)
+  np.savetxt(exename+"_timings_ci.txt", summary, fmt='%.15e',
+             header="meshSize romSize mean ciLow ciHigh median numSamples numOutliers")
+
+  if instrument:
+    savePhasesSummary(store, exename+"_phases.txt")
+  if mode == "subprocess":
+    saveColdStartSummary(store, exename+"_coldstart.txt")
 
   np.set_printoptions(edgeitems=10, linewidth=100000)
   print(data)
+  print(summary)
 
 
 if __name__== "__main__":
   parser = ArgumentParser()
   parser.add_argument("-exe", "--exe", dest="exename")
   parser.add_argument("-basis-dir-name", "--basis-dir-name", dest="basisDirName")
-  parser.add_argument("-dense-jac", "--dense-jac", dest="denseJac")
+  parser.add_argument("-dense-jac", "--dense-jac", dest="denseJac", default="0")
+  parser.add_argument("-backend", "--backend", dest="backend", default="pressio4py",
+                      help="lspg only: pressio4py or native")
+  parser.add_argument("-mode", "--mode", dest="mode", default="in-process",
+                      choices=["in-process", "subprocess"],
+                      help="in-process: all replicas in this process after one warm-up, "
+                           "subprocess: one python process per replica (cold start)")
+  timing_harness.addAdaptiveArgs(parser)
+  timing_harness.addInstrumentArgs(parser)
+  sweep_scheduler.addSchedulerArgs(parser)
   args = parser.parse_args()
-  main(args.exename, args.basisDirName, args.denseJac)
+  main(args.exename, args.basisDirName, args.denseJac, args.backend, args.mode, args,
+       timing_harness.adaptiveOptionsFromArgs(args), timing_harness.instrumentFromArgs(args))
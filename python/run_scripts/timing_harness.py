@@ -0,0 +1,344 @@
+
+import sys, os, time
+import importlib
+import subprocess
+import re
+import numpy as np
+from argparse import ArgumentParser
+
+import timing_store, timing_stats
+import instrumentation
+
+#-------------------------------------------------------------------------
+# timing of the python ROM drivers (main_rom_*.py), two modes:
+#
+# - in-process (default): the driver is imported and its setupRom()
+#   creates the app and loads the basis once per configuration, then one
+#   untimed warm-up (numba compilation) and numReplicas timed runs are done
+#   in this same process with time.perf_counter.
+#
+# - subprocess: one fresh "python exename.py ..." per replica, each paying
+#   interpreter startup, imports, numba compilation and basis loading.
+#   This is the old behavior, kept for cold-start measurements: besides
+#   the time printed by the driver, the wall time of each process and its
+#   cold start (launch until ready to time) are kept.
+#
+# Both return a dict with the same keys, times are in seconds:
+#   mode, exename, meshSize, romSize, numSteps,
+#   times      : list, timed part of each replica
+#   setupTime  : app creation + basis loading (in-process only)
+#   warmupTime : the untimed warm-up run (in-process only)
+#   wallTimes  : list, wall time of each process (subprocess only)
+#   coldStarts : list, time from the process launch until the driver is
+#                ready to time, i.e. interpreter startup, imports, numba
+#                compilation or cache loading, setup and warm-up
+#                (subprocess only)
+#   yRom       : final generalized coordinates of the last replica
+#
+# plus an adaptive in-process mode, see timeInProcessAdaptive.
+#
+# instrument=True (in-process only) passes instrumentation.PhaseCounters
+# to the driver and adds to the result
+#   instrumentation : list, per-phase breakdown of each replica
+# (see python/src/instrumentation.py). The wrappers add some overhead to
+# the timed part, so instrumented runs are stored under their own config.
+#-------------------------------------------------------------------------
+
+timerRegExp = re.compile(r'Elapsed time: \d{1,}.\d{9,}')
+readyRegExp = re.compile(r'Ready time: \d{1,}.\d{6,}')
+
+def timeInProcess(exename, meshSize, romSize, numSteps, dt, numReplicas,
+                  driverOptions={}, numWarmupSteps=1, instrument=False):
+  driver = importlib.import_module(exename)
+  counters = instrumentation.PhaseCounters() if instrument else None
+
+  startTime = time.perf_counter()
+  runSteps, yRom = driver.setupRom(meshSize, romSize, dt, counters=counters, **driverOptions)
+  setupTime = time.perf_counter() - startTime
+
+  # untimed warm up run for numba compilation
+  startTime = time.perf_counter()
+  runSteps(numWarmupSteps)
+  warmupTime = time.perf_counter() - startTime
+
+  times, reports = [], []
+  for i in range(numReplicas):
+    # every replica starts from the same initial condition
+    yRom[:] = 0.
+    if counters is not None: counters.reset()
+    startTime = time.perf_counter()
+    runSteps(numSteps)
+    times.append(time.perf_counter() - startTime)
+    if counters is not None: reports.append(counters.report(numSteps))
+
+  result = {'mode': 'in-process', 'exename': exename,
+            'meshSize': meshSize, 'romSize': romSize, 'numSteps': numSteps,
+            'times': times, 'setupTime': setupTime, 'warmupTime': warmupTime,
+            'wallTimes': [], 'coldStarts': [], 'yRom': np.copy(yRom)}
+  if instrument:
+    result['instrumentation'] = reports
+  return result
+
+
+#-------------------------------------------------------------------------
+# adaptive benchmark: instead of a fixed number of replicas of a hand
+# picked number of steps,
+# - the number of steps is calibrated (from numSteps up) so that each
+#   sample lasts at least minSampleTime, to stay well above timer and
+#   scheduling noise
+# - samples are taken until the confidence interval of the mean time per
+#   step (outliers excluded, see common/timing_stats.py) is narrower than
+#   targetRelCi of the mean, or timeBudget seconds were spent on this
+#   configuration, or maxReplicas samples were taken
+# the result also has numSteps (calibrated), stats and stopReason.
+#-------------------------------------------------------------------------
+adaptiveDefaults = {'targetRelCi': 0.02, 'timeBudget': 60., 'minSampleTime': 0.1,
+                    'minReplicas': 5, 'maxReplicas': 1000, 'maxSteps': 1000000,
+                    'confidence': 0.95}
+
+def timeInProcessAdaptive(exename, meshSize, romSize, numSteps, dt,
+                          driverOptions={}, adaptiveOptions={}, numWarmupSteps=1,
+                          instrument=False):
+  opts = dict(adaptiveDefaults)
+  opts.update(adaptiveOptions)
+  driver = importlib.import_module(exename)
+  counters = instrumentation.PhaseCounters() if instrument else None
+
+  startTime = time.perf_counter()
+  runSteps, yRom = driver.setupRom(meshSize, romSize, dt, counters=counters, **driverOptions)
+  setupTime = time.perf_counter() - startTime
+
+  # untimed warm up run for numba compilation
+  startTime = time.perf_counter()
+  runSteps(numWarmupSteps)
+  warmupTime = time.perf_counter() - startTime
+
+  def sample(n):
+    yRom[:] = 0.
+    if counters is not None: counters.reset()
+    startTime = time.perf_counter()
+    runSteps(n)
+    return time.perf_counter() - startTime
+
+  budgetStart = time.perf_counter()
+  # calibration runs are not kept: jump to the estimated step count
+  # (with some margin) until a run is long enough
+  numSteps = max(1, int(numSteps))
+  calibrationTime = sample(numSteps)
+  while calibrationTime < opts['minSampleTime'] and numSteps < opts['maxSteps']:
+    growth = 1.2*opts['minSampleTime']/max(calibrationTime, 1e-9)
+    numSteps = min(opts['maxSteps'], max(numSteps+1, int(np.ceil(numSteps*growth))))
+    calibrationTime = sample(numSteps)
+
+  times, reports, stopReason = [], [], None
+  while stopReason is None:
+    times.append(sample(numSteps))
+    if counters is not None: reports.append(counters.report(numSteps))
+    summary = timing_stats.summarize(np.array(times)/numSteps, opts['confidence'])
+    if len(times) >= opts['minReplicas'] and summary['relCiWidth'] <= opts['targetRelCi']:
+      stopReason = 'converged'
+    elif len(times) >= opts['maxReplicas']:
+      stopReason = 'maxReplicas'
+    elif time.perf_counter() - budgetStart >= opts['timeBudget']:
+      stopReason = 'timeBudget'
+
+  result = {'mode': 'adaptive', 'exename': exename,
+            'meshSize': meshSize, 'romSize': romSize, 'numSteps': numSteps,
+            'times': times, 'setupTime': setupTime, 'warmupTime': warmupTime,
+            'wallTimes': [], 'coldStarts': [], 'yRom': np.copy(yRom),
+            'stats': summary, 'stopReason': stopReason}
+  if instrument:
+    result['instrumentation'] = reports
+  return result
+
+
+def printAdaptiveReport(result):
+  st = result['stats']
+  print("numSteps = {} samples = {} ({}) outliers = {}".format(
+    result['numSteps'], st['numSamples'], result['stopReason'], st['outliers']))
+  print("time per step = {:.6e} s, {:.0f}% CI [{:.6e}, {:.6e}], rel. width = {:.3f}".format(
+    st['mean'], 100*st['confidence'], st['ciLow'], st['ciHigh'], st['relCiWidth']))
+
+
+# driverArgs are the args following the 4 positional ones shared by all
+# drivers (meshSize romSize numSteps dt), e.g. [denseJac, "--backend", "native"]
+def timeInSubprocess(exename, meshSize, romSize, numSteps, dt, numReplicas,
+                     driverArgs=[]):
+  args = ["python", exename+".py", str(meshSize), str(romSize),
+          str(numSteps), str(dt)] + [str(a) for a in driverArgs]
+
+  times, wallTimes, coldStarts = [], [], []
+  for i in range(numReplicas):
+    launchTime = time.time()
+    startTime = time.perf_counter()
+    popen = subprocess.Popen(args, stdout=subprocess.PIPE)
+    output, _ = popen.communicate()
+    wallTimes.append(time.perf_counter() - startTime)
+    if popen.returncode != 0:
+      raise RuntimeError("{} failed with return code {}".format(" ".join(args), popen.returncode))
+
+    # find timing
+    res = re.search(timerRegExp, str(output))
+    times.append(float(res.group().split()[2]))
+    res = re.search(readyRegExp, str(output))
+    coldStarts.append(float(res.group().split()[2]) - launchTime)
+
+  yRom = np.atleast_1d(np.loadtxt("final_generalized_coords.txt"))
+  return {'mode': 'subprocess', 'exename': exename,
+          'meshSize': meshSize, 'romSize': romSize, 'numSteps': numSteps,
+          'times': times, 'setupTime': None, 'warmupTime': None,
+          'wallTimes': wallTimes, 'coldStarts': coldStarts, 'yRom': yRom}
+
+
+# times one (mesh, rom) configuration of the driver exename with the given
+# mode, denseJac and backend are only used by the lspg driver
+# adaptiveOptions is not None enables the adaptive mode (in-process only),
+# then numSteps is the starting point of the calibration and numReplicas is ignored
+def timeConfig(mode, exename, meshSize, romSize, numSteps, dt, numReplicas,
+               denseJac=0, backend="pressio4py", adaptiveOptions=None, instrument=False):
+  if mode == "in-process":
+    # native galerkin has no jacobian/backend options
+    driverOptions = {}
+    if ("lspg" in exename):
+      driverOptions = {'jIsDense': int(denseJac), 'backend': backend}
+    if adaptiveOptions is not None:
+      return timeInProcessAdaptive(exename, meshSize, romSize, numSteps, dt,
+                                   driverOptions, adaptiveOptions, instrument=instrument)
+    return timeInProcess(exename, meshSize, romSize, numSteps, dt, numReplicas,
+                         driverOptions, instrument=instrument)
+  else:
+    driverArgs = []
+    if ("lspg" in exename):
+      driverArgs = [denseJac, "--backend", backend]
+    return timeInSubprocess(exename, meshSize, romSize, numSteps, dt, numReplicas,
+                            driverArgs)
+
+
+# writes the final generalized coordinates with the driver's own format
+def saveGeneralizedCoords(result, fileName):
+  driver = importlib.import_module(result['exename'])
+  driver.saveGeneralizedCoords(result['yRom'], fileName)
+
+
+# store of the per-replica timings (common/timing_store.py), the config
+# identifies the sweep so that a restarted one skips what is already done
+def createStore(fileName, exename, denseJac, backend, mode, dt, adaptiveOptions=None,
+                instrument=False):
+  config = {'exename': exename, 'denseJac': str(denseJac), 'backend': backend,
+            'mode': mode, 'dt': float(dt)}
+  if adaptiveOptions is not None:
+    config['adaptiveTargetRelCi'] = float(adaptiveOptions['targetRelCi'])
+  if instrument:
+    config['instrumented'] = 1
+  return timing_store.TimingStore(fileName, config)
+
+
+# times the given replicas of one configuration and appends one row per
+# replica to the store as soon as the configuration is done. In adaptive
+# mode the replicas are numbered from replicas[0] on, however many are done.
+# Instrumented replicas also store their per-phase breakdown.
+def timeConfigAndStore(store, mode, exename, meshSize, romSize, numSteps, dt, replicas,
+                       denseJac=0, backend="pressio4py", adaptiveOptions=None,
+                       instrument=False):
+  result = timeConfig(mode, exename, meshSize, romSize, numSteps, dt, len(replicas),
+                      denseJac, backend, adaptiveOptions, instrument)
+  for k, elapsed in enumerate(result['times']):
+    if mode == "in-process":
+      phases = {'setup': result['setupTime'], 'warmup': result['warmupTime']}
+    else:
+      phases = {'processWall': result['wallTimes'][k], 'coldStart': result['coldStarts'][k]}
+    extra = None
+    if instrument:
+      extra = {'instrumentation': result['instrumentation'][k]}
+    replica = replicas[k] if adaptiveOptions is None else replicas[0]+k
+    store.append(meshSize, romSize, replica, result['numSteps'], elapsed, phases, extra=extra)
+  if adaptiveOptions is not None:
+    printAdaptiveReport(result)
+  if instrument:
+    instrumentation.printReport(result['instrumentation'][-1])
+  return result
+
+
+# configs that still have to be run: the missing replicas, in adaptive
+# mode a configuration with any stored replica is done
+def replicasToRun(store, meshSize, romSize, numReplicas, adaptiveOptions=None):
+  if adaptiveOptions is not None:
+    return [0] if len(store.missingReplicas(meshSize, romSize, 1)) == 1 else []
+  return store.missingReplicas(meshSize, romSize, numReplicas)
+
+
+def addAdaptiveArgs(parser):
+  parser.add_argument("-adaptive", "--adaptive", dest="adaptive", action="store_true",
+                      help="in-process only: calibrate the number of steps and sample "
+                           "until the CI of the time per step is narrow enough")
+  parser.add_argument("-target-rel-ci", "--target-rel-ci", dest="targetRelCi", type=float,
+                      default=adaptiveDefaults['targetRelCi'],
+                      help="adaptive: target width of the CI relative to the mean")
+  parser.add_argument("-time-budget", "--time-budget", dest="timeBudget", type=float,
+                      default=adaptiveDefaults['timeBudget'],
+                      help="adaptive: max seconds of sampling per configuration")
+  parser.add_argument("-min-sample-time", "--min-sample-time", dest="minSampleTime",
+                      type=float, default=adaptiveDefaults['minSampleTime'],
+                      help="adaptive: min duration (s) of one sample")
+  parser.add_argument("-max-replicas", "--max-replicas", dest="maxReplicas", type=int,
+                      default=adaptiveDefaults['maxReplicas'],
+                      help="adaptive: max number of samples per configuration")
+
+def adaptiveOptionsFromArgs(args):
+  if not args.adaptive:
+    return None
+  if args.mode != "in-process":
+    sys.exit("the adaptive mode needs --mode in-process")
+  return {'targetRelCi': args.targetRelCi, 'timeBudget': args.timeBudget,
+          'minSampleTime': args.minSampleTime, 'maxReplicas': args.maxReplicas}
+
+def addInstrumentArgs(parser):
+  parser.add_argument("-instrument", "--instrument", dest="instrument", action="store_true",
+                      help="in-process only: store the time per step of each phase "
+                           "(velocity, jacobian, projection, linear solve...)")
+
+def instrumentFromArgs(args):
+  if args.instrument and args.mode != "in-process":
+    sys.exit("--instrument needs --mode in-process")
+  return args.instrument
+
+def adaptiveArgsList(adaptiveOptions):
+  if adaptiveOptions is None:
+    return []
+  return ["--adaptive", "--target-rel-ci", adaptiveOptions['targetRelCi'],
+          "--time-budget", adaptiveOptions['timeBudget'],
+          "--min-sample-time", adaptiveOptions['minSampleTime'],
+          "--max-replicas", adaptiveOptions['maxReplicas']]
+
+
+# single configuration run in the current directory (which has to contain
+# the basis), used as job by the sweep scheduler: appends the missing
+# replicas to the store and writes final_generalized_coords.txt
+if __name__== "__main__":
+  parser = ArgumentParser()
+  parser.add_argument("-exe", "--exe", dest="exename")
+  parser.add_argument("-mesh-size", "--mesh-size", dest="meshSize", type=int)
+  parser.add_argument("-rom-size", "--rom-size", dest="romSize", type=int)
+  parser.add_argument("-num-steps", "--num-steps", dest="numSteps", type=int)
+  parser.add_argument("-dt", "--dt", dest="dt", type=float)
+  parser.add_argument("-num-replicas", "--num-replicas", dest="numReplicas", type=int)
+  parser.add_argument("-dense-jac", "--dense-jac", dest="denseJac", default="0")
+  parser.add_argument("-backend", "--backend", dest="backend", default="pressio4py")
+  parser.add_argument("-mode", "--mode", dest="mode", default="in-process",
+                      choices=["in-process", "subprocess"])
+  parser.add_argument("-store", "--store", dest="storeFile",
+                      help="timing store (.jsonl) to append the replicas to")
+  addAdaptiveArgs(parser)
+  addInstrumentArgs(parser)
+  args = parser.parse_args()
+  adaptiveOptions = adaptiveOptionsFromArgs(args)
+  instrument = instrumentFromArgs(args)
+  store = createStore(args.storeFile, args.exename, args.denseJac, args.backend,
+                      args.mode, args.dt, adaptiveOptions, instrument)
+  replicas = replicasToRun(store, args.meshSize, args.romSize, args.numReplicas, adaptiveOptions)
+  if len(replicas) > 0:
+    result = timeConfigAndStore(store, args.mode, args.exename, args.meshSize, args.romSize,
+                                args.numSteps, args.dt, replicas, args.denseJac, args.backend,
+                                adaptiveOptions, instrument)
+    print("times = ", result['times'])
+    saveGeneralizedCoords(result, "final_generalized_coords.txt")
@@ -0,0 +1,191 @@
+
+import numpy as np
+from scipy.linalg import blas
+
+#-------------------------------------------------------------------------
+# error controlled time stepping to a target final time, for the FOM
+# (fom.py) and the native Galerkin ROM (rom_galerkin.py).
+#
+# An adaptive stepper has
+#   order_                  order of the error estimate
+#   reset()                 forget what was carried over from the last step
+#   trialStep(x, t, dt)     returns (xNew, err), buffers owned by the
+#                           stepper, x is left untouched
+#   acceptStep()            the last trial step was accepted
+# and integrateAdaptive takes a step if the weighted RMS norm of err is
+# <= 1, and picks the next dt from that norm in both cases.
+#
+# - DormandPrince45Stepper: explicit embedded RK 5(4) pair, advances the
+#   5th order solution, the last stage is the first of the next step
+#   (FSAL) so an accepted step costs 6 rhs evaluations
+# - ImplicitEulerErrorStepper: implicit Euler solved by an existing
+#   stepper (e.g. fom.FomBDF1Stepper), with local error estimated by the
+#   distance to the explicit Euler predictor:
+#     err = 0.5*(xNew - x - dt*f(x, t)) ~ -dt^2/2 x''
+#
+# rhs callables have the signature rhs(x, t, out), e.g. the computeRhs of
+# the Galerkin steppers, or appRhs(appObj) for the app classes.
+#-------------------------------------------------------------------------
+
+def appRhs(appObj):
+  def rhs(x, t, out):
+    out[:] = appObj.velocity(x, t)
+  return rhs
+
+
+class StepSizeController:
+  def __init__(self, rtol=1e-6, atol=1e-8, safety=0.9, minFactor=0.2, maxFactor=5.,
+               dtMin=1e-12):
+    self.rtol_ = rtol
+    self.atol_ = atol
+    self.safety_ = safety
+    self.minFactor_ = minFactor
+    self.maxFactor_ = maxFactor
+    self.dtMin_ = dtMin
+    self.work_ = None
+
+  # sqrt(mean((err/(atol + rtol*max(|x|, |xNew|)))^2))
+  def errorNorm(self, err, x, xNew):
+    if self.work_ is None or self.work_.shape != x.shape:
+      self.work_ = np.zeros(x.shape)
+    w = self.work_
+    np.maximum(np.abs(x), np.abs(xNew), out=w)
+    w *= self.rtol_
+    w += self.atol_
+    np.divide(err, w, out=w)
+    return np.sqrt(np.dot(w, w)/len(w))
+
+  # factor of the next dt, not growing on the step following a rejected one
+  def factor(self, errNorm, order, afterReject):
+    if errNorm == 0.:
+      fac = self.maxFactor_
+    else:
+      fac = self.safety_ * errNorm**(-1./(order+1))
+    fac = min(self.maxFactor_, max(self.minFactor_, fac))
+    return min(fac, 1.) if afterReject else fac
+
+
+# every trial step: time, dt, error norm, accepted or not
+class StepSizeHistory:
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    self.t_, self.dt_, self.errNorm_, self.accepted_ = [], [], [], []
+
+  def record(self, t, dt, errNorm, accepted):
+    self.t_.append(t)
+    self.dt_.append(dt)
+    self.errNorm_.append(errNorm)
+    self.accepted_.append(int(accepted))
+
+  def numAccepted(self): return sum(self.accepted_)
+  def numRejected(self): return len(self.accepted_) - sum(self.accepted_)
+
+  # columns: t (start of the step), dt, error norm, accepted
+  def save(self, fileName):
+    np.savetxt(fileName, np.column_stack([self.t_, self.dt_, self.errNorm_, self.accepted_]),
+               fmt=['%.16e', '%.16e', '%.6e', '%d'])
+
+
+class DormandPrince45Stepper:
+  # nodes, stage coefficients (row i: stage i+1), 5th order weights and
+  # weights of the error (5th minus 4th order)
+  c_ = np.array([0., 1./5, 3./10, 4./5, 8./9, 1., 1.])
+  a_ = [np.array([]),
+        np.array([1./5]),
+        np.array([3./40, 9./40]),
+        np.array([44./45, -56./15, 32./9]),
+        np.array([19372./6561, -25360./2187, 64448./6561, -212./729]),
+        np.array([9017./3168, -355./33, 46732./5247, 49./176, -5103./18656]),
+        np.array([35./384, 0., 500./1113, 125./192, -2187./6784, 11./84])]
+  e_ = np.array([71./57600, 0., -71./16695, 71./1920, -17253./339200, 22./525, -1./40])
+
+  # stages, solution and error are in dtype
+  def __init__(self, rhs, n, dtype=np.float64):
+    self.rhs_   = rhs
+    self.order_ = 4
+    self.gemv_  = blas.get_blas_funcs('gemv', dtype=dtype)
+    self.a_     = [a.astype(dtype) for a in DormandPrince45Stepper.a_]
+    self.e_     = DormandPrince45Stepper.e_.astype(dtype)
+    # stages as columns, column-major so each stage is contiguous and
+    # x + dt*K[:, :i]*a_i is one gemv
+    self.K_     = np.zeros((n, 7), order='F', dtype=dtype)
+    self.xNew_  = np.zeros(n, dtype=dtype)
+    self.err_   = np.zeros(n, dtype=dtype)
+    self.haveK1_ = False
+
+  def reset(self):
+    self.haveK1_ = False
+
+  def trialStep(self, x, t, dt):
+    K, xNew = self.K_, self.xNew_
+    if not self.haveK1_:
+      self.rhs_(x, t, K[:, 0])
+      self.haveK1_ = True
+    for i in range(1, 7):
+      xNew[:] = x
+      self.gemv_(dt, K[:, :i], self.a_[i], 1., xNew, overwrite_y=1)
+      self.rhs_(xNew, t + self.c_[i]*dt, K[:, i])
+    # the last stage is evaluated at the 5th order solution itself
+    self.gemv_(dt, K, self.e_, 0., self.err_, overwrite_y=1)
+    return xNew, self.err_
+
+  def acceptStep(self):
+    self.K_[:, 0] = self.K_[:, 6]
+
+
+class ImplicitEulerErrorStepper:
+  # implicitStepper.doStep(x, t, dt) advances x in place by implicit Euler
+  def __init__(self, implicitStepper, rhs, n):
+    self.implicitStepper_ = implicitStepper
+    self.rhs_   = rhs
+    self.order_ = 1
+    self.f_     = np.zeros(n)
+    self.xNew_  = np.zeros(n)
+    self.err_   = np.zeros(n)
+
+  def reset(self):
+    pass
+
+  def trialStep(self, x, t, dt):
+    self.rhs_(x, t, self.f_)
+    self.xNew_[:] = x
+    self.implicitStepper_.doStep(self.xNew_, t, dt)
+    # err = 0.5*(xNew - (x + dt*f))
+    np.subtract(self.xNew_, x, out=self.err_)
+    self.f_ *= dt
+    self.err_ -= self.f_
+    self.err_ *= 0.5
+    return self.xNew_, self.err_
+
+  def acceptStep(self):
+    pass
+
+
+# integrates x in place from t0 to tFinal starting with dt0, observers
+# obs(step, t, x) are called after each accepted step (and at step 0),
+# every trial step goes to history if given. Returns the final dt, from
+# which a later integration can be continued.
+def integrateAdaptive(stepper, controller, x, t0, tFinal, dt0, observers=[], history=None):
+  stepper.reset()
+  for obs in observers: obs(0, t0, x)
+  t, dt, step, afterReject = t0, dt0, 0, False
+  while tFinal - t > 1e-12*max(abs(tFinal), 1.):
+    dtTry = min(dt, tFinal - t)
+    xNew, err = stepper.trialStep(x, t, dtTry)
+    errNorm = controller.errorNorm(err, x, xNew)
+    accepted = errNorm <= 1.
+    if history is not None:
+      history.record(t, dtTry, errNorm, accepted)
+    if accepted:
+      x[:] = xNew
+      stepper.acceptStep()
+      t = tFinal if dtTry == tFinal - t else t + dtTry
+      step += 1
+      for obs in observers: obs(step, t, x)
+    dt = dtTry * controller.factor(errNorm, stepper.order_, afterReject)
+    afterReject = not accepted
+    if dt < controller.dtMin_:
+      raise RuntimeError('time step {} below the minimum at t = {}'.format(dt, t))
+  return dt
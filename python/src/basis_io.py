@@ -0,0 +1,50 @@
+
+import numpy as np
+import os.path
+
+#-------------------------------------------------------------------------
+# basis storage: besides the ascii basis.txt written by the C++ runs,
+# the basis can be stored as .npy, whose small header records shape,
+# dtype and memory layout. We always write it column-major (the layout
+# the decoders want) so it can be memory-mapped and used without any
+# parsing or copying.
+#-------------------------------------------------------------------------
+
+def saveBasis(fileName, phi):
+  np.save(fileName, np.asfortranarray(phi))
+
+
+# fileName can be given with extension (.npy or .txt) or without it,
+# in which case fileName.npy is preferred over fileName.txt.
+# numCols, if given, returns a view of the leading numCols columns.
+# dtype, if given and not the stored one, returns a column-major copy of
+# those columns in that dtype (e.g. float32 to halve the basis memory).
+def loadBasis(fileName="basis", numCols=None, dtype=None):
+  root, ext = os.path.splitext(fileName)
+  if ext == "":
+    if os.path.isfile(fileName + ".npy"):
+      fileName = fileName + ".npy"
+    elif os.path.isfile(fileName + ".txt"):
+      fileName = fileName + ".txt"
+    else:
+      raise Exception('No basis file {0}.npy or {0}.txt found'.format(fileName))
+
+  if fileName.endswith(".npy"):
+    # copy-on-write map: pages are read lazily and never written back,
+    # but unlike mode 'r' the array is not flagged readonly, so it
+    # matches the numba kernel signatures and the bindings as is
+    phi = np.load(fileName, mmap_mode='c')
+  else:
+    phi = np.loadtxt(fileName, ndmin=2)
+  # no-op for the mmapped column-major file
+  phi = np.asfortranarray(phi)
+
+  if numCols is not None:
+    if numCols > phi.shape[1]:
+      raise Exception('Basis in {} has {} columns, asked for {}'.format(
+        fileName, phi.shape[1], numCols))
+    # leading columns of a column-major matrix: still contiguous, no copy
+    phi = phi[:, :numCols]
+  if dtype is not None and phi.dtype != dtype:
+    phi = np.asfortranarray(phi, dtype=dtype)
+  return phi
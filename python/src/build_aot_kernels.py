@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+import sys, os
+from argparse import ArgumentParser
+
+#-------------------------------------------------------------------------
+# builds the extension module burgers1d_aot with the aot=True kernels of
+# burgers1d.py (see burgers1d.kernel), compiled ahead of time by numba.pycc
+# from the same python functions and signatures as the jitted ones.
+# burgers1d.py uses it instead of jitting those kernels if BURGERS1D_AOT=1
+# and the module is importable (e.g. built into the run dir).
+#
+# numba.pycc is pending deprecation in numba, this needs a numba version
+# still shipping it and a C compiler.
+#-------------------------------------------------------------------------
+
+def buildAotKernels(outputDir):
+  # the python functions are needed, not the aot ones
+  os.environ['BURGERS1D_AOT'] = '0'
+  from numba.pycc import CC
+  import burgers1d
+
+  cc = CC(burgers1d.aotModuleName)
+  cc.output_dir = outputDir
+  for name, (signature, fnc) in sorted(burgers1d.aotKernels.items()):
+    print("exporting {} {}".format(name, signature))
+    cc.export(name, signature)(fnc)
+  cc.compile()
+
+
+if __name__== "__main__":
+  parser = ArgumentParser()
+  parser.add_argument("-output-dir", "--output-dir", dest="outputDir", default=os.getcwd())
+  args = parser.parse_args()
+  buildAotKernels(os.path.abspath(args.outputDir))
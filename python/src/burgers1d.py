@@ -1,21 +1,131 @@
 import numpy as np
-import math
-from numba import jit, njit
-from scipy.sparse import csr_matrix, diags, spdiags
-from scipy import linalg
-import time
+from numba import njit, prange
+import os
 
+# scipy is slow to import and only needed by some of the apps below, so
+# each app class imports what it uses when created (dense: scipy.linalg,
+# sparse: scipy.sparse) and a run only pays for the path it takes
 
-@njit(["void(float64[:], f8, float64[:], float64[:], f8, f8)"])
+
+# Kernels are compiled for an explicit signature with cache=True, so the
+# machine code is written to the numba cache (NUMBA_CACHE_DIR if set,
+# else __pycache__ next to this file) and later processes only load it.
+# Nothing is compiled or loaded at import: loading the first kernel also
+# sets up numba's typing and lowering, which costs more than importing
+# numba itself, so each kernel is compiled or loaded on first use through
+# loadKernel (or dtypeKernel), i.e. when an app that needs it is created,
+# and importing this module (or a driver) stays cheap.
+# Kernels marked aot=True can also be built ahead of time into the
+# extension module burgers1d_aot by build_aot_kernels.py from these same
+# sources: with BURGERS1D_AOT=1 and that module importable, they are taken
+# from it and nothing is compiled for them.
+aotModuleName = 'burgers1d_aot'
+# name -> (signature, python function) of the aot=True kernels
+aotKernels = {}
+
+def loadAotModule():
+  if os.environ.get('BURGERS1D_AOT', '0') != '1':
+    return None
+  try:
+    return __import__(aotModuleName)
+  except ImportError:
+    print("BURGERS1D_AOT=1 but {} not found, using jit kernels".format(aotModuleName))
+    return None
+
+aotModule = loadAotModule()
+
+# name -> (signature, python function, options) of all the kernels
+pyKernels = {}
+
+def kernel(signature, aot=False, **options):
+  def decorator(fnc):
+    pyKernels[fnc.__name__] = (signature, fnc, options)
+    if aot:
+      aotKernels[fnc.__name__] = (signature, fnc)
+      if aotModule is not None:
+        return getattr(aotModule, fnc.__name__)
+    # no signature given to njit, so nothing is compiled here; a direct
+    # call before loadKernel still works, compiling for its argument types
+    return njit(cache=True, **options)(fnc)
+  return decorator
+
+
+# compiles (or loads from the cache) a kernel for its signature, once,
+# then like njit with a signature list, calls with other (e.g. contiguous)
+# array types are converted to it instead of compiling new versions
+def loadKernel(compiled):
+  if hasattr(compiled, 'signatures') and len(compiled.signatures) == 0:
+    compiled.compile(pyKernels[compiled.__name__][0])
+    compiled.disable_compile()
+  return compiled
+
+
+# The apps take a dtype (float64 or float32) for their state, velocity
+# and jacobian buffers. The float32 variant of a kernel is compiled from
+# the same python function with float64 -> float32 in its signature, on
+# first use only (jit, cached, never aot), so float64 runs do not pay for it.
+float32Kernels = {}
+
+def dtypeKernel(compiled, dtype):
+  if np.dtype(dtype) == np.float64:
+    return loadKernel(compiled)
+  if np.dtype(dtype) != np.float32:
+    raise ValueError('Unsupported dtype {}'.format(dtype))
+  name = compiled.__name__
+  if name not in float32Kernels:
+    signature, fnc, options = pyKernels[name]
+    signature = signature.replace('float64', 'float32').replace('f8', 'f4')
+    float32Kernels[name] = njit([signature], cache=True, **options)(fnc)
+  return float32Kernels[name]
+
+
+# parameters: mu[0] = inflow value u(0), the source term is mu[1]*exp(mu[2]*x)
+defaultMu = [5., 0.02, 0.02]
+
+
+# Velocity kernels: all write into f and allocate nothing.
+# - serial:   plain loop, reference implementation
+# - parallel: same arithmetic per entry split over threads with prange,
+#             so it matches serial bit for bit
+# - fastmath: serial loop compiled with fastmath, the compiler is free to
+#             contract/reassociate, so results can differ in the last bits
+# Any two variants agree to within
+#   |f_a - f_b| <= velocityKernelsRelTol * (dxInvHalf*max(mu0^2, max(u^2)) + max|expVec|)
+# entrywise, which is the magnitude of the terms being combined.
+velocityKernelsRelTol = 1e-13
+
+@kernel("void(float64[:], f8, float64[:], float64[:], f8, f8)", aot=True)
 def velocityImplNumba(u, t, f, expVec, dxInvHalf, mu0):
   n = len(u)
-  uSq = np.square(u)
-  f[0] = dxInvHalf * (math.pow(mu0, 2) - uSq[0]) + expVec[0]
-  for i in range(1,n):
-    f[i] = dxInvHalf * ( uSq[i-1] - uSq[i] ) + expVec[i]
+  uSqPrev = mu0*mu0
+  for i in range(n):
+    uSq = u[i]*u[i]
+    f[i] = dxInvHalf * ( uSqPrev - uSq ) + expVec[i]
+    uSqPrev = uSq
 
 
-@njit(["void(float64[:], f8, float64[::1, :], f8, int32)"])
+@kernel("void(float64[:], f8, float64[:], float64[:], f8, f8)", parallel=True)
+def velocityImplNumbaParallel(u, t, f, expVec, dxInvHalf, mu0):
+  n = len(u)
+  f[0] = dxInvHalf * ( mu0*mu0 - u[0]*u[0] ) + expVec[0]
+  for i in prange(1, n):
+    f[i] = dxInvHalf * ( u[i-1]*u[i-1] - u[i]*u[i] ) + expVec[i]
+
+
+@kernel("void(float64[:], f8, float64[:], float64[:], f8, f8)", fastmath=True)
+def velocityImplNumbaFastMath(u, t, f, expVec, dxInvHalf, mu0):
+  n = len(u)
+  f[0] = dxInvHalf * ( mu0*mu0 - u[0]*u[0] ) + expVec[0]
+  for i in range(1, n):
+    f[i] = dxInvHalf * ( u[i-1]*u[i-1] - u[i]*u[i] ) + expVec[i]
+
+
+velocityKernels = {'serial'  : velocityImplNumba,
+                   'parallel': velocityImplNumbaParallel,
+                   'fastmath': velocityImplNumbaFastMath}
+
+
+@kernel("void(float64[:], f8, float64[::1, :], f8, int32)", aot=True)
 def jacobianImplNumba(u, t, J, dxInv, N):
   J[N-1][N-1] = -dxInv*u[N-1]
   for i in range(0, N-1):
@@ -23,9 +133,42 @@ def jacobianImplNumba(u, t, J, dxInv, N):
     J[i+1][i] = dxInv * u[i]
 
 
-class Burgers1dDenseJacobian:
-  def __init__(self, Ncell):
-    self.mu_    = np.array([5., 0.02, 0.02])
+# fused f(u) and J(u)*B in one pass over u, writing into caller-owned
+# buffers: rows are split into chunks that run in parallel, and within a
+# chunk J*B is filled column by column so access to column-major B/JB
+# stays contiguous. Valid for any app below since J is always bidiagonal.
+@kernel("void(float64[:], f8, float64[:, :], float64[:], float64[:, :], float64[:], f8, f8, f8)",
+        parallel=True)
+def velocityAndApplyJacobianImplNumba(u, t, B, f, JB, expVec, dxInvHalf, dxInv, mu0):
+  n, k = B.shape[0], B.shape[1]
+  chunkSize = 2048
+  nChunks = (n + chunkSize - 1) // chunkSize
+  for c in prange(nChunks):
+    start = c * chunkSize
+    end = min(start + chunkSize, n)
+    for i in range(start, end):
+      if i == 0:
+        f[0] = dxInvHalf * (mu0*mu0 - u[0]*u[0]) + expVec[0]
+      else:
+        f[i] = dxInvHalf * (u[i-1]*u[i-1] - u[i]*u[i]) + expVec[i]
+    for j in range(k):
+      if start == 0:
+        JB[0, j] = -dxInv * u[0] * B[0, j]
+        first = 1
+      else:
+        first = start
+      for i in range(first, end):
+        JB[i, j] = dxInv * (u[i-1] * B[i-1, j] - u[i] * B[i, j])
+
+
+# Burgers1d on the full mesh: mesh, parameters, dtype, kernel selection,
+# velocity and the jacobian operations that need no stored jacobian.
+# The subclasses below only differ in how the jacobian is stored and in
+# jacobian/applyJacobian.
+class Burgers1dFullMesh:
+  def __init__(self, Ncell, velocityKernel='serial', mu=None, dtype=np.float64):
+    self.mu_    = np.array(defaultMu if mu is None else mu, dtype=np.float64)
+    self.dtype_ = np.dtype(dtype)
     self.xL_    = 0.
     self.xR_    = 100.
     self.Ncell_ = Ncell
@@ -34,11 +177,15 @@ class Burgers1dDenseJacobian:
     self.dxInvHalf_ = 0.
     self.xGrid_ = np.zeros(self.Ncell_)
     self.U0_    = np.zeros(self.Ncell_)
-    self.f_     = np.zeros(self.Ncell_)
-    self.expVec_= np.zeros(self.Ncell_)
-    self.diag_  = np.zeros(self.Ncell_)
-    self.ldiag_ = np.zeros(self.Ncell_-1)
-    self.J_   = np.zeros((self.Ncell_, self.Ncell_), order='F')
+    self.f_     = np.zeros(self.Ncell_, dtype=self.dtype_)
+    self.expVec_= np.zeros(self.Ncell_, dtype=self.dtype_)
+    self.diag_  = np.zeros(self.Ncell_, dtype=self.dtype_)
+    self.ldiag_ = np.zeros(self.Ncell_-1, dtype=self.dtype_)
+    self.velocityKernel_ = dtypeKernel(velocityKernels[velocityKernel], self.dtype_)
+    self.velocityAndApplyJacobianKernel_ = dtypeKernel(velocityAndApplyJacobianImplNumba,
+                                                       self.dtype_)
+    self.fillDiagKernel_ = dtypeKernel(fillDiag, self.dtype_)
+    self.applyJacobianVectorKernel_ = dtypeKernel(applyJacobianVectorImplNumba, self.dtype_)
     self.setup()
 
   def setup(self):
@@ -48,27 +195,53 @@ class Burgers1dDenseJacobian:
     for i in range(0, self.Ncell_):
       self.U0_[i] = 1.
       self.xGrid_[i] = self.dx_*i + self.dx_*0.5
-    self.expVec_ = self.mu_[1] * np.exp( self.mu_[2] * self.xGrid_ )
+    self.expVec_ = np.asarray(self.mu_[1] * np.exp( self.mu_[2] * self.xGrid_ ),
+                              dtype=self.dtype_)
 
   def velocity(self, u, t):
-    velocityImplNumba(u, t, self.f_, self.expVec_, self.dxInvHalf_, self.mu_[0])
+    self.velocityKernel_(u, t, self.f_, self.expVec_, self.dxInvHalf_, self.mu_[0])
     return self.f_
 
+  def velocityAndApplyJacobian(self, u, B, t, f, JB):
+    self.velocityAndApplyJacobianKernel_(u, t, B, f, JB, self.expVec_,
+                                         self.dxInvHalf_, self.dxInv_, self.mu_[0])
+
+  # main and sub-diagonal of the (lower bidiagonal) jacobian
+  def jacobianDiagonals(self, u, t, diag, ldiag):
+    self.fillDiagKernel_(u, diag, ldiag, self.dxInv_)
+
+  # Jv = J(u)*v without forming J
+  def applyJacobianVector(self, u, v, t, Jv):
+    self.applyJacobianVectorKernel_(u, v, Jv, self.dxInv_)
+
+
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+
+class Burgers1dDenseJacobian(Burgers1dFullMesh):
+  def __init__(self, Ncell, velocityKernel='serial', mu=None, dtype=np.float64):
+    super().__init__(Ncell, velocityKernel, mu, dtype)
+    self.jacobianKernel_ = dtypeKernel(jacobianImplNumba, self.dtype_)
+    self.J_   = np.zeros((self.Ncell_, self.Ncell_), order='F', dtype=self.dtype_)
+    from scipy.linalg import blas
+    self.gemm_ = blas.get_blas_funcs('gemm', dtype=self.dtype_)
+
   def jacobian(self, u, t):
-    jacobianImplNumba(u, t, self.J_, self.dxInv_, self.Ncell_)
+    self.jacobianKernel_(u, t, self.J_, self.dxInv_, self.Ncell_)
     return self.J_
 
   def applyJacobian(self, u, B, t):
     # we could call matmul here since J, B are dense, but calling blas
     # directly is more efficient
-    jacobianImplNumba(u, t, self.J_, self.dxInv_, self.Ncell_)
-    return linalg.blas.dgemm(1., self.J_, B)
+    self.jacobianKernel_(u, t, self.J_, self.dxInv_, self.Ncell_)
+    return self.gemm_(1., self.J_, B)
 
 #-------------------------------------------------------------------------
 #-------------------------------------------------------------------------
 #-------------------------------------------------------------------------
 
-@njit(["void(float64[:], float64[:], float64[:], f8)"])
+@kernel("void(float64[:], float64[:], float64[:], f8)", aot=True)
 def fillDiag(u, diag, ldiag, dxInv):
   n = len(u)
   for i in range(n-1):
@@ -77,40 +250,251 @@ def fillDiag(u, diag, ldiag, dxInv):
   diag[n-1] = -dxInv*u[n-1]
 
 
-class Burgers1dSparseJacobian:
-  def __init__(self, Ncell):
-    self.mu_    = np.array([5., 0.02, 0.02])
+# matrix-free J(u)*v for a single vector, for Newton-Krylov solvers
+@kernel("void(float64[:], float64[:], float64[:], f8)", aot=True)
+def applyJacobianVectorImplNumba(u, v, Jv, dxInv):
+  n = len(u)
+  Jv[0] = -dxInv * u[0] * v[0]
+  for i in range(1, n):
+    Jv[i] = dxInv * (u[i-1] * v[i-1] - u[i] * v[i])
+
+
+class Burgers1dSparseJacobian(Burgers1dFullMesh):
+  def __init__(self, Ncell, velocityKernel='serial', mu=None, dtype=np.float64):
+    super().__init__(Ncell, velocityKernel, mu, dtype)
+    from scipy.sparse import diags
+    self.diags_ = diags
+
+  def jacobian(self, u, t):
+    self.fillDiagKernel_(u, self.diag_, self.ldiag_, self.dxInv_)
+    return self.diags_( [self.ldiag_, self.diag_], [-1,0], format='csr')
+
+  def applyJacobian(self, u, B, t):
+    J = self.jacobian(u, t)
+    return J.dot(B)
+
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+
+# J*B where J is lower bidiagonal, stored as its main and lower diagonal,
+# so we only touch O(N*k) entries and never form the N x N matrix.
+# Loop is column-wise since the basis is normally stored column-major.
+@kernel("void(float64[:], float64[:], float64[:, :], float64[:, :])", aot=True)
+def applyBidiagJacobianImplNumba(diag, ldiag, B, JB):
+  n, k = B.shape[0], B.shape[1]
+  for j in range(k):
+    JB[0, j] = diag[0] * B[0, j]
+    for i in range(1, n):
+      JB[i, j] = diag[i] * B[i, j] + ldiag[i-1] * B[i-1, j]
+
+
+class Burgers1dBandedJacobian(Burgers1dFullMesh):
+  def __init__(self, Ncell, velocityKernel='serial', mu=None, dtype=np.float64):
+    super().__init__(Ncell, velocityKernel, mu, dtype)
+    # jacobian in lapack banded storage (one sub-diagonal), i.e.
+    # row 0 = main diagonal, row 1 = sub-diagonal (last entry unused),
+    # so it can be passed directly to linalg.solve_banded((1,0), ...)
+    self.J_     = np.zeros((2, self.Ncell_), dtype=self.dtype_)
+    # J*B is resized on demand to match the shape of the basis
+    self.JB_    = np.zeros((self.Ncell_, 0), dtype=self.dtype_)
+    self.applyBidiagJacobianKernel_ = dtypeKernel(applyBidiagJacobianImplNumba, self.dtype_)
+
+  def jacobian(self, u, t):
+    self.fillDiagKernel_(u, self.diag_, self.ldiag_, self.dxInv_)
+    self.J_[0,:]   = self.diag_
+    self.J_[1,:-1] = self.ldiag_
+    return self.J_
+
+  def applyJacobian(self, u, B, t):
+    if self.JB_.shape != B.shape:
+      self.JB_ = np.zeros(B.shape, order='F', dtype=self.dtype_)
+    self.fillDiagKernel_(u, self.diag_, self.ldiag_, self.dxInv_)
+    self.applyBidiagJacobianKernel_(self.diag_, self.ldiag_, B, self.JB_)
+    return self.JB_
+
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+
+# sample mesh kernels: u lives on the stencil mesh, f/JB only at the
+# sample cells. sampleLoc[s] is the stencil index of sample s and
+# upwindLoc[s] the stencil index of its left neighbor (-1 at the inflow).
+# (jit only: it is called from the jitted kernel below)
+@kernel("void(float64[:], f8, float64[:], int64[:], int64[:], float64[:], f8, f8)")
+def velocitySampleMeshImplNumba(u, t, f, sampleLoc, upwindLoc, expVec, dxInvHalf, mu0):
+  for s in range(len(f)):
+    i, iUp = sampleLoc[s], upwindLoc[s]
+    uUpSq = mu0*mu0 if iUp < 0 else u[iUp]*u[iUp]
+    f[s] = dxInvHalf * ( uUpSq - u[i]*u[i] ) + expVec[s]
+
+
+@kernel("void(float64[:], f8, float64[:, :], float64[:], float64[:, :], int64[:], int64[:], float64[:], f8, f8, f8)")
+def velocityAndApplyJacobianSampleMeshImplNumba(u, t, B, f, JB, sampleLoc, upwindLoc,
+                                                expVec, dxInvHalf, dxInv, mu0):
+  nS, k = JB.shape[0], JB.shape[1]
+  velocitySampleMeshImplNumba(u, t, f, sampleLoc, upwindLoc, expVec, dxInvHalf, mu0)
+  for j in range(k):
+    for s in range(nS):
+      i, iUp = sampleLoc[s], upwindLoc[s]
+      JB[s, j] = -dxInv * u[i] * B[i, j]
+      if iUp >= 0:
+        JB[s, j] += dxInv * u[iUp] * B[iUp, j]
+
+
+# Burgers1d evaluated only on a sample mesh for hyper-reduction:
+# states (and the basis rows B) are given on the stencil mesh, i.e. the
+# sample cells plus their upwind neighbors, while velocity and J*B are
+# returned only at the sample cells. Cost scales with the number of
+# samples, not with Ncell.
+class Burgers1dSampleMesh:
+  def __init__(self, Ncell, sampleMesh, stencilMesh, mu=None):
+    self.mu_    = np.array(defaultMu if mu is None else mu, dtype=np.float64)
     self.xL_    = 0.
     self.xR_    = 100.
     self.Ncell_ = Ncell
     self.dx_    = 0.
     self.dxInv_ = 0.
     self.dxInvHalf_ = 0.
-    self.xGrid_ = np.zeros(self.Ncell_)
-    self.U0_    = np.zeros(self.Ncell_)
-    self.f_     = np.zeros(self.Ncell_)
-    self.expVec_= np.zeros(self.Ncell_)
-    self.diag_  = np.zeros(self.Ncell_)
-    self.ldiag_ = np.zeros(self.Ncell_-1)
+    # global ids of sample and stencil cells (stencil sorted)
+    self.sampleMesh_  = np.asarray(sampleMesh, dtype=np.int64)
+    self.stencilMesh_ = np.asarray(stencilMesh, dtype=np.int64)
+    self.numSample_   = len(self.sampleMesh_)
+    self.sampleLoc_   = np.zeros(self.numSample_, dtype=np.int64)
+    self.upwindLoc_   = np.zeros(self.numSample_, dtype=np.int64)
+    self.xGrid_ = np.zeros(self.numSample_)
+    self.f_     = np.zeros(self.numSample_)
+    self.expVec_= np.zeros(self.numSample_)
+    self.JB_    = np.zeros((self.numSample_, 0))
+    self.velocityKernel_ = loadKernel(velocitySampleMeshImplNumba)
+    self.velocityAndApplyJacobianKernel_ = loadKernel(velocityAndApplyJacobianSampleMeshImplNumba)
     self.setup()
 
   def setup(self):
     self.dx_ = (self.xR_ - self.xL_)/float(self.Ncell_)
     self.dxInv_ = (1.0/self.dx_)
     self.dxInvHalf_ = 0.5 * self.dxInv_
-    for i in range(0, self.Ncell_):
-      self.U0_[i] = 1.
-      self.xGrid_[i] = self.dx_*i + self.dx_*0.5
+    self.xGrid_ = self.dx_*self.sampleMesh_ + self.dx_*0.5
     self.expVec_ = self.mu_[1] * np.exp( self.mu_[2] * self.xGrid_ )
 
+    # map sample cells and their upwind neighbors into the stencil mesh
+    self.sampleLoc_[:] = np.searchsorted(self.stencilMesh_, self.sampleMesh_)
+    self.upwindLoc_[:] = np.searchsorted(self.stencilMesh_, self.sampleMesh_-1)
+    self.upwindLoc_[self.sampleMesh_ == 0] = -1
+    if not np.array_equal(self.stencilMesh_[self.sampleLoc_], self.sampleMesh_):
+      raise ValueError('stencil mesh does not contain all sample cells')
+    upOk = self.upwindLoc_ >= 0
+    if not np.array_equal(self.stencilMesh_[self.upwindLoc_[upOk]],
+                          self.sampleMesh_[upOk]-1):
+      raise ValueError('stencil mesh does not contain all upwind neighbors')
+
   def velocity(self, u, t):
-    velocityImplNumba(u, t, self.f_, self.expVec_, self.dxInvHalf_, self.mu_[0])
+    self.velocityKernel_(u, t, self.f_, self.sampleLoc_, self.upwindLoc_,
+                         self.expVec_, self.dxInvHalf_, self.mu_[0])
     return self.f_
 
-  def jacobian(self, u, t):
-    fillDiag(u, self.diag_, self.ldiag_, self.dxInv_)
-    return diags( [self.ldiag_, self.diag_], [-1,0], format='csr')
-
   def applyJacobian(self, u, B, t):
-    J = self.jacobian(u, t)
-    return J.dot(B)
+    if self.JB_.shape != (self.numSample_, B.shape[1]):
+      self.JB_ = np.zeros((self.numSample_, B.shape[1]), order='F')
+    self.velocityAndApplyJacobianKernel_(u, t, B, self.f_, self.JB_,
+                                         self.sampleLoc_, self.upwindLoc_, self.expVec_,
+                                         self.dxInvHalf_, self.dxInv_, self.mu_[0])
+    return self.JB_
+
+  def velocityAndApplyJacobian(self, u, B, t, f, JB):
+    self.velocityAndApplyJacobianKernel_(u, t, B, f, JB,
+                                         self.sampleLoc_, self.upwindLoc_, self.expVec_,
+                                         self.dxInvHalf_, self.dxInv_, self.mu_[0])
+
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+#-------------------------------------------------------------------------
+
+# batched kernels: column p of U (Ncell x nParams) is the state of
+# parameter instance p, same arithmetic per column as the kernels above
+@kernel("void(float64[:, :], f8, float64[:, :], float64[:, :], f8, float64[:])")
+def velocityBatchImplNumba(U, t, F, expVec, dxInvHalf, mu0):
+  n, m = U.shape
+  for p in range(m):
+    uSqPrev = mu0[p]*mu0[p]
+    for i in range(n):
+      uSq = U[i, p]*U[i, p]
+      F[i, p] = dxInvHalf * ( uSqPrev - uSq ) + expVec[i, p]
+      uSqPrev = uSq
+
+
+@kernel("void(float64[:, :], float64[:, :], float64[:, :], f8)")
+def fillDiagBatch(U, diag, ldiag, dxInv):
+  n, m = U.shape
+  for p in range(m):
+    for i in range(n-1):
+      diag[i, p] = -dxInv*U[i, p]
+      ldiag[i, p] = dxInv*U[i, p]
+    diag[n-1, p] = -dxInv*U[n-1, p]
+
+
+# JB[:, :, p] = J(U[:, p]) * B for all p, together with F
+@kernel("void(float64[:, :], f8, float64[:, :], float64[:, :], float64[:, :, :], float64[:, :], f8, f8, float64[:])")
+def velocityAndApplyJacobianBatchImplNumba(U, t, B, F, JB, expVec, dxInvHalf, dxInv, mu0):
+  n, k, m = JB.shape
+  for p in range(m):
+    F[0, p] = dxInvHalf * (mu0[p]*mu0[p] - U[0, p]*U[0, p]) + expVec[0, p]
+    for i in range(1, n):
+      F[i, p] = dxInvHalf * (U[i-1, p]*U[i-1, p] - U[i, p]*U[i, p]) + expVec[i, p]
+    for j in range(k):
+      JB[0, j, p] = -dxInv * U[0, p] * B[0, j]
+      for i in range(1, n):
+        JB[i, j, p] = dxInv * (U[i-1, p] * B[i-1, j] - U[i, p] * B[i, j])
+
+
+# Burgers1d for a batch of parameters mus (nParams x 3, one row per
+# instance): states, velocities and diagonals are (Ncell x nParams)
+# column-major stacks and J*B is (Ncell x k x nParams), so a parametric
+# sweep is advanced with one kernel call per evaluation for all instances.
+class Burgers1dBatch:
+  def __init__(self, Ncell, mus):
+    self.mus_   = np.array(mus, dtype=np.float64, ndmin=2)
+    self.numParams_ = self.mus_.shape[0]
+    self.xL_    = 0.
+    self.xR_    = 100.
+    self.Ncell_ = Ncell
+    self.dx_    = 0.
+    self.dxInv_ = 0.
+    self.dxInvHalf_ = 0.
+    self.xGrid_ = np.zeros(self.Ncell_)
+    self.mu0_   = np.ascontiguousarray(self.mus_[:, 0])
+    self.F_     = np.zeros((self.Ncell_, self.numParams_), order='F')
+    self.expVec_= np.zeros((self.Ncell_, self.numParams_), order='F')
+    # J*B is resized on demand to match the shape of the basis
+    self.JB_    = np.zeros((self.Ncell_, 0, self.numParams_), order='F')
+    self.velocityKernel_ = loadKernel(velocityBatchImplNumba)
+    self.fillDiagKernel_ = loadKernel(fillDiagBatch)
+    self.velocityAndApplyJacobianKernel_ = loadKernel(velocityAndApplyJacobianBatchImplNumba)
+    self.setup()
+
+  def setup(self):
+    self.dx_ = (self.xR_ - self.xL_)/float(self.Ncell_)
+    self.dxInv_ = (1.0/self.dx_)
+    self.dxInvHalf_ = 0.5 * self.dxInv_
+    self.xGrid_ = self.dx_*np.arange(self.Ncell_) + self.dx_*0.5
+    for p in range(self.numParams_):
+      self.expVec_[:, p] = self.mus_[p, 1] * np.exp( self.mus_[p, 2] * self.xGrid_ )
+
+  def velocity(self, U, t):
+    self.velocityKernel_(U, t, self.F_, self.expVec_, self.dxInvHalf_, self.mu0_)
+    return self.F_
+
+  # main and sub-diagonal of the jacobian of each instance
+  def jacobianDiagonals(self, U, t, diag, ldiag):
+    self.fillDiagKernel_(U, diag, ldiag, self.dxInv_)
+
+  def applyJacobian(self, U, B, t):
+    if self.JB_.shape[1] != B.shape[1]:
+      self.JB_ = np.zeros((self.Ncell_, B.shape[1], self.numParams_), order='F')
+    self.velocityAndApplyJacobianKernel_(U, t, B, self.F_, self.JB_, self.expVec_,
+                                         self.dxInvHalf_, self.dxInv_, self.mu0_)
+    return self.JB_
+
+  def velocityAndApplyJacobian(self, U, B, t, F, JB):
+    self.velocityAndApplyJacobianKernel_(U, t, B, F, JB, self.expVec_,
+                                         self.dxInvHalf_, self.dxInv_, self.mu0_)
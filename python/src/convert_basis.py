@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+import sys, os, glob
+from argparse import ArgumentParser
+
+from basis_io import loadBasis, saveBasis
+
+#-------------------------------------------------------------------------
+# one-shot converter: for each
+#   <root>/data_fom_*_basis/meshSize*/basis*/basis.txt
+# write basis.npy next to it (skipped if already newer than the txt)
+#-------------------------------------------------------------------------
+
+def main(rootDir, force):
+  pattern = os.path.join(rootDir, "data_fom_*_basis", "meshSize*", "basis*", "basis.txt")
+  txtFiles = sorted(glob.glob(pattern))
+  if len(txtFiles) == 0:
+    print("No basis found matching ", pattern)
+
+  for txtFile in txtFiles:
+    npyFile = os.path.splitext(txtFile)[0] + ".npy"
+    # nested bases (run_fom_basis.py --mode nested) link to the full basis.npy
+    if os.path.islink(npyFile):
+      print("nested basis, skipping: ", npyFile)
+      continue
+    if not force and os.path.isfile(npyFile) and \
+       os.path.getmtime(npyFile) >= os.path.getmtime(txtFile):
+      print("up to date: ", npyFile)
+      continue
+    phi = loadBasis(txtFile)
+    saveBasis(npyFile, phi)
+    print("converted:  ", txtFile, phi.shape)
+
+
+if __name__== "__main__":
+  parser = ArgumentParser()
+  parser.add_argument("-root-dir", "--root-dir", dest="rootDir", default=".",
+                      help="directory containing the data_fom_*_basis folders, e.g. <working-dir>/cpp")
+  parser.add_argument("-force", "--force", dest="force", action="store_true")
+  args = parser.parse_args()
+  main(args.rootDir, args.force)
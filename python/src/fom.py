@@ -0,0 +1,423 @@
+
+import numpy as np
+import sys, time
+from numba import njit
+from scipy import linalg
+
+from burgers1d import Burgers1dDenseJacobian, Burgers1dSparseJacobian, Burgers1dBandedJacobian
+from incremental_svd import IncrementalSvdObserver
+import adaptive_stepping
+
+#-------------------------------------------------------------------------
+# full-order Burgers1d in python: explicit RK4 and implicit BDF1 (Euler)
+# with Newton, mirroring main_fom_rk4.cc/main_fom_bdf1.cc.
+# Observers are callables obs(step, t, x), called after each step
+# (and at step 0 with the initial condition).
+#-------------------------------------------------------------------------
+
+class FomRK4Stepper:
+  def __init__(self, appObj, fomSize):
+    self.appObj_ = appObj
+    self.xTmp_   = np.zeros(fomSize)
+    self.k1_     = np.zeros(fomSize)
+    self.k2_     = np.zeros(fomSize)
+    self.k3_     = np.zeros(fomSize)
+    self.k4_     = np.zeros(fomSize)
+
+  def doStep(self, x, t, dt):
+    dtHalf = 0.5*dt
+    xTmp, k1, k2, k3, k4 = self.xTmp_, self.k1_, self.k2_, self.k3_, self.k4_
+    # velocity returns the app's own buffer, so copy it out at each stage
+    k1[:] = self.appObj_.velocity(x, t)
+    np.multiply(k1, dtHalf, out=xTmp)
+    xTmp += x
+    k2[:] = self.appObj_.velocity(xTmp, t+dtHalf)
+    np.multiply(k2, dtHalf, out=xTmp)
+    xTmp += x
+    k3[:] = self.appObj_.velocity(xTmp, t+dtHalf)
+    np.multiply(k3, dt, out=xTmp)
+    xTmp += x
+    k4[:] = self.appObj_.velocity(xTmp, t+dt)
+
+    k2 += k3
+    k2 *= 2.
+    k1 += k2
+    k1 += k4
+    k1 *= dt/6.
+    x += k1
+
+
+# Newton correction for BDF1: R = x - xPrev - dt*f, and since J is lower
+# bidiagonal, (I - dt*J) dx = -R is solved by forward substitution in
+# the same O(N) pass that forms R
+@njit(["void(float64[:], float64[:], float64[:], float64[:], float64[:], f8, float64[:])"],
+      cache=True)
+def bdf1NewtonCorrectionImplNumba(x, xPrev, f, diag, ldiag, dt, dx):
+  n = len(x)
+  dx[0] = -(x[0] - xPrev[0] - dt*f[0]) / (1. - dt*diag[0])
+  for i in range(1, n):
+    rhs = -(x[i] - xPrev[i] - dt*f[i]) + dt*ldiag[i-1]*dx[i-1]
+    dx[i] = rhs / (1. - dt*diag[i])
+
+
+class FomBDF1Stepper:
+  def __init__(self, appObj, fomSize):
+    self.appObj_ = appObj
+    self.xPrev_  = np.zeros(fomSize)
+    self.diag_   = np.zeros(fomSize)
+    self.ldiag_  = np.zeros(fomSize-1)
+    self.dx_     = np.zeros(fomSize)
+    # same settings as the C++ NewtonRaphson
+    self.maxIt_  = 10
+    self.tol_    = 1e-13
+
+  def setMaxIterations(self, maxIt): self.maxIt_ = maxIt
+  def setTolerance(self, tol): self.tol_ = tol
+
+  def doStep(self, x, t, dt):
+    self.xPrev_[:] = x
+    tNext = t + dt
+    for it in range(self.maxIt_):
+      f = self.appObj_.velocity(x, tNext)
+      self.appObj_.jacobianDiagonals(x, tNext, self.diag_, self.ldiag_)
+      bdf1NewtonCorrectionImplNumba(x, self.xPrev_, f, self.diag_, self.ldiag_, dt, self.dx_)
+      x += self.dx_
+      # exit when norm of correction is below tolerance
+      if linalg.norm(self.dx_) < self.tol_:
+        break
+
+
+#-------------------------------------------------------------------------
+# BDF1 with Jacobian-free Newton-Krylov: each Newton correction solves
+#   (I - dt*J) dx = -R
+# with scipy gmres on a LinearOperator whose matvec only needs J*v:
+# - jvMode 'analytic': appObj.applyJacobianVector (numba kernel), falls
+#   back to 'fd' if the app does not have it
+# - jvMode 'fd': J*v ~ (f(uLag + eps*v) - f(uLag))/eps
+# J is linearized at uLag, refreshed every jacobianLag Newton iterations
+# (1 = plain Newton), carried over steps in between, and refreshed right
+# away if gmres did not converge.
+# Preconditioner ('bidiag': exact solve with the bidiagonal I - dt*J,
+# 'jacobi': its diagonal only, 'none') is rebuilt at the start of a step
+# every precondReuse steps and reused by all the iterations in between.
+#-------------------------------------------------------------------------
+
+# z = (I - dt*J)^{-1} v for J lower bidiagonal, by forward substitution
+@njit(["void(float64[:], float64[:], f8, float64[:], float64[:])"], cache=True)
+def bidiagShiftedSolveImplNumba(diag, ldiag, dt, v, z):
+  n = len(v)
+  z[0] = v[0] / (1. - dt*diag[0])
+  for i in range(1, n):
+    z[i] = (v[i] + dt*ldiag[i-1]*z[i-1]) / (1. - dt*diag[i])
+
+
+class FomBDF1JFNKStepper:
+  def __init__(self, appObj, fomSize, jvMode='analytic', precond='bidiag',
+               jacobianLag=1, precondReuse=1):
+    from scipy.sparse.linalg import LinearOperator, gmres
+    self.gmres_  = gmres
+    self.appObj_ = appObj
+    if jvMode == 'analytic' and not hasattr(appObj, 'applyJacobianVector'):
+      jvMode = 'fd'
+    self.jvMode_ = jvMode
+    self.precond_ = precond
+    self.jacobianLag_  = jacobianLag
+    self.precondReuse_ = precondReuse
+    self.xPrev_  = np.zeros(fomSize)
+    self.R_      = np.zeros(fomSize)
+    self.uLag_   = np.zeros(fomSize)
+    self.fLag_   = np.zeros(fomSize)
+    self.uPert_  = np.zeros(fomSize)
+    self.Jv_     = np.zeros(fomSize)
+    self.Av_     = np.zeros(fomSize)
+    self.Mv_     = np.zeros(fomSize)
+    self.pdiag_  = np.zeros(fomSize)
+    self.pldiag_ = np.zeros(fomSize-1)
+    self.A_ = LinearOperator((fomSize, fomSize), matvec=self.applyShiftedJacobian,
+                             dtype=np.float64)
+    self.M_ = None if precond == 'none' else \
+      LinearOperator((fomSize, fomSize), matvec=self.applyPreconditioner, dtype=np.float64)
+    # iterations since J was refreshed, steps since M was rebuilt
+    self.jacobianAge_ = jacobianLag
+    self.precondAge_  = precondReuse
+    self.tLag_, self.dt_ = 0., 0.
+    # same Newton settings as FomBDF1Stepper; gmres relative tolerance
+    # (inexact Newton: the outer iterations still converge to tol) and at
+    # most gmresMaxIt restarts of gmresRestart iterations. A fd J*v is only
+    # accurate to ~sqrt(machine eps), gmres stagnates if asked for much more
+    self.maxIt_  = 10
+    self.tol_    = 1e-13
+    self.gmresRtol_ = 1e-6
+    self.gmresRestart_ = 20
+    self.gmresMaxIt_ = 5
+    self.resetStats()
+
+  def setMaxIterations(self, maxIt): self.maxIt_ = maxIt
+  def setTolerance(self, tol): self.tol_ = tol
+  def setLinearTolerance(self, rtol): self.gmresRtol_ = rtol
+
+  def resetStats(self):
+    self.stats_ = {'newtonIterations': 0, 'gmresIterations': 0, 'jacobianVectorProducts': 0,
+                   'jacobianRefreshes': 0, 'precondBuilds': 0}
+
+  # Jv = J(uLag)*v
+  def applyJacobianVector(self, v):
+    self.stats_['jacobianVectorProducts'] += 1
+    if self.jvMode_ == 'analytic':
+      self.appObj_.applyJacobianVector(self.uLag_, v, self.tLag_, self.Jv_)
+      return self.Jv_
+    vNorm = linalg.norm(v)
+    if vNorm == 0.:
+      self.Jv_[:] = 0.
+      return self.Jv_
+    eps = np.sqrt(np.finfo(np.float64).eps) * (1. + linalg.norm(self.uLag_)) / vNorm
+    np.multiply(v, eps, out=self.uPert_)
+    self.uPert_ += self.uLag_
+    np.subtract(self.appObj_.velocity(self.uPert_, self.tLag_), self.fLag_, out=self.Jv_)
+    self.Jv_ /= eps
+    return self.Jv_
+
+  # v - dt*J(uLag)*v
+  def applyShiftedJacobian(self, v):
+    v = v.ravel()
+    Jv = self.applyJacobianVector(v)
+    np.multiply(Jv, -self.dt_, out=self.Av_)
+    self.Av_ += v
+    return self.Av_
+
+  def applyPreconditioner(self, v):
+    v = v.ravel()
+    if self.precond_ == 'bidiag':
+      bidiagShiftedSolveImplNumba(self.pdiag_, self.pldiag_, self.dt_, v, self.Mv_)
+    else:
+      np.multiply(self.pdiag_, -self.dt_, out=self.Mv_)
+      self.Mv_ += 1.
+      np.divide(v, self.Mv_, out=self.Mv_)
+    return self.Mv_
+
+  def refreshJacobian(self, x, t, f):
+    self.uLag_[:] = x
+    self.tLag_ = t
+    if self.jvMode_ == 'fd':
+      self.fLag_[:] = f
+    self.jacobianAge_ = 0
+    self.stats_['jacobianRefreshes'] += 1
+
+  def countGmresIteration(self, residualNorm):
+    self.stats_['gmresIterations'] += 1
+
+  def doStep(self, x, t, dt):
+    self.xPrev_[:] = x
+    tNext = t + dt
+    self.dt_ = dt
+    if self.M_ is not None and self.precondAge_ >= self.precondReuse_:
+      self.appObj_.jacobianDiagonals(x, tNext, self.pdiag_, self.pldiag_)
+      self.precondAge_ = 0
+      self.stats_['precondBuilds'] += 1
+    for it in range(self.maxIt_):
+      self.stats_['newtonIterations'] += 1
+      f = self.appObj_.velocity(x, tNext)
+      # R = x - xPrev - dt*f
+      np.multiply(f, -dt, out=self.R_)
+      self.R_ += x
+      self.R_ -= self.xPrev_
+      if self.jacobianAge_ >= self.jacobianLag_:
+        self.refreshJacobian(x, tNext, f)
+      self.R_ *= -1.
+      dx, info = self.gmres_(self.A_, self.R_, rtol=self.gmresRtol_, atol=0.,
+                             restart=self.gmresRestart_, maxiter=self.gmresMaxIt_, M=self.M_,
+                             callback=self.countGmresIteration, callback_type='pr_norm')
+      x += dx
+      self.jacobianAge_ += 1
+      # a lagged J too far off, refresh it at the next iteration
+      if info != 0:
+        self.jacobianAge_ = self.jacobianLag_
+      # exit when norm of correction is below tolerance
+      if linalg.norm(dx) < self.tol_:
+        break
+    self.precondAge_ += 1
+
+
+def integrateNSteps(stepper, x, t0, dt, nsteps, observers=[]):
+  for obs in observers: obs(0, t0, x)
+  for step in range(nsteps):
+    t = t0 + step*dt
+    stepper.doStep(x, t, dt)
+    for obs in observers: obs(step+1, t+dt, x)
+
+
+#-------------------------------------------------------------------------
+# observer storing the snapshots, like the C++ EigenObserver
+#-------------------------------------------------------------------------
+class SnapshotObserver:
+  def __init__(self, nsteps, xRef, snapshotsFreq):
+    # make sure number of steps is divisible by sampling frequency
+    if nsteps % snapshotsFreq != 0:
+      raise Exception("Snapshot frequency not a divisor of steps")
+    self.xRef_ = np.copy(xRef)
+    self.snapshotsFreq_ = snapshotsFreq
+    self.A_ = np.zeros((len(xRef), nsteps//snapshotsFreq), order='F')
+    self.count_ = 0
+
+  def __call__(self, step, t, x):
+    # we do not keep the step = 0
+    if step % self.snapshotsFreq_ == 0 and step > 0:
+      np.subtract(x, self.xRef_, out=self.A_[:, self.count_])
+      self.count_ += 1
+
+  def viewSnapshots(self): return self.A_
+
+
+#-------------------------------------------------------------------------
+# input file: same keys as cpp/src/input.template and InputParser
+#-------------------------------------------------------------------------
+def parseInputFile(inputFile):
+  params = {'numCell': 0, 'dt': 0., 'finalTime': 0., 'observerOn': 0,
+            'shapshotsFreq': 0, 'shapshotsFileName': 'empty',
+            'basisFileName': 'empty', 'romOn': 0, 'romSize': 0,
+            # python only, optional
+            'jacobianType': 'sparse', 'incrementalSvd': 0,
+            'adaptive': 0, 'rtol': 1e-6, 'atol': 1e-8,
+            'newtonSolver': 'direct', 'jvMode': 'analytic', 'precond': 'bidiag',
+            'jacobianLag': 1, 'precondReuse': 1, 'gmresRtol': 1e-6}
+  converters = {'numCell': int, 'dt': float, 'finalTime': float, 'observerOn': int,
+                'shapshotsFreq': int, 'romOn': int, 'romSize': int, 'incrementalSvd': int,
+                'adaptive': int, 'rtol': float, 'atol': float,
+                'jacobianLag': int, 'precondReuse': int, 'gmresRtol': float}
+  # like the C++ parser, the observer (rom) keys are only read once
+  # observerOn (romOn) is 1, the template placeholders may be left there
+  observerKeys = ['shapshotsFreq', 'shapshotsFileName', 'basisFileName']
+  romKeys = ['romSize', 'basisFileName']
+  with open(inputFile, "rt") as fin:
+    for line in fin:
+      cols = line.split()
+      if len(cols) < 2 or cols[0] not in params: continue
+      if cols[0] in observerKeys + romKeys:
+        if not ((cols[0] in observerKeys and params['observerOn'] == 1) or
+                (cols[0] in romKeys and params['romOn'] == 1)):
+          continue
+      params[cols[0]] = converters.get(cols[0], str)(cols[1])
+  # same truncation as the C++ InputParser
+  params['numSteps'] = int(params['finalTime']/params['dt']) if params['dt'] != 0. else 0
+
+  for key in ['numCell', 'numSteps', 'observerOn', 'shapshotsFreq', 'shapshotsFileName',
+              'basisFileName', 'jacobianType']:
+    print(key, "=", params[key])
+
+  if params['numCell'] == 0: raise Exception("Invalid numCell")
+  if params['dt'] == 0.: raise Exception("Invalid dt")
+  if params['finalTime'] == 0.: raise Exception("Invalid finalT")
+  if params['observerOn'] == 1:
+    if params['adaptive'] == 1: raise Exception("Snapshots need a fixed dt, unset adaptive")
+    if params['shapshotsFreq'] == 0: raise Exception("Invalid snapshotsFreq")
+    if params['shapshotsFileName'] == 'empty': raise Exception("Invalid shapshotsFileName")
+    if params['basisFileName'] == 'empty': raise Exception("Invalid basisFileName")
+  return params
+
+
+appClasses = {'sparse': Burgers1dSparseJacobian,
+              'dense' : Burgers1dDenseJacobian,
+              'banded': Burgers1dBandedJacobian}
+
+fomSteppers = {'rk4' : FomRK4Stepper,
+               'bdf1': FomBDF1Stepper}
+
+# newtonSolver = jfnk in the input file selects FomBDF1JFNKStepper for bdf1
+def createStepper(appObj, fomSize, scheme, params):
+  if scheme == 'bdf1' and params['newtonSolver'] == 'jfnk':
+    stepper = FomBDF1JFNKStepper(appObj, fomSize, params['jvMode'], params['precond'],
+                                 params['jacobianLag'], params['precondReuse'])
+    stepper.setLinearTolerance(params['gmresRtol'])
+    return stepper
+  return fomSteppers[scheme](appObj, fomSize)
+
+
+def resetStepperStats(stepper):
+  if hasattr(stepper, 'stats_'):
+    stepper.resetStats()
+
+def printStepperStats(stepper):
+  if hasattr(stepper, 'stats_'):
+    for key, value in stepper.stats_.items():
+      print(key, "=", value)
+
+
+# error controlled counterparts, see adaptive_stepping.py
+def createAdaptiveStepper(appObj, fomSize, scheme, params):
+  rhs = adaptive_stepping.appRhs(appObj)
+  if scheme == 'rk4':
+    return adaptive_stepping.DormandPrince45Stepper(rhs, fomSize)
+  return adaptive_stepping.ImplicitEulerErrorStepper(
+    createStepper(appObj, fomSize, scheme, params), rhs, fomSize)
+
+
+# with adaptive = 1 in the input file, integrates to finalTime with error
+# control (rtol, atol) starting from dt, and writes the step sizes to
+# dt_history.txt
+def runAdaptiveFromParams(params, scheme):
+  numCell, dt = params['numCell'], params['dt']
+  appObj = appClasses[params['jacobianType']](numCell)
+  x = np.ones(numCell)
+  stepper = createAdaptiveStepper(appObj, numCell, scheme, params)
+  controller = adaptive_stepping.StepSizeController(params['rtol'], params['atol'])
+  history = adaptive_stepping.StepSizeHistory()
+
+  # untimed warm up step on a copy for numba compilation
+  stepper.trialStep(np.copy(x), 0., dt)
+  if scheme == 'bdf1':
+    resetStepperStats(stepper.implicitStepper_)
+
+  startTime = time.time()
+  adaptive_stepping.integrateAdaptive(stepper, controller, x, 0., params['finalTime'], dt,
+                                      history=history)
+  endTime = time.time()
+  elapsed = endTime-startTime
+  print("accepted steps = ", history.numAccepted(), " rejected steps = ", history.numRejected())
+  print("Elapsed time: {0:10.10f} ".format(elapsed) )
+  if scheme == 'bdf1':
+    printStepperStats(stepper.implicitStepper_)
+  history.save("dt_history.txt")
+  np.savetxt("yFom.txt", x, fmt='%.15f')
+
+
+def runFromInputFile(inputFile, scheme):
+  params = parseInputFile(inputFile)
+  if params['adaptive'] == 1:
+    runAdaptiveFromParams(params, scheme)
+    return
+  numCell, dt, nsteps = params['numCell'], params['dt'], params['numSteps']
+
+  appObj = appClasses[params['jacobianType']](numCell)
+  x = np.ones(numCell)
+  stepper = createStepper(appObj, numCell, scheme, params)
+
+  # untimed warm up step on a copy for numba compilation
+  stepper.doStep(np.copy(x), 0., dt)
+  resetStepperStats(stepper)
+
+  observers = []
+  if params['observerOn'] == 1:
+    if params['incrementalSvd'] == 1:
+      obs = IncrementalSvdObserver(x, params['shapshotsFreq'], nsteps//params['shapshotsFreq'])
+    else:
+      obs = SnapshotObserver(nsteps, x, params['shapshotsFreq'])
+    observers.append(obs)
+
+  startTime = time.time()
+  integrateNSteps(stepper, x, 0., dt, nsteps, observers)
+
+  if params['observerOn'] == 1:
+    if params['incrementalSvd'] == 1:
+      obs.writeBasis(params['basisFileName'])
+    else:
+      np.savetxt(params['shapshotsFileName'], obs.viewSnapshots(), fmt='%.15f')
+      U, s, VT = linalg.svd(obs.viewSnapshots(), full_matrices=False, lapack_driver='gesdd')
+      print("Print basis to file")
+      np.savetxt(params['basisFileName'], U, fmt='%.15f')
+      print("Done with basis")
+
+  endTime = time.time()
+  elapsed = endTime-startTime
+  print("Elapsed time: {0:10.10f} ".format(elapsed) )
+  printStepperStats(stepper)
+  np.savetxt("yFom.txt", x, fmt='%.15f')
@@ -0,0 +1,106 @@
+
+import numpy as np
+from scipy import linalg
+
+#-------------------------------------------------------------------------
+# offline tools for hyper-reduction (sample mesh) of the Burgers1d ROMs:
+# - pick sample cells from a basis with DEIM or Q-DEIM (+ oversampling)
+# - build the stencil mesh = sample cells + their upwind neighbors
+# - precompute the gappy-POD projector used by Galerkin so that
+#   phi^T f ~= projector * f[sampleMesh]
+#-------------------------------------------------------------------------
+
+# classic greedy DEIM, returns one index per column of U
+def deimSampleIndices(U):
+  n, m = U.shape
+  idx = [np.argmax(np.abs(U[:, 0]))]
+  for j in range(1, m):
+    # interpolate column j at the current points, pick the largest error
+    c = linalg.solve(U[idx, :j], U[idx, j])
+    r = U[:, j] - U[:, :j].dot(c)
+    r[idx] = 0.
+    idx.append(np.argmax(np.abs(r)))
+  return np.array(idx, dtype=np.int64)
+
+
+# Q-DEIM: the first m pivots of a column-pivoted QR of U^T.
+# If more samples than columns are requested (gappy POD oversampling),
+# the rest are the cells with largest leverage score (row norm of U).
+def qdeimSampleIndices(U, numSamples):
+  n, m = U.shape
+  if numSamples > n:
+    raise ValueError('cannot pick {} samples out of {} cells'.format(numSamples, n))
+  _, _, piv = linalg.qr(U.T, mode='economic', pivoting=True)
+  idx = list(piv[:min(m, numSamples)])
+  if numSamples > m:
+    lev = np.sum(U*U, axis=1)
+    lev[idx] = -1.
+    idx += list(np.argsort(-lev)[:numSamples-m])
+  return np.array(idx, dtype=np.int64)
+
+
+def computeSampleMesh(U, numSamples, method='qdeim'):
+  if method == 'qdeim':
+    idx = qdeimSampleIndices(U, numSamples)
+  elif method == 'deim':
+    idx = deimSampleIndices(U)
+    if numSamples > len(idx):
+      # oversample with q-deim's leverage-score fill
+      extra = qdeimSampleIndices(U, numSamples)
+      idx = np.concatenate([idx, np.setdiff1d(extra, idx)])[:numSamples]
+  else:
+    raise ValueError('Invalid choice for sample mesh method = {}'.format(method))
+  return np.sort(np.unique(idx))
+
+
+# each sampled cell needs its left (upwind) neighbor to evaluate the flux
+def computeStencilMesh(sampleMesh):
+  upwind = sampleMesh[sampleMesh > 0] - 1
+  return np.union1d(sampleMesh, upwind).astype(np.int64)
+
+
+# velocity f(xRef + s_j) at each state snapshot s_j (the FOM observers
+# store x - xRef): the samples should interpolate the term that is
+# hyper-reduced, not the state. The velocity of the Burgers1d apps does not
+# depend on t explicitly, so the state snapshots are all that is needed.
+def computeVelocitySnapshots(snapshots, xRef):
+  from burgers1d import Burgers1dBandedJacobian
+  appObj = Burgers1dBandedJacobian(snapshots.shape[0])
+  F = np.zeros(snapshots.shape, order='F')
+  for j in range(snapshots.shape[1]):
+    F[:, j] = appObj.velocity(xRef + snapshots[:, j], 0.)
+  return F
+
+
+# basis for the velocity: left singular vectors of the velocity snapshots
+def computeVelocityBasis(velocitySnapshots, numModes):
+  U, s, _ = linalg.svd(velocitySnapshots, full_matrices=False, lapack_driver='gesdd')
+  return U[:, :numModes]
+
+
+# gappy POD projector M = phi^T U (P^T U)^+ of size romSize x numSamples,
+# with P selecting the sample cells. If the velocity basis U is phi itself
+# this reduces to M = (P^T phi)^+ since phi is orthonormal.
+def computeGappyProjector(phi, sampleMesh, U=None):
+  if U is None:
+    return np.asfortranarray(linalg.pinv(phi[sampleMesh, :]))
+  return np.asfortranarray(phi.T.dot(U).dot(linalg.pinv(U[sampleMesh, :])))
+
+
+#-------------------------------------------------------------------------
+# files making up a sample mesh, stored next to each other in a directory
+#-------------------------------------------------------------------------
+sampleMeshFileName  = "sample_mesh.txt"
+stencilMeshFileName = "stencil_mesh.txt"
+projectorFileName   = "projector.txt"
+
+def writeSampleMesh(destDir, sampleMesh, stencilMesh, projector):
+  np.savetxt(destDir + "/" + sampleMeshFileName, sampleMesh, fmt='%d')
+  np.savetxt(destDir + "/" + stencilMeshFileName, stencilMesh, fmt='%d')
+  np.savetxt(destDir + "/" + projectorFileName, projector, fmt='%.16e')
+
+def readSampleMesh(srcDir):
+  sampleMesh  = np.atleast_1d(np.loadtxt(srcDir + "/" + sampleMeshFileName, dtype=np.int64))
+  stencilMesh = np.atleast_1d(np.loadtxt(srcDir + "/" + stencilMeshFileName, dtype=np.int64))
+  projector   = np.asfortranarray(np.loadtxt(srcDir + "/" + projectorFileName, ndmin=2))
+  return sampleMesh, stencilMesh, projector
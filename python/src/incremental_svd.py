@@ -0,0 +1,115 @@
+
+import numpy as np
+from scipy import linalg
+
+from basis_io import saveBasis
+
+#-------------------------------------------------------------------------
+# Observer for a FOM time loop that builds the POD basis on the fly with
+# Brand's incremental SVD: for each new snapshot c = x - xRef,
+#   p = U^T c,  r = c - U p,  rho = ||r||
+#   K = [ diag(S)  p  ]
+#       [   0     rho ]  =  Uk Sk Vk^T
+#   U <- [U, r/rho] Uk,  S <- Sk
+# then the rank is truncated to maxRank and to the leading modes holding
+# energyThreshold of the energy sum(S^2). Only U (fomSize x maxRank+1)
+# is stored, never the snapshot matrix; the right singular vectors are
+# not needed for the basis so they are not tracked.
+#
+# Same calling convention as the C++ EigenObserver: obs(step, t, x),
+# snapshots are taken every snapshotsFreq steps, step 0 excluded.
+#-------------------------------------------------------------------------
+
+class IncrementalSvdObserver:
+  def __init__(self, xRef, snapshotsFreq, maxRank,
+               energyThreshold=1., orthoTol=1e-12, reorthFreq=20):
+    self.xRef_ = np.copy(xRef)
+    self.snapshotsFreq_ = snapshotsFreq
+    self.maxRank_ = maxRank
+    self.energyThreshold_ = energyThreshold
+    # a new snapshot only adds a direction if its component orthogonal
+    # to the current basis is above orthoTol relative to its norm
+    self.orthoTol_ = orthoTol
+    self.reorthFreq_ = reorthFreq
+    fomSize = len(xRef)
+    # two buffers that are swapped at each update to avoid reallocating
+    self.U_ = np.zeros((fomSize, maxRank+1), order='F')
+    self.Uwork_ = np.zeros((fomSize, maxRank+1), order='F')
+    self.S_ = np.zeros(0)
+    self.c_ = np.zeros(fomSize)
+    self.rank_ = 0
+    self.count_ = 0
+
+  def __call__(self, step, t, x):
+    # we do not keep the step = 0
+    if step % self.snapshotsFreq_ == 0 and step > 0:
+      np.subtract(x, self.xRef_, out=self.c_)
+      self.update(self.c_)
+
+  def update(self, c):
+    k = self.rank_
+    cNorm = linalg.norm(c)
+    self.count_ += 1
+    if cNorm == 0.:
+      return
+
+    if k == 0:
+      self.U_[:, 0] = c/cNorm
+      self.S_ = np.array([cNorm])
+      self.rank_ = 1
+      return
+
+    U = self.U_[:, :k]
+    p = U.T.dot(c)
+    r = c - U.dot(p)
+    rho = linalg.norm(r)
+
+    K = np.zeros((k+1, k+1))
+    K[:k, :k] = np.diag(self.S_)
+    K[:k, k] = p
+    if rho > self.orthoTol_*cNorm:
+      K[k, k] = rho
+      self.U_[:, k] = r/rho
+      Uk, Sk, _ = linalg.svd(K, lapack_driver='gesdd')
+      newRank = k+1
+    else:
+      # snapshot already in span(U): rotate within it, rank unchanged
+      Uk, Sk, _ = linalg.svd(K[:k, :], full_matrices=False, lapack_driver='gesdd')
+      newRank = k
+
+    newRank = min(self.truncatedRank(Sk[:newRank]), self.maxRank_)
+    # U <- [U, r/rho] Uk, keeping the leading newRank columns
+    nCols = Uk.shape[0]
+    self.Uwork_[:, :newRank] = self.U_[:, :nCols].dot(Uk[:, :newRank])
+    self.U_, self.Uwork_ = self.Uwork_, self.U_
+    self.S_ = Sk[:newRank].copy()
+    self.rank_ = newRank
+
+    # round-off slowly destroys the orthogonality of U
+    if self.count_ % self.reorthFreq_ == 0:
+      self.reorthogonalize()
+
+  # smallest rank holding energyThreshold of the energy
+  def truncatedRank(self, S):
+    if self.energyThreshold_ >= 1.:
+      return len(S)
+    energy = np.cumsum(S**2)
+    return int(np.searchsorted(energy, self.energyThreshold_*energy[-1]) + 1)
+
+  def reorthogonalize(self):
+    k = self.rank_
+    Q, R = linalg.qr(self.U_[:, :k], mode='economic')
+    Ur, Sr, _ = linalg.svd(R*self.S_, lapack_driver='gesdd')
+    self.U_[:, :k] = Q.dot(Ur)
+    self.S_ = Sr
+
+  def numModes(self): return self.rank_
+  def singularValues(self): return self.S_
+  def viewBasis(self): return self.U_[:, :self.rank_]
+
+  # .npy via basis_io, anything else as ascii like the C++ basis.txt
+  def writeBasis(self, fileName):
+    if fileName.endswith(".npy"):
+      saveBasis(fileName, self.viewBasis())
+    else:
+      np.savetxt(fileName, self.viewBasis(), fmt='%.15f')
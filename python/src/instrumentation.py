@@ -0,0 +1,76 @@
+
+from time import perf_counter_ns
+
+#-------------------------------------------------------------------------
+# opt-in per-phase counters for the ROM hot path.
+#
+# PhaseCounters.wrapMethods replaces methods of an object (app, stepper,
+# solver, ...) by wrappers counting calls and accumulating perf_counter_ns
+# per phase. The wrappers are set as instance attributes, so they are
+# picked up both by python callers and by the pressio4py bindings, which
+# look the app methods up by name on the object.
+# Nothing is wrapped unless counters are passed to the drivers, so when
+# disabled there is no overhead at all.
+#
+# Phases are inclusive: e.g. 'step' contains everything done in a step,
+# and 'residualAndJacobian' contains the app 'velocityAndApplyJacobian'.
+#-------------------------------------------------------------------------
+
+class PhaseCounters:
+  def __init__(self):
+    self.calls_ = {}
+    self.ns_    = {}
+
+  def reset(self):
+    for name in self.calls_:
+      self.calls_[name] = 0
+      self.ns_[name] = 0
+
+  def wrap(self, name, fnc):
+    calls, ns = self.calls_, self.ns_
+    calls.setdefault(name, 0)
+    ns.setdefault(name, 0)
+    def wrapped(*args):
+      startTime = perf_counter_ns()
+      res = fnc(*args)
+      ns[name] += perf_counter_ns() - startTime
+      calls[name] += 1
+      return res
+    return wrapped
+
+  # methods is a dict {method name: phase name}, methods missing
+  # from obj are skipped so the same dict works for all app classes
+  def wrapMethods(self, obj, methods):
+    for method, name in methods.items():
+      if hasattr(obj, method):
+        setattr(obj, method, self.wrap(name, getattr(obj, method)))
+    return obj
+
+  # breakdown for numSteps time steps, times in seconds,
+  # phases wrapped but never called (e.g. jacobian for galerkin) are left out
+  def report(self, numSteps):
+    res = {}
+    for name in sorted(self.calls_.keys()):
+      if self.calls_[name] == 0: continue
+      calls, seconds = self.calls_[name], self.ns_[name]*1e-9
+      res[name] = {'calls': calls, 'callsPerStep': calls/float(numSteps),
+                   'time': seconds, 'timePerStep': seconds/float(numSteps)}
+    # one linear solve per Gauss-Newton iteration
+    if 'linearSolve' in self.calls_:
+      res['gaussNewtonItersPerStep'] = self.calls_['linearSolve']/float(numSteps)
+    return res
+
+
+# app callbacks, common to all Burgers1d app classes
+appMethods = {'velocity': 'velocity',
+              'jacobian': 'jacobian',
+              'applyJacobian': 'applyJacobian',
+              'velocityAndApplyJacobian': 'velocityAndApplyJacobian'}
+
+def printReport(report):
+  for name, v in report.items():
+    if isinstance(v, dict):
+      print("{:28s} calls/step = {:8.2f}  time/step = {:.6e} s".format(
+        name, v['callsPerStep'], v['timePerStep']))
+    else:
+      print("{:28s} {:.2f}".format(name, v))
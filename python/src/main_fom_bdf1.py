@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+
+import sys
+from fom import runFromInputFile
+
+# python counterpart of main_fom_bdf1.cc: same input file and output,
+# usage: ./main_fom_bdf1.py input.txt
+if __name__== "__main__":
+  if len(sys.argv) != 2:
+    print("Usage: " + sys.argv[0] + " inputFile")
+    sys.exit(1)
+  runFromInputFile(sys.argv[1], "bdf1")
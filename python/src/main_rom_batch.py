@@ -0,0 +1,127 @@
+
+import numpy as np
+import sys, time
+from argparse import ArgumentParser
+
+from burgers1d import Burgers1dBatch, defaultMu
+from basis_io import loadBasis
+import instrumentation
+
+# parametric sweep: advances nParams instances of the Galerkin (RK4) or
+# LSPG (implicit Euler) ROM at once, see GalerkinRK4BatchStepper in
+# rom_galerkin.py and LspgEulerBatchStepper in rom_lspg.py. The generalized
+# coordinates are a (romSize x nParams) matrix, one column per instance.
+
+# default samples: inflow value mu[0] spread around the default one
+def parameterSamples(numParams):
+  mus = np.tile(defaultMu, (numParams, 1))
+  mus[:, 0] = np.linspace(0.9*defaultMu[0], 1.1*defaultMu[0], numParams)
+  return mus
+
+
+def doGalerkinBatchForTargetSteps(nsteps, appObj, yRef, phi, yRom, t0, dt, counters=None):
+  import rom_galerkin
+  stepper = rom_galerkin.GalerkinRK4BatchStepper(appObj, yRef, phi, yRom.shape[1])
+  if counters is not None:
+    counters.wrapMethods(stepper, {'doStep': 'step', 'reconstructFomState': 'reconstruct',
+                                   'project': 'projection'})
+  rom_galerkin.integrateNStepsRK4(stepper, yRom, t0, dt, nsteps)
+
+
+def doLSPGBatchForTargetSteps(nsteps, appObj, yRef, phi, yRom, t0, dt,
+                              nlsMaxIt, nlsTol, linSolverName, counters=None):
+  import rom_lspg
+  stepper = rom_lspg.LspgEulerBatchStepper(appObj, yRef, phi, yRom.shape[1])
+  nlsO = rom_lspg.GaussNewtonBatch(stepper, linSolverName)
+  if counters is not None:
+    counters.wrapMethods(stepper, {'reconstructFomState': 'reconstruct',
+                                   'residualAndJacobian': 'residualAndJacobian'})
+    counters.wrapMethods(nlsO.linSolver_, {'solve': 'linearSolve'})
+    counters.wrapMethods(nlsO, {'solve': 'step'})
+  nlsO.setMaxIterations(nlsMaxIt)
+  nlsO.setTolerance(nlsTol)
+  rom_lspg.integrateNSteps(stepper, yRom, t0, dt, nsteps, nlsO)
+
+
+# same interface as the other drivers (see python/run_scripts/timing_harness.py),
+# mus (nParams x 3) are the parameter instances, parameterSamples(numParams)
+# if not given
+def setupRom(meshSize, romSize, dt, method="galerkin", numParams=8, mus=None,
+             linSolver="cholesky", basisFileName="basis", counters=None):
+  if mus is None:
+    mus = parameterSamples(numParams)
+  appObj = Burgers1dBatch(meshSize, mus)
+  yRef = np.ones(meshSize)
+  phi = loadBasis(basisFileName, romSize)
+  yRom = np.zeros((romSize, appObj.numParams_), order='F')
+
+  if counters is not None:
+    counters.wrapMethods(appObj, instrumentation.appMethods)
+  if method == "galerkin":
+    runSteps = lambda n: doGalerkinBatchForTargetSteps(n, appObj, yRef, phi, yRom, 0., dt,
+                                                       counters)
+  else:
+    nlsTol, nlsMaxIt = 1e-13, 20
+    runSteps = lambda n: doLSPGBatchForTargetSteps(n, appObj, yRef, phi, yRom, 0., dt,
+                                                   nlsMaxIt, nlsTol, linSolver, counters)
+  return runSteps, yRom
+
+
+def saveGeneralizedCoords(yRom, fileName="final_generalized_coords.txt"):
+  np.savetxt(fileName, yRom, fmt='%.16f')
+
+
+def main(argv):
+  meshSize = int(argv[0])
+  romSize  = int(argv[1])
+  Nsteps   = int(argv[2])
+  dt       = float(argv[3])
+  # optional args after the positional ones
+  parser = ArgumentParser()
+  parser.add_argument("-method", "--method", dest="method", default="galerkin",
+                      choices=["galerkin", "lspg"])
+  parser.add_argument("-num-params", "--num-params", dest="numParams", type=int, default=8,
+                      help="number of parameter instances if --mu-file is not given")
+  parser.add_argument("-mu-file", "--mu-file", dest="muFile", default=None,
+                      help="text file with one parameter instance (mu0 mu1 mu2) per row")
+  parser.add_argument("-lin-solver", "--lin-solver", dest="linSolver", default="cholesky",
+                      choices=["cholesky", "qr"], help="least-squares solver for lspg")
+  parser.add_argument("-instrument", "--instrument", dest="instrument", action="store_true",
+                      help="print the time per step of each phase")
+  args = parser.parse_args(argv[4:])
+  np.set_printoptions(linewidth=400)
+  print(meshSize)
+  print(romSize)
+  print(Nsteps)
+  print(dt)
+  print(args.method)
+
+  mus = None if args.muFile is None else np.loadtxt(args.muFile, ndmin=2)
+  counters = instrumentation.PhaseCounters() if args.instrument else None
+  runSteps, yRom = setupRom(meshSize, romSize, dt, args.method, args.numParams, mus,
+                            args.linSolver, counters=counters)
+  numParams = yRom.shape[1]
+  print("numParams = ", numParams)
+
+  # do untimed warm up run for numba compilation
+  runSteps(1)
+  if counters is not None: counters.reset()
+  # absolute time at which the driver is ready to time, the timing harness
+  # subtracts the process launch time from it to get the cold start
+  print("Ready time: {0:.6f} ".format(time.time()))
+  # the actual timing starts here after the warm up
+  yRom *= 0
+  startTime = time.time()
+  runSteps(Nsteps)
+  endTime = time.time()
+  elapsed = endTime-startTime
+  print("Elapsed time: {0:10.10f} ".format(elapsed) )
+  print("Elapsed time per parameter: {0:10.10f} ".format(elapsed/numParams) )
+  if counters is not None:
+    instrumentation.printReport(counters.report(Nsteps))
+  print ("Printing generalized coords to file")
+  saveGeneralizedCoords(yRom)
+
+
+if __name__== "__main__":
+  main(sys.argv[1:])
@@ -0,0 +1,192 @@
+
+import numpy as np
+import sys, os, time
+import multiprocessing
+from argparse import ArgumentParser
+
+from basis_io import loadBasis, saveBasis
+
+#-------------------------------------------------------------------------
+# ensemble runner: the same native ROM (galerkin or lspg) at many samples
+# (parameter vector mu + initial generalized coordinates), fanned out to a
+# pool of worker processes.
+#
+# - the basis is read once and shared through a memory-mapped .npy
+#   (basis.npy if present, else basis.txt converted once): every worker
+#   maps the same file copy-on-write, and since the ROMs never write to
+#   phi all workers share the same physical pages, i.e. one basis copy in
+#   memory whatever the number of workers
+# - the final generalized coordinates of all samples go to one
+#   (romSize x numSamples) column-major .npy, mapped by all the workers,
+#   each writing its samples' columns as soon as they are done
+# - numba/BLAS/OpenMP threads of each worker are bounded to
+#   threadsPerWorker (env vars set before the workers start, spawned so
+#   that they import numpy/numba after that)
+# - with batchSize > 1 each task advances batchSize samples at once with
+#   the batched steppers of main_rom_batch.py
+#-------------------------------------------------------------------------
+
+threadEnvVars = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                 'NUMBA_NUM_THREADS']
+
+# state of each worker process, set by initWorker
+workerState = {}
+
+
+# file of a column-major .npy basis that workers can map
+def sharedBasisFile(basisFileName, workDir):
+  if os.path.isfile(basisFileName + ".npy"):
+    return basisFileName + ".npy"
+  fileName = os.path.join(workDir, "ensemble_basis.npy")
+  saveBasis(fileName, loadBasis(basisFileName))
+  return fileName
+
+
+def initWorker(basisFile, outFile, meshSize, romSize, dt, method, linSolver, threadsPerWorker):
+  import numba
+  numba.set_num_threads(threadsPerWorker)
+  workerState.update({'phi': loadBasis(basisFile, romSize),
+                      'out': np.load(outFile, mmap_mode='r+'),
+                      'meshSize': meshSize, 'dt': dt, 'method': method,
+                      'linSolver': linSolver})
+
+
+# task: advances samples (indices) from their initial condition ics
+# (romSize x len(indices)) for nsteps and writes them to the output
+def runSamples(indices, mus, ics, nsteps):
+  from burgers1d import Burgers1dBandedJacobian, Burgers1dBatch
+  st = workerState
+  meshSize, dt, phi = st['meshSize'], st['dt'], st['phi']
+  yRef = np.ones(meshSize)
+  nlsTol, nlsMaxIt = 1e-13, 20
+
+  startTime = time.perf_counter()
+  if len(indices) == 1:
+    yRom = np.copy(ics[:, 0])
+    # banded app: Galerkin only needs the velocity, LSPG J*phi, neither
+    # should allocate the N x N jacobian of the dense app in every worker
+    appObj = Burgers1dBandedJacobian(meshSize, mu=mus[0])
+    if st['method'] == "galerkin":
+      from main_rom_galerkin_native import doGalerkinForTargetSteps
+      doGalerkinForTargetSteps(nsteps, appObj, yRef, phi, yRom, 0., dt)
+    else:
+      from main_rom_lspg import doLSPGNativeForTargetSteps
+      doLSPGNativeForTargetSteps(nsteps, appObj, yRef, phi, yRom, 0., dt,
+                                 nlsMaxIt, nlsTol, st['linSolver'])
+    yRom = yRom.reshape(-1, 1)
+  else:
+    yRom = np.asfortranarray(ics)
+    appObj = Burgers1dBatch(meshSize, mus)
+    if st['method'] == "galerkin":
+      from main_rom_batch import doGalerkinBatchForTargetSteps
+      doGalerkinBatchForTargetSteps(nsteps, appObj, yRef, phi, yRom, 0., dt)
+    else:
+      from main_rom_batch import doLSPGBatchForTargetSteps
+      doLSPGBatchForTargetSteps(nsteps, appObj, yRef, phi, yRom, 0., dt,
+                                nlsMaxIt, nlsTol, st['linSolver'])
+  elapsed = time.perf_counter() - startTime
+
+  st['out'][:, indices] = yRom
+  return indices, elapsed
+
+
+def runSamplesStar(args):
+  return runSamples(*args)
+
+
+# runs all the samples, mus is (numSamples x 3), ics (romSize x numSamples)
+# or None for zero initial conditions; returns the output file name and
+# the compute time of each task
+def runEnsemble(meshSize, romSize, nsteps, dt, mus, ics=None, method="galerkin",
+                numWorkers=1, threadsPerWorker=1, batchSize=1, linSolver="cholesky",
+                basisFileName="basis", outFile="ensemble_generalized_coords.npy"):
+  mus = np.array(mus, dtype=np.float64, ndmin=2)
+  numSamples = mus.shape[0]
+  if ics is None:
+    ics = np.zeros((romSize, numSamples))
+  if ics.shape != (romSize, numSamples):
+    raise ValueError('initial conditions have shape {}, expected {}'.format(
+      ics.shape, (romSize, numSamples)))
+
+  outFile = os.path.abspath(outFile)
+  basisFile = os.path.abspath(sharedBasisFile(basisFileName, os.path.dirname(outFile)))
+  out = np.lib.format.open_memmap(outFile, mode='w+', shape=(romSize, numSamples),
+                                  fortran_order=True)
+  del out
+
+  tasks = []
+  for start in range(0, numSamples, batchSize):
+    indices = list(range(start, min(start+batchSize, numSamples)))
+    tasks.append((indices, mus[indices], ics[:, indices], nsteps))
+
+  # thread bounds are inherited by the spawned workers
+  savedEnv = {var: os.environ.get(var) for var in threadEnvVars}
+  for var in threadEnvVars:
+    os.environ[var] = str(threadsPerWorker)
+  try:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(numWorkers, initializer=initWorker,
+                  initargs=(basisFile, outFile, meshSize, romSize, dt, method,
+                            linSolver, threadsPerWorker)) as pool:
+      taskTimes = []
+      for indices, elapsed in pool.imap_unordered(runSamplesStar, tasks):
+        taskTimes.append(elapsed)
+        print("samples {}-{} done in {:.4f} s".format(indices[0], indices[-1], elapsed))
+  finally:
+    for var, value in savedEnv.items():
+      if value is None:
+        os.environ.pop(var)
+      else:
+        os.environ[var] = value
+  return outFile, taskTimes
+
+
+def main(argv):
+  meshSize = int(argv[0])
+  romSize  = int(argv[1])
+  Nsteps   = int(argv[2])
+  dt       = float(argv[3])
+  # optional args after the positional ones
+  parser = ArgumentParser()
+  parser.add_argument("-method", "--method", dest="method", default="galerkin",
+                      choices=["galerkin", "lspg"])
+  parser.add_argument("-num-params", "--num-params", dest="numParams", type=int, default=8,
+                      help="number of samples if --mu-file is not given")
+  parser.add_argument("-mu-file", "--mu-file", dest="muFile", default=None,
+                      help="text file with one parameter vector (mu0 mu1 mu2) per sample")
+  parser.add_argument("-ic-file", "--ic-file", dest="icFile", default=None,
+                      help="text file with the initial generalized coordinates, one row "
+                           "per sample, default zero")
+  parser.add_argument("-num-workers", "--num-workers", dest="numWorkers", type=int, default=1)
+  parser.add_argument("-threads-per-worker", "--threads-per-worker", dest="threadsPerWorker",
+                      type=int, default=1)
+  parser.add_argument("-batch-size", "--batch-size", dest="batchSize", type=int, default=1,
+                      help="samples advanced together by each task (batched steppers)")
+  parser.add_argument("-lin-solver", "--lin-solver", dest="linSolver", default="cholesky",
+                      choices=["cholesky", "qr"], help="least-squares solver for lspg")
+  args = parser.parse_args(argv[4:])
+  print(meshSize)
+  print(romSize)
+  print(Nsteps)
+  print(dt)
+  print(args.method)
+
+  from main_rom_batch import parameterSamples
+  mus = parameterSamples(args.numParams) if args.muFile is None \
+        else np.loadtxt(args.muFile, ndmin=2)
+  ics = None if args.icFile is None else np.loadtxt(args.icFile, ndmin=2).T
+
+  startTime = time.time()
+  outFile, taskTimes = runEnsemble(meshSize, romSize, Nsteps, dt, mus, ics, args.method,
+                                   args.numWorkers, args.threadsPerWorker, args.batchSize,
+                                   args.linSolver)
+  elapsed = time.time() - startTime
+  print("Elapsed time: {0:10.10f} ".format(elapsed) )
+  print("Elapsed time per sample: {0:10.10f} ".format(elapsed/mus.shape[0]) )
+  print("Compute time per sample: {0:10.10f} ".format(np.sum(taskTimes)/mus.shape[0]) )
+  print ("Printing generalized coords to file")
+  np.savetxt("final_generalized_coords.txt", np.load(outFile), fmt='%.16f')
+
+
+if __name__== "__main__":
+  main(sys.argv[1:])
@@ -1,52 +1,77 @@
 
 import numpy as np
 import sys, time
-import timeit
-import math
-from numba import jit, vectorize, njit, jitclass
-from numba import f8, float64, int32
-import profile
-from scipy import linalg
 
 from burgers1d import Burgers1dDenseJacobian
-import pressio4pyGalerkin
+from basis_io import loadBasis
+import instrumentation
 
-def doGalerkinForTargetSteps(nsteps, appObj, yRef, decoder, yRom, t0):
+def doGalerkinForTargetSteps(nsteps, appObj, yRef, decoder, yRom, t0, dt):
+  import pressio4pyGalerkin
   galerkinObj = pressio4pyGalerkin.ProblemRK4(appObj, yRef, decoder, yRom, t0)
   stepper = galerkinObj.getStepper()
   pressio4pyGalerkin.integrateNStepsRK4(stepper, yRom, t0, dt, nsteps)
 
-meshSize = int(sys.argv[1])
-romSize  = int(sys.argv[2])
-Nsteps   = int(sys.argv[3])
-dt       = float(sys.argv[4])
-np.set_printoptions(linewidth=400)
-print(meshSize)
-print(romSize)
-print(Nsteps)
-print(dt)
-
-# create app (for explicit Galerkin it does not matter the jacobian)
-appObj = Burgers1dDenseJacobian(meshSize)
-# reference state
-yRef = np.ones(meshSize)
-# load basis
-phi = np.loadtxt("basis.txt")
-decoder = pressio4pyGalerkin.LinearDecoder(phi)
-yRom = np.zeros(romSize)
-
-# do untimed warm up run for numba compilation
-doGalerkinForTargetSteps(1, appObj, yRef, decoder, yRom, 0.)
-# the actual timing starts here after the warm up
-yRom *= 0
-startTime = time.time()
-doGalerkinForTargetSteps(Nsteps, appObj, yRef, decoder, yRom, 0.)
-endTime = time.time()
-elapsed = endTime-startTime
-print("Elapsed time: {0:10.10f} ".format(elapsed) )
-print ("Printing generalized coords to file")
-np.savetxt("final_generalized_coords.txt", yRom, fmt='%.16f')
 
+# creates app, reference state and loads the basis once, returns
+# (runSteps, yRom) where runSteps(n) advances yRom in place by n steps
+# from t=0, so it can be timed repeatedly in the same process
+# (see python/run_scripts/timing_harness.py).
+# counters (instrumentation.PhaseCounters) enables the per-phase breakdown
+# of the app callbacks called from the bindings
+def setupRom(meshSize, romSize, dt, basisFileName="basis", counters=None):
+  # create app (for explicit Galerkin it does not matter the jacobian)
+  appObj = Burgers1dDenseJacobian(meshSize)
+  # reference state
+  yRef = np.ones(meshSize)
+  # load basis (basis.npy is memory-mapped if present, else basis.txt)
+  phi = loadBasis(basisFileName, romSize)
+  # pressio bindings module imported here so that importing this
+  # module stays cheap
+  import pressio4pyGalerkin
+  decoder = pressio4pyGalerkin.LinearDecoder(phi)
+  yRom = np.zeros(romSize)
+  if counters is not None:
+    counters.wrapMethods(appObj, instrumentation.appMethods)
+  runSteps = lambda n: doGalerkinForTargetSteps(n, appObj, yRef, decoder, yRom, 0., dt)
+  return runSteps, yRom
+
+
+def saveGeneralizedCoords(yRom, fileName="final_generalized_coords.txt"):
+  np.savetxt(fileName, yRom, fmt='%.16f')
+
+
+def main(argv):
+  meshSize = int(argv[0])
+  romSize  = int(argv[1])
+  Nsteps   = int(argv[2])
+  dt       = float(argv[3])
+  np.set_printoptions(linewidth=400)
+  print(meshSize)
+  print(romSize)
+  print(Nsteps)
+  print(dt)
+
+  runSteps, yRom = setupRom(meshSize, romSize, dt)
+
+  # do untimed warm up run for numba compilation
+  runSteps(1)
+  # absolute time at which the driver is ready to time, the timing harness
+  # subtracts the process launch time from it to get the cold start
+  print("Ready time: {0:.6f} ".format(time.time()))
+  # the actual timing starts here after the warm up
+  yRom *= 0
+  startTime = time.time()
+  runSteps(Nsteps)
+  endTime = time.time()
+  elapsed = endTime-startTime
+  print("Elapsed time: {0:10.10f} ".format(elapsed) )
+  print ("Printing generalized coords to file")
+  saveGeneralizedCoords(yRom)
+
+
+if __name__== "__main__":
+  main(sys.argv[1:])
 
 
 # ######################################
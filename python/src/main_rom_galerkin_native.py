@@ -0,0 +1,193 @@
+
+import numpy as np
+import sys, time
+from argparse import ArgumentParser
+
+from burgers1d import Burgers1dDenseJacobian, Burgers1dSampleMesh
+from basis_io import loadBasis
+from rom_galerkin import GalerkinRK4Stepper, GalerkinRK4ReducedStepper, integrateNStepsRK4
+import instrumentation
+
+# same as main_rom_galerkin.py but the RK4 Galerkin is done in
+# rom_galerkin.py instead of through pressio4pyGalerkin.
+# With reduced operators (c, L, Q) (see rom_galerkin.reducedOperators) the
+# rhs is evaluated in reduced space only, appObj/yRef/phi are not used.
+
+def createStepper(appObj, yRef, phi, projector=None, counters=None, ops=None,
+                  romDtype=np.float64):
+  if ops is None:
+    stepper = GalerkinRK4Stepper(appObj, yRef, phi, projector, romDtype)
+    phases = {'doStep': 'step', 'reconstructFomState': 'reconstruct', 'project': 'projection'}
+  else:
+    stepper = GalerkinRK4ReducedStepper(*ops)
+    phases = {'doStep': 'step', 'computeRhs': 'reducedRhs'}
+  if counters is not None:
+    counters.wrapMethods(stepper, phases)
+  return stepper
+
+
+def doGalerkinForTargetSteps(nsteps, appObj, yRef, phi, yRom, t0, dt, projector=None,
+                             counters=None, ops=None):
+  stepper = createStepper(appObj, yRef, phi, projector, counters, ops, yRom.dtype)
+  integrateNStepsRK4(stepper, yRom, t0, dt, nsteps)
+
+
+# error controlled Dormand-Prince 5(4) on the same rhs, from t0 to tFinal
+# starting with dt (see adaptive_stepping.py)
+def doGalerkinAdaptiveToTime(tFinal, appObj, yRef, phi, yRom, t0, dt, controller,
+                             projector=None, counters=None, ops=None, history=None):
+  import adaptive_stepping
+  stepper = createStepper(appObj, yRef, phi, projector, counters, ops, yRom.dtype)
+  adaptiveStepper = adaptive_stepping.DormandPrince45Stepper(stepper.computeRhs, len(yRom),
+                                                             yRom.dtype)
+  if counters is not None:
+    counters.wrapMethods(adaptiveStepper, {'trialStep': 'trialStep'})
+  adaptive_stepping.integrateAdaptive(adaptiveStepper, controller, yRom, t0, tFinal, dt,
+                                      history=history)
+
+
+# creates app, reference state and loads the basis once, returns
+# (runSteps, yRom) where runSteps(n) advances yRom in place by n steps
+# from t=0, so it can be timed repeatedly in the same process
+# (see python/run_scripts/timing_harness.py).
+# counters (instrumentation.PhaseCounters) enables the per-phase breakdown.
+# reducedOperators precomputes the quadratic reduced operators (cached in
+# opsCacheDir) and steps with those only, full mesh only.
+# adaptive (adaptive_stepping.StepSizeController) makes runSteps(n)
+# integrate to the final time n*dt with error control instead, dt being
+# the first step tried; the trial steps are recorded in history if given.
+# precision is one of precision.precisionModes, the app kernels, basis and
+# yRef are in its fom dtype, yRom in its rom dtype.
+def setupRom(meshSize, romSize, dt, sampleMeshDir=None, basisFileName="basis",
+             counters=None, reducedOperators=False, opsCacheDir=".", adaptive=None,
+             history=None, precision="float64"):
+  import precision as prec
+  fomDtype, romDtype = prec.dtypes(precision)
+  # load basis (basis.npy is memory-mapped if present, else basis.txt)
+  phi = loadBasis(basisFileName, romSize, fomDtype)
+  yRom = np.zeros(romSize, dtype=romDtype)
+
+  if sampleMeshDir is None:
+    # create app (for explicit Galerkin it does not matter the jacobian)
+    appObj = Burgers1dDenseJacobian(meshSize, dtype=fomDtype)
+    # reference state
+    yRef = np.ones(meshSize, dtype=fomDtype)
+    projector = None
+  else:
+    if fomDtype != np.float64:
+      raise Exception('the sample mesh app is float64 only')
+    import hyperreduction
+    sampleMesh, stencilMesh, projector = hyperreduction.readSampleMesh(sampleMeshDir)
+    if projector.shape[0] != romSize:
+      raise Exception('The sample mesh in {} was built for rom size {}, not {}: rerun '
+                      'main_sample_mesh.py with --rom-size {}'.format(
+                        sampleMeshDir, projector.shape[0], romSize, romSize))
+    print("numSamples = ", len(sampleMesh))
+    # app, reference state and basis only live on the stencil mesh
+    appObj = Burgers1dSampleMesh(meshSize, sampleMesh, stencilMesh)
+    yRef = np.ones(len(stencilMesh))
+    phi = phi[stencilMesh, :]
+
+  ops = None
+  if reducedOperators:
+    if sampleMeshDir is not None:
+      raise Exception('reduced operators and sample mesh cannot be combined')
+    if fomDtype != np.float64:
+      raise Exception('reduced operators are float64 only')
+    import rom_galerkin
+    ops = rom_galerkin.reducedOperators(appObj, yRef, phi, opsCacheDir)
+
+  if counters is not None:
+    counters.wrapMethods(appObj, instrumentation.appMethods)
+  if adaptive is None:
+    runSteps = lambda n: doGalerkinForTargetSteps(n, appObj, yRef, phi, yRom, 0., dt,
+                                                  projector, counters, ops)
+  else:
+    runSteps = lambda n: doGalerkinAdaptiveToTime(n*dt, appObj, yRef, phi, yRom, 0., dt,
+                                                  adaptive, projector, counters, ops, history)
+  return runSteps, yRom
+
+
+def saveGeneralizedCoords(yRom, fileName="final_generalized_coords.txt"):
+  np.savetxt(fileName, yRom, fmt='%.16f')
+
+
+def main(argv):
+  meshSize = int(argv[0])
+  romSize  = int(argv[1])
+  Nsteps   = int(argv[2])
+  dt       = float(argv[3])
+  # optional args after the positional ones
+  parser = ArgumentParser()
+  parser.add_argument("-sample-mesh-dir", "--sample-mesh-dir", dest="sampleMeshDir", default=None,
+                      help="directory written by main_sample_mesh.py, enables hyper-reduction")
+  parser.add_argument("-reduced-operators", "--reduced-operators", dest="reducedOperators",
+                      action="store_true",
+                      help="step on the precomputed quadratic reduced operators, O(k^3) per rhs")
+  parser.add_argument("-ops-cache-dir", "--ops-cache-dir", dest="opsCacheDir", default=".",
+                      help="where the reduced operators are cached, per mesh and basis")
+  parser.add_argument("-adaptive", "--adaptive", dest="adaptive", action="store_true",
+                      help="error controlled RK 5(4) to the final time Nsteps*dt, dt is the "
+                           "initial step")
+  parser.add_argument("-rtol", "--rtol", dest="rtol", type=float, default=1e-6)
+  parser.add_argument("-atol", "--atol", dest="atol", type=float, default=1e-8)
+  parser.add_argument("-dt-history", "--dt-history", dest="dtHistoryFile", default=None,
+                      help="file where the adaptive step sizes are written")
+  parser.add_argument("-precision", "--precision", dest="precision", default="float64",
+                      choices=["float64", "float32", "mixed"],
+                      help="float32: kernels, basis and reduced state in float32, mixed: "
+                           "float32 kernels and basis, float64 reduced state")
+  parser.add_argument("-accuracy-ref", "--accuracy-ref", dest="accuracyRef", default=None,
+                      help="final_generalized_coords.txt of a float64 run to report the "
+                           "error against")
+  parser.add_argument("-instrument", "--instrument", dest="instrument", action="store_true",
+                      help="print the time per step of each phase")
+  args = parser.parse_args(argv[4:])
+  np.set_printoptions(linewidth=400)
+  print(meshSize)
+  print(romSize)
+  print(Nsteps)
+  print(dt)
+
+  counters = instrumentation.PhaseCounters() if args.instrument else None
+  controller, history = None, None
+  if args.adaptive:
+    import adaptive_stepping
+    controller = adaptive_stepping.StepSizeController(args.rtol, args.atol)
+    history = adaptive_stepping.StepSizeHistory()
+  runSteps, yRom = setupRom(meshSize, romSize, dt, args.sampleMeshDir, counters=counters,
+                            reducedOperators=args.reducedOperators, opsCacheDir=args.opsCacheDir,
+                            adaptive=controller, history=history, precision=args.precision)
+
+  # do untimed warm up run for numba compilation
+  runSteps(1)
+  if counters is not None: counters.reset()
+  if history is not None: history.reset()
+  # absolute time at which the driver is ready to time, the timing harness
+  # subtracts the process launch time from it to get the cold start
+  print("Ready time: {0:.6f} ".format(time.time()))
+  # the actual timing starts here after the warm up
+  yRom *= 0
+  startTime = time.time()
+  runSteps(Nsteps)
+  endTime = time.time()
+  elapsed = endTime-startTime
+  print("Elapsed time: {0:10.10f} ".format(elapsed) )
+  numSteps = Nsteps
+  if history is not None:
+    numSteps = history.numAccepted()
+    print("accepted steps = ", numSteps, " rejected steps = ", history.numRejected())
+    if args.dtHistoryFile is not None:
+      history.save(args.dtHistoryFile)
+  if counters is not None:
+    instrumentation.printReport(counters.report(numSteps))
+  if args.accuracyRef is not None:
+    import precision
+    precision.printAccuracyReport(precision.accuracyReport(yRom, args.accuracyRef),
+                                  args.precision)
+  print ("Printing generalized coords to file")
+  saveGeneralizedCoords(yRom)
+
+
+if __name__== "__main__":
+  main(sys.argv[1:])
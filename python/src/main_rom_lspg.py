@@ -1,30 +1,36 @@
 
 # by default, numpy has row-major memory layout
 import numpy as np
-from scipy import linalg
-from numba import jit, njit
 import sys, time
+from argparse import ArgumentParser
 # local app class
 from burgers1d import Burgers1dDenseJacobian, Burgers1dSparseJacobian
-# pressio bindings modules
-import pressio4pyLspg
+from burgers1d import Burgers1dBandedJacobian, Burgers1dSampleMesh
+from basis_io import loadBasis
+import instrumentation
 
 np.set_printoptions(precision=15, linewidth=400)
 
 class MyLinSolver:
-  def __init__(self): pass
+  def __init__(self):
+    # only needed by the pressio4py backend
+    from scipy.linalg import lapack
+    self.lapack_ = lapack
 
-  @staticmethod
-  def solve(A,b,x):
-    lumat, piv, info = linalg.lapack.dgetrf(A, overwrite_a=True)
-    x[:], info = linalg.lapack.dgetrs(lumat, piv, b, 0, 0)
+  def solve(self, A, b, x):
+    lumat, piv, info = self.lapack_.dgetrf(A, overwrite_a=True)
+    x[:], info = self.lapack_.dgetrs(lumat, piv, b, 0, 0)
 
 
-def doLSPGForTargetSteps(nsteps, appObj, yRef, decoder, yRom, t0, nlsMaxIt, nlsTol):
+def doLSPGForTargetSteps(nsteps, appObj, yRef, decoder, yRom, t0, dt, nlsMaxIt, nlsTol,
+                         counters=None):
+  import pressio4pyLspg
   lspgObj = pressio4pyLspg.ProblemEuler(appObj, yRef, decoder, yRom, t0)
   stepper = lspgObj.getStepper()
   # pass sym since matrix for NEq is symmetric
   lsO = MyLinSolver()
+  if counters is not None:
+    counters.wrapMethods(lsO, {'solve': 'linearSolve'})
   # non linear solver
   nlsO = pressio4pyLspg.GaussNewton(stepper, yRom, lsO)
   nlsO.setMaxIterations(nlsMaxIt)
@@ -33,47 +39,188 @@ def doLSPGForTargetSteps(nsteps, appObj, yRef, decoder, yRom, t0, nlsMaxIt, nlsT
   pressio4pyLspg.integrateNSteps(stepper, yRom, t0, dt, nsteps, nlsO)
 
 
+# jacPolicy/jacPeriod: when the Gauss-Newton jacobian is recomputed and
+# refactored (see rom_lspg.GaussNewton), the solver counts are added to
+# nlsStats if given
+def doLSPGNativeForTargetSteps(nsteps, appObj, yRef, phi, yRom, t0, dt,
+                               nlsMaxIt, nlsTol, linSolverName, sampleRows=None,
+                               counters=None, jacPolicy='always', jacPeriod=1,
+                               nlsStats=None):
+  import rom_lspg
+  stepper = rom_lspg.LspgEulerStepper(appObj, yRef, phi, sampleRows, yRom.dtype)
+  nlsO = rom_lspg.GaussNewton(stepper, linSolverName, jacPolicy, jacPeriod)
+  if counters is not None:
+    counters.wrapMethods(stepper, {'reconstructFomState': 'reconstruct',
+                                   'residualAndJacobian': 'residualAndJacobian',
+                                   'residual': 'residual',
+                                   'jacobian': 'jacobianRefresh'})
+    counters.wrapMethods(nlsO.linSolver_, {'factor': 'factorization',
+                                           'solveFactored': 'linearSolve'})
+    # one nonlinear solve per step
+    counters.wrapMethods(nlsO, {'solve': 'step'})
+  nlsO.setMaxIterations(nlsMaxIt)
+  nlsO.setTolerance(nlsTol)
+  rom_lspg.integrateNSteps(stepper, yRom, t0, dt, nsteps, nlsO)
+  if nlsStats is not None:
+    for key, value in nlsO.stats_.items():
+      nlsStats[key] = nlsStats.get(key, 0) + value
+
+
+# creates app, reference state and loads the basis once, returns
+# (runSteps, yRom) where runSteps(n) advances yRom in place by n steps
+# from t=0, so it can be timed repeatedly in the same process
+# (see python/run_scripts/timing_harness.py).
+# counters (instrumentation.PhaseCounters) enables the per-phase breakdown.
+# jacPolicy, jacPeriod, nlsStats and precision (one of
+# precision.precisionModes) are for the native backend only.
+def setupRom(Ncell, romSize, dt, jIsDense=0, backend="pressio4py",
+             linSolver="cholesky", sampleMeshDir=None, basisFileName="basis",
+             counters=None, jacPolicy="always", jacPeriod=1, nlsStats=None,
+             precision="float64"):
+  import precision as prec
+  fomDtype, romDtype = prec.dtypes(precision)
+  if fomDtype != np.float64 and (backend != "native" or sampleMeshDir is not None):
+    raise Exception('precision {} needs the native backend on the full mesh'.format(precision))
+
+  if sampleMeshDir is not None and backend != "native":
+    raise Exception('a sample mesh needs the native backend')
+
+  # create app: 0 = sparse, 1 = dense, 2 = banded (diagonals only), with
+  # a sample mesh the app is created below on the stencil mesh only
+  appObj = None
+  if sampleMeshDir is None:
+    if jIsDense == 1:
+      appObj = Burgers1dDenseJacobian(Ncell, dtype=fomDtype)
+    elif jIsDense == 2:
+      appObj = Burgers1dBandedJacobian(Ncell, dtype=fomDtype)
+    else:
+      appObj = Burgers1dSparseJacobian(Ncell, dtype=fomDtype)
+
+  # set reference state
+  yRef = np.ones(Ncell, dtype=fomDtype)
+
+  # load basis (basis.npy is memory-mapped if present, else basis.txt)
+  phi = loadBasis(basisFileName, romSize, fomDtype)
+
+  # the LSPG (reduced) state
+  yRom = np.zeros(romSize, dtype=romDtype)
+
+  nlsTol, nlsMaxIt = prec.gaussNewtonTolerance(precision), 20
+  t0 = 0.
+
+  if backend == "pressio4py":
+    # pressio bindings modules only needed for that backend
+    import pressio4pyLspg
+    # create a decoder
+    decoder = pressio4pyLspg.LinearDecoder(phi)
+    runSteps = lambda n: doLSPGForTargetSteps(n, appObj, yRef, decoder, yRom,
+                                              t0, dt, nlsMaxIt, nlsTol, counters)
+  elif sampleMeshDir is None:
+    runSteps = lambda n: doLSPGNativeForTargetSteps(n, appObj, yRef, phi, yRom,
+                                                    t0, dt, nlsMaxIt, nlsTol, linSolver,
+                                                    None, counters, jacPolicy, jacPeriod,
+                                                    nlsStats)
+  else:
+    import hyperreduction
+    sampleMesh, stencilMesh, _ = hyperreduction.readSampleMesh(sampleMeshDir)
+    # fewer residual rows than unknowns: rank deficient Gauss-Newton system
+    if len(sampleMesh) < romSize:
+      raise Exception('The sample mesh in {} has {} samples, LSPG needs at least rom size = {}'
+                      .format(sampleMeshDir, len(sampleMesh), romSize))
+    print("numSamples = ", len(sampleMesh))
+    # residual is minimized at the sample cells only, app, reference
+    # state and basis live on the stencil mesh
+    appObj = Burgers1dSampleMesh(Ncell, sampleMesh, stencilMesh)
+    yRef, phi = yRef[stencilMesh], phi[stencilMesh, :]
+    sampleRows = np.searchsorted(stencilMesh, sampleMesh)
+    runSteps = lambda n: doLSPGNativeForTargetSteps(n, appObj, yRef, phi, yRom,
+                                                    t0, dt, nlsMaxIt, nlsTol, linSolver,
+                                                    sampleRows, counters, jacPolicy,
+                                                    jacPeriod, nlsStats)
+  if counters is not None:
+    counters.wrapMethods(appObj, instrumentation.appMethods)
+  return runSteps, yRom
+
+
+def saveGeneralizedCoords(yRom, fileName="final_generalized_coords.txt"):
+  np.savetxt(fileName, yRom, fmt='%.15f')
+
+
 ###########################################
 ###########################################
-Ncell   = int(sys.argv[1])
-romSize = int(sys.argv[2])
-Nsteps  = int(sys.argv[3])
-dt      = float(sys.argv[4])
-jIsDense  = int(sys.argv[5])
-print(Ncell)
-print(romSize)
-print(Nsteps)
-print(dt)
-print(jIsDense)
-
-# create app
-appObj = Burgers1dSparseJacobian(Ncell)
-if jIsDense == 1:
-  appObj = Burgers1dDenseJacobian(Ncell)
-
-# set reference state
-yRef = np.ones(Ncell)
-
-# load basis into numpy array
-phi = np.loadtxt("basis.txt")
-
-# create a decoder
-decoder = pressio4pyLspg.LinearDecoder(phi)
-# the LSPG (reduced) state
-yRom = np.zeros(romSize)
-
-nlsTol, nlsMaxIt = 1e-13, 20
-t0 = 0.
-
-# do untimed warm up run for numba compilation
-doLSPGForTargetSteps(1, appObj, yRef, decoder, yRom, t0, nlsMaxIt, nlsTol)
-
-# the actual timing starts here after the warm up
-yRom *= 0
-startTime = time.time()
-doLSPGForTargetSteps(Nsteps, appObj, yRef, decoder, yRom, t0, nlsMaxIt, nlsTol)
-endTime = time.time()
-elapsed = endTime-startTime
-print("Elapsed time: {0:10.10f} ".format(elapsed) )
-print ("Printing generalized coords to file")
-np.savetxt("final_generalized_coords.txt", yRom, fmt='%.15f')
+def main(argv):
+  Ncell   = int(argv[0])
+  romSize = int(argv[1])
+  Nsteps  = int(argv[2])
+  dt      = float(argv[3])
+  jIsDense  = int(argv[4])
+  # optional args after the positional ones
+  parser = ArgumentParser()
+  parser.add_argument("-backend", "--backend", dest="backend", default="pressio4py",
+                      choices=["pressio4py", "native"])
+  parser.add_argument("-lin-solver", "--lin-solver", dest="linSolver", default="cholesky",
+                      choices=["cholesky", "qr"],
+                      help="least-squares solver for the native backend")
+  parser.add_argument("-sample-mesh-dir", "--sample-mesh-dir", dest="sampleMeshDir", default=None,
+                      help="native backend only: directory written by main_sample_mesh.py, "
+                           "enables hyper-reduction")
+  parser.add_argument("-jac-policy", "--jac-policy", dest="jacPolicy", default="always",
+                      choices=["always", "every", "step", "stagnation"],
+                      help="native backend only: when the Gauss-Newton jacobian is "
+                           "recomputed, the factorization is reused in between")
+  parser.add_argument("-jac-period", "--jac-period", dest="jacPeriod", type=int, default=1,
+                      help="iterations between jacobian updates for --jac-policy every")
+  parser.add_argument("-precision", "--precision", dest="precision", default="float64",
+                      choices=["float64", "float32", "mixed"],
+                      help="native backend only, float32: kernels, basis, residual and solve "
+                           "in float32, mixed: float32 kernels, basis, residual and jacobian, "
+                           "float64 reduced state, normal equations and solve")
+  parser.add_argument("-accuracy-ref", "--accuracy-ref", dest="accuracyRef", default=None,
+                      help="final_generalized_coords.txt of a float64 run to report the "
+                           "error against")
+  parser.add_argument("-instrument", "--instrument", dest="instrument", action="store_true",
+                      help="print the time per step of each phase")
+  args = parser.parse_args(argv[5:])
+  print(Ncell)
+  print(romSize)
+  print(Nsteps)
+  print(dt)
+  print(jIsDense)
+  print(args.backend)
+
+  counters = instrumentation.PhaseCounters() if args.instrument else None
+  nlsStats = {}
+  runSteps, yRom = setupRom(Ncell, romSize, dt, jIsDense, args.backend,
+                            args.linSolver, args.sampleMeshDir, counters=counters,
+                            jacPolicy=args.jacPolicy, jacPeriod=args.jacPeriod,
+                            nlsStats=nlsStats, precision=args.precision)
+
+  # do untimed warm up run for numba compilation
+  runSteps(1)
+  if counters is not None: counters.reset()
+  nlsStats.clear()
+  # absolute time at which the driver is ready to time, the timing harness
+  # subtracts the process launch time from it to get the cold start
+  print("Ready time: {0:.6f} ".format(time.time()))
+
+  # the actual timing starts here after the warm up
+  yRom *= 0
+  startTime = time.time()
+  runSteps(Nsteps)
+  endTime = time.time()
+  elapsed = endTime-startTime
+  print("Elapsed time: {0:10.10f} ".format(elapsed) )
+  for key, value in nlsStats.items():
+    print(key, "=", value)
+  if counters is not None:
+    instrumentation.printReport(counters.report(Nsteps))
+  if args.accuracyRef is not None:
+    import precision
+    precision.printAccuracyReport(precision.accuracyReport(yRom, args.accuracyRef),
+                                  args.precision)
+  print ("Printing generalized coords to file")
+  saveGeneralizedCoords(yRom)
+
+
+if __name__== "__main__":
+  main(sys.argv[1:])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import numpy as np
+import sys, os
+from argparse import ArgumentParser
+
+import hyperreduction as hr
+from basis_io import loadBasis
+
+#-------------------------------------------------------------------------
+# offline step for hyper-reduction: from basis.txt (and optionally the
+# FOM state snapshots) compute the sample mesh, the stencil mesh and the
+# Galerkin projector, and write them into destDir for the ROM drivers.
+# The projector pinv(P^T phi) does not nest over the rom size, so it is
+# built for the leading romSize basis columns (default all of them) and
+# the sample mesh can only be used by Galerkin ROMs of that size.
+#-------------------------------------------------------------------------
+
+def main(basisFile, snapshotsFile, numSamples, method, velocityModes, destDir, romSize=None):
+  phi = loadBasis(basisFile, romSize)
+  fomSize, romSize = phi.shape
+  if numSamples < romSize:
+    raise Exception('Need at least as many samples ({}) as rom size ({})'.format(
+      numSamples, romSize))
+
+  # the sample cells are chosen from a basis of the velocity (evaluated at
+  # the state snapshots, the reference state being the initial condition)
+  # if snapshots are given, otherwise the state basis is used directly
+  U = None
+  if snapshotsFile is not None:
+    snapshots = np.loadtxt(snapshotsFile, ndmin=2)
+    velocitySnapshots = hr.computeVelocitySnapshots(snapshots, np.ones(fomSize))
+    U = hr.computeVelocityBasis(velocitySnapshots, velocityModes or romSize)
+
+  sampleMesh = hr.computeSampleMesh(phi if U is None else U, numSamples, method)
+  stencilMesh = hr.computeStencilMesh(sampleMesh)
+  projector = hr.computeGappyProjector(phi, sampleMesh, U)
+
+  print("fomSize = ", fomSize)
+  print("romSize = ", romSize)
+  print("numSamples = ", len(sampleMesh))
+  print("numStencil = ", len(stencilMesh))
+
+  if not os.path.exists(destDir): os.makedirs(destDir)
+  hr.writeSampleMesh(destDir, sampleMesh, stencilMesh, projector)
+
+
+if __name__== "__main__":
+  parser = ArgumentParser()
+  parser.add_argument("-basis", "--basis", dest="basisFile", default="basis",
+                      help="basis.npy or basis.txt, picks either if no extension is given")
+  parser.add_argument("-snapshots", "--snapshots", dest="snapshotsFile", default=None,
+                      help="optional FOM state snapshots, if given samples are picked from "
+                           "the POD modes of the velocity at those states")
+  parser.add_argument("-num-samples", "--num-samples", dest="numSamples", type=int, required=True)
+  parser.add_argument("-rom-size", "--rom-size", dest="romSize", type=int, default=None,
+                      help="rom size the sample mesh is built for, default = basis columns")
+  parser.add_argument("-method", "--method", dest="method", default="qdeim",
+                      choices=["qdeim", "deim"])
+  parser.add_argument("-velocity-modes", "--velocity-modes", dest="velocityModes",
+                      type=int, default=None,
+                      help="number of velocity modes to use, default = rom size; the velocity "
+                           "is quadratic in the state, so it usually needs more modes")
+  parser.add_argument("-dest-dir", "--dest-dir", dest="destDir", default=".")
+  args = parser.parse_args()
+  main(args.basisFile, args.snapshotsFile, args.numSamples, args.method,
+       args.velocityModes, args.destDir, args.romSize)
@@ -1,50 +1,69 @@
 
 import numpy as np
-import sys, time
-import scipy.linalg.blas as scblas
+import time
+from argparse import ArgumentParser
 # local app class
-from burgers1d import Burgers1d
-
-meshSize = int(sys.argv[1])
-
-np.set_printoptions(linewidth=400)
-print(meshSize)
-# create app
-appObj = Burgers1d(meshSize)
-yRef = np.ones(meshSize)
-t0 = 0.0
-
-romSize = 100
-numRound = 5000
-
-# phi_C means that phi_C.T will be col major
-phi_C = np.ones((meshSize, romSize), order = 'C')
-print (phi_C.flags)
-phi_F = np.ones((meshSize, romSize), order = 'F')
-print (phi_F.flags)
-
-phi = phi_F
-a = np.zeros(romSize)
-a1 = np.zeros(meshSize)
-
-#--- one run for warmup ---
-f = appObj.velocity(yRef, t0)
-a = np.dot(phi.T, f)
-a1 = np.dot(phi, a)
-
-#scblas.dgemv(1.0, phi, f, 0.0, A, 0, 1, 0, 1, 1, 1)
-# J = np.zeros((meshSize, meshSize))
-# appObj.jacobian(yRef, t0, J)
-
-#--- do many replicas ---
-startTime = time.time()
-for i in range(numRound):
-  appObj.velocity(yRef, t0, f)
-  #scblas.dgemv(1.0, phi, f, 0.0, A, 0, 1, 0, 1, 1, 1)
-  a  = np.dot(phi.T, f)
-  a1 = np.dot(phi, a)
-
-endTime = time.time()
-elapsed = endTime-startTime
-print("Elapsed time: {0:10.10f} ".format(elapsed) )
-print("Time per round: {0:10.10f} ".format(elapsed/numRound) )
+from burgers1d import Burgers1dBandedJacobian, velocityKernels, velocityKernelsRelTol
+
+#-------------------------------------------------------------------------
+# micro-benchmark of the velocity kernel variants for each mesh size:
+# for each (mesh, kernel) pair we do one untimed call for numba compilation,
+# then time numRounds calls and report the time per call and the max
+# deviation from the serial kernel, checked against velocityKernelsRelTol;
+# the speedup is relative to the serial kernel, timed first for every mesh
+#-------------------------------------------------------------------------
+
+def timeKernel(appObj, u, t0, numRounds):
+  # warmup
+  appObj.velocity(u, t0)
+  startTime = time.perf_counter()
+  for i in range(numRounds):
+    appObj.velocity(u, t0)
+  endTime = time.perf_counter()
+  return (endTime-startTime)/numRounds
+
+
+def main(meshSizes, kernelNames, numRounds):
+  np.set_printoptions(linewidth=400)
+  t0 = 0.0
+
+  print("{0:>8} {1:>10} {2:>16} {3:>10} {4:>12}".format(
+    "mesh", "kernel", "time/call (s)", "speedup", "max|df|"))
+
+  for meshSize in meshSizes:
+    # use a non-trivial state so that all terms of the velocity matter
+    xGrid = np.linspace(0., 1., meshSize)
+    u = 1. + 0.5*np.sin(2.*np.pi*xGrid)
+
+    # reference values from the serial kernel
+    refApp = Burgers1dBandedJacobian(meshSize, 'serial')
+    fRef = refApp.velocity(u, t0).copy()
+    scale = refApp.dxInvHalf_*np.max([refApp.mu_[0]**2, np.max(u**2)]) \
+            + np.max(np.abs(refApp.expVec_))
+    refTime = timeKernel(refApp, u, t0, numRounds)
+
+    for name in kernelNames:
+      if name == 'serial':
+        appObj, elapsed = refApp, refTime
+      else:
+        appObj = Burgers1dBandedJacobian(meshSize, name)
+        elapsed = timeKernel(appObj, u, t0, numRounds)
+
+      maxDiff = np.max(np.abs(appObj.velocity(u, t0) - fRef))
+      if maxDiff > velocityKernelsRelTol*scale:
+        print("WARNING: kernel {} exceeds tolerance at mesh {}".format(name, meshSize))
+
+      print("{0:>8} {1:>10} {2:16.10f} {3:10.3f} {4:12.3e}".format(
+        meshSize, name, elapsed, refTime/elapsed, maxDiff))
+
+
+if __name__== "__main__":
+  parser = ArgumentParser()
+  parser.add_argument("-mesh-sizes", "--mesh-sizes", dest="meshSizes", type=int, nargs='+',
+                      default=[1024, 2048, 4096, 8192, 16384, 32768])
+  parser.add_argument("-kernels", "--kernels", dest="kernelNames", nargs='+',
+                      default=['serial', 'parallel', 'fastmath'],
+                      choices=list(velocityKernels.keys()))
+  parser.add_argument("-num-rounds", "--num-rounds", dest="numRounds", type=int, default=5000)
+  args = parser.parse_args()
+  main(args.meshSizes, args.kernelNames, args.numRounds)
@@ -0,0 +1,56 @@
+
+import numpy as np
+
+#-------------------------------------------------------------------------
+# precision modes of the native ROM drivers, as (fomDtype, romDtype):
+#   fomDtype : app kernels (velocity, jacobian), basis, fom state, the
+#              reconstruction and the projections, R and A for LSPG
+#   romDtype : generalized coordinates, time integration and, for LSPG,
+#              the least-squares problem: normal equations A^T A, A^T R
+#              (from an upcast copy of A and R), factorization and solve
+# 'float32' halves the memory traffic of the basis and the fom sized
+# buffers, 'mixed' keeps that but accumulates the reduced state and solves
+# in float64, which keeps the error at the level of the float32 rounding
+# of the rhs instead of letting it add up over the steps.
+#-------------------------------------------------------------------------
+precisionModes = {'float64': (np.float64, np.float64),
+                  'float32': (np.float32, np.float32),
+                  'mixed'  : (np.float32, np.float64)}
+
+
+def dtypes(precision):
+  if precision not in precisionModes:
+    raise ValueError('Unknown precision {}, choose from {}'.format(
+      precision, list(precisionModes)))
+  return precisionModes[precision]
+
+
+# Gauss-Newton stops when the correction is below tolerance, which with a
+# float32 residual cannot go much below the rounding of the state (eps
+# times its norm, O(10) for the Burgers runs): for the float32 based modes
+# the tolerance is raised to 100 eps, otherwise every step runs maxIt
+# iterations without getting any more accurate.
+def gaussNewtonTolerance(precision, tol=1e-13):
+  fomDtype = dtypes(precision)[0]
+  return max(tol, 100.*np.finfo(fomDtype).eps)
+
+
+# relative errors of yRom against the generalized coordinates of the
+# float64 run in refFileName (e.g. a previous final_generalized_coords.txt)
+def accuracyReport(yRom, refFileName):
+  yRef = np.loadtxt(refFileName)
+  if yRef.shape != yRom.shape:
+    raise Exception('{} has shape {}, the generalized coords {}'.format(
+      refFileName, yRef.shape, yRom.shape))
+  err = np.asarray(yRom, dtype=np.float64) - yRef
+  refNorm = np.linalg.norm(yRef)
+  refMax = np.max(np.abs(yRef))
+  return {'maxAbsError': np.max(np.abs(err)),
+          'relMaxError': np.max(np.abs(err)) / refMax if refMax > 0. else np.nan,
+          'relL2Error' : np.linalg.norm(err) / refNorm if refNorm > 0. else np.nan}
+
+
+def printAccuracyReport(report, precision):
+  print("Accuracy of {} against the float64 reference:".format(precision))
+  for key in ['maxAbsError', 'relMaxError', 'relL2Error']:
+    print("  {0:12s} {1:.6e}".format(key, report[key]))
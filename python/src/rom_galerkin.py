@@ -0,0 +1,206 @@
+
+import numpy as np
+import os
+from scipy.linalg import blas
+
+#-------------------------------------------------------------------------
+# explicit RK4 Galerkin ROM done natively (no pressio4py):
+#   yFom = yRef + phi*yRom
+#   d(yRom)/dt = phi^T f(yFom, t)
+# phi is stored once column-major: with that layout phi*yRom (trans=0) is
+# a sequence of contiguous axpys and phi^T f (trans=1) a sequence of
+# contiguous dot products, so phi^T never needs to be formed explicitly.
+# All work buffers are allocated once at construction.
+#
+# For hyper-reduction, appObj is a sample mesh app, yRef and phi hold only
+# the stencil mesh rows, and projector (romSize x numSamples) replaces phi^T.
+#
+# Precision: the fom side (basis, fom state, app velocity, projection) is
+# in the dtype of phi, the generalized coordinates and RK stages in
+# romDtype. float32 phi with the default float64 romDtype is the mixed
+# mode: half the basis memory traffic, time integration still in float64.
+#
+# numParams is for GalerkinRK4BatchStepper: the states and stages get one
+# column per parameter instance.
+#-------------------------------------------------------------------------
+
+class GalerkinRK4Stepper:
+  def __init__(self, appObj, yRef, phi, projector=None, romDtype=np.float64, numParams=None):
+    self.appObj_ = appObj
+    self.yRef_   = yRef
+    self.phi_    = np.asfortranarray(phi)
+    dtype = self.phi_.dtype
+    self.projector_ = None if projector is None else np.asfortranarray(projector, dtype=dtype)
+    self.gemv_   = blas.get_blas_funcs('gemv', dtype=dtype)
+    fomSize, romSize = self.phi_.shape
+    shape = lambda n: n if numParams is None else (n, numParams)
+    self.yFom_   = np.zeros(shape(fomSize), order='F', dtype=dtype)
+    # projection buffer if the rhs is in another dtype
+    self.rhsWork_ = None if dtype == romDtype else np.zeros(shape(romSize), order='F', dtype=dtype)
+    self.yTmp_   = np.zeros(shape(romSize), order='F', dtype=romDtype)
+    self.k1_     = np.zeros(shape(romSize), order='F', dtype=romDtype)
+    self.k2_     = np.zeros(shape(romSize), order='F', dtype=romDtype)
+    self.k3_     = np.zeros(shape(romSize), order='F', dtype=romDtype)
+    self.k4_     = np.zeros(shape(romSize), order='F', dtype=romDtype)
+
+  # yFom = yRef + phi*yRom
+  def reconstructFomState(self, yRom):
+    self.yFom_[:] = self.yRef_
+    self.gemv_(1., self.phi_, yRom, 1., self.yFom_, overwrite_y=1)
+    return self.yFom_
+
+  # rhs = phi^T f (or projector*f)
+  def project(self, f, rhs):
+    out = rhs if self.rhsWork_ is None else self.rhsWork_
+    if self.projector_ is None:
+      self.gemv_(1., self.phi_, f, 0., out, trans=1, overwrite_y=1)
+    else:
+      self.gemv_(1., self.projector_, f, 0., out, overwrite_y=1)
+    if self.rhsWork_ is not None:
+      rhs[:] = out
+
+  # rhs = phi^T f(yRef + phi*yRom, t)
+  def computeRhs(self, yRom, t, rhs):
+    yFom = self.reconstructFomState(yRom)
+    f = self.appObj_.velocity(yFom, t)
+    self.project(f, rhs)
+
+  def doStep(self, yRom, t, dt):
+    dtHalf = 0.5*dt
+    yTmp, k1, k2, k3, k4 = self.yTmp_, self.k1_, self.k2_, self.k3_, self.k4_
+
+    self.computeRhs(yRom, t, k1)
+    np.multiply(k1, dtHalf, out=yTmp)
+    yTmp += yRom
+    self.computeRhs(yTmp, t+dtHalf, k2)
+    np.multiply(k2, dtHalf, out=yTmp)
+    yTmp += yRom
+    self.computeRhs(yTmp, t+dtHalf, k3)
+    np.multiply(k3, dt, out=yTmp)
+    yTmp += yRom
+    self.computeRhs(yTmp, t+dt, k4)
+
+    # yRom += dt/6 * (k1 + 2 k2 + 2 k3 + k4)
+    k2 += k3
+    k2 *= 2.
+    k1 += k2
+    k1 += k4
+    k1 *= dt/6.
+    yRom += k1
+
+
+#-------------------------------------------------------------------------
+# same RK4 Galerkin for a batch of parameter instances (appObj is a
+# burgers1d.Burgers1dBatch): yRom is (romSize x nParams), one column per
+# instance, so the reconstruction phi*yRom and the projection phi^T f are
+# one dgemm each for the whole batch instead of one dgemv per instance.
+# doStep/computeRhs are inherited, they work the same on the 2d stacks.
+#-------------------------------------------------------------------------
+class GalerkinRK4BatchStepper(GalerkinRK4Stepper):
+  def __init__(self, appObj, yRef, phi, numParams):
+    super().__init__(appObj, yRef.reshape(-1, 1), phi, numParams=numParams)
+
+  # yFom = yRef + phi*yRom
+  def reconstructFomState(self, yRom):
+    self.yFom_[:] = self.yRef_
+    blas.dgemm(1., self.phi_, yRom, 1., self.yFom_, overwrite_c=1)
+    return self.yFom_
+
+  # rhs = phi^T f
+  def project(self, f, rhs):
+    blas.dgemm(1., self.phi_, f, 0., rhs, trans_a=1, overwrite_c=1)
+
+
+#-------------------------------------------------------------------------
+# reduced operators of the Burgers1d finite volume velocity
+# (burgers1d.Burgers1dDenseJacobian and the other full mesh apps):
+#   f(u) = dxInvHalf * D(u.u) + expVec + dxInvHalf*mu0^2 e_0
+# with (Dv)_i = v_{i-1} - v_i, v_{-1} = 0. Since f is quadratic in u,
+# plugging u = yRef + phi*a in and projecting gives exactly
+#   phi^T f = c + L a + Q(a, a)
+#   c           = cRef + phi^T expVec + mu0^2 inflow
+#   cRef        = dxInvHalf phi^T D(yRef.yRef),  inflow = dxInvHalf phi[0,:]
+#   L           = 2 dxInvHalf phi^T D diag(yRef) phi
+#   Q[r, p, q]  = dxInvHalf sum_i (D^T phi)[i, r] phi[i, p] phi[i, q]
+# Building them costs O(Ncell k^3) once, after which each rhs is O(k^3)
+# independent of Ncell. cRef, inflow, L and Q only depend on the mesh,
+# yRef and the basis and are cached to disk, c is formed for the app's mu.
+#-------------------------------------------------------------------------
+
+# v -> D^T v, (D^T v)_i = v_{i+1} - v_i, v_N = 0, for each column
+def applyDiffTranspose(v):
+  w = -v
+  w[:-1] += v[1:]
+  return w
+
+def buildQuadraticOperators(dxInvHalf, yRef, phi):
+  phi = np.asfortranarray(phi)
+  romSize = phi.shape[1]
+  W = dxInvHalf * applyDiffTranspose(phi)
+  cRef = W.T @ (yRef*yRef)
+  inflow = dxInvHalf * np.array(phi[0, :])
+  L = 2. * (W.T @ (yRef[:, np.newaxis] * phi))
+  # Q[:, :, q] = W^T diag(phi[:, q]) phi, one column slab at a time so
+  # the temporaries stay Ncell x k
+  Q = np.zeros((romSize, romSize, romSize), order='F')
+  for q in range(romSize):
+    Q[:, :, q] = W.T @ (phi[:, q:q+1] * phi)
+  return cRef, inflow, L, Q
+
+
+# cache file of a (mesh, yRef, basis): the key hashes the actual values
+def quadraticOperatorsCacheFile(cacheDir, yRef, phi):
+  import hashlib
+  h = hashlib.sha1()
+  h.update(np.ascontiguousarray(yRef).tobytes())
+  h.update(np.asfortranarray(phi).tobytes(order='F'))
+  return os.path.join(cacheDir, "galerkin_quadratic_ops_{}_{}_{}.npz".format(
+    phi.shape[0], phi.shape[1], h.hexdigest()[:16]))
+
+# returns (c, L, Q) for appObj, building the operators or loading them
+# from cacheDir (None disables the cache)
+def reducedOperators(appObj, yRef, phi, cacheDir="."):
+  fileName = None if cacheDir is None else quadraticOperatorsCacheFile(cacheDir, yRef, phi)
+  if fileName is not None and os.path.isfile(fileName):
+    ops = np.load(fileName)
+    cRef, inflow, L, Q = ops['cRef'], ops['inflow'], ops['L'], ops['Q']
+  else:
+    cRef, inflow, L, Q = buildQuadraticOperators(appObj.dxInvHalf_, yRef, phi)
+    if fileName is not None:
+      np.savez(fileName, cRef=cRef, inflow=inflow, L=L, Q=Q)
+  mu0 = appObj.mu_[0]
+  c = cRef + np.asfortranarray(phi).T @ appObj.expVec_ + mu0*mu0*inflow
+  return c, L, Q
+
+
+#-------------------------------------------------------------------------
+# RK4 Galerkin on the reduced operators only: the rhs is
+#   c + L a + Qmat (a kron a),  Qmat = Q reshaped (k x k^2)
+# i.e. two dgemvs, no fom state at all. doStep is inherited.
+#-------------------------------------------------------------------------
+class GalerkinRK4ReducedStepper(GalerkinRK4Stepper):
+  def __init__(self, c, L, Q):
+    romSize = len(c)
+    self.c_    = np.array(c)
+    self.L_    = np.asfortranarray(L)
+    self.Qmat_ = np.asfortranarray(Q).reshape((romSize, romSize*romSize), order='F')
+    self.aa_   = np.zeros((romSize, romSize), order='F')
+    self.yTmp_ = np.zeros(romSize)
+    self.k1_   = np.zeros(romSize)
+    self.k2_   = np.zeros(romSize)
+    self.k3_   = np.zeros(romSize)
+    self.k4_   = np.zeros(romSize)
+
+  def computeRhs(self, yRom, t, rhs):
+    # aa[p, q] = a_p a_q, raveled column-major it is a kron a
+    np.outer(yRom, yRom, out=self.aa_)
+    rhs[:] = self.c_
+    blas.dgemv(1., self.L_, yRom, 1., rhs, overwrite_y=1)
+    blas.dgemv(1., self.Qmat_, self.aa_.reshape(-1, order='F'), 1., rhs, overwrite_y=1)
+
+
+def integrateNStepsRK4(stepper, yRom, t0, dt, nsteps):
+  t = t0
+  for step in range(nsteps):
+    stepper.doStep(yRom, t, dt)
+    t = t0 + (step+1)*dt
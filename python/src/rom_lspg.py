@@ -0,0 +1,355 @@
+
+import numpy as np
+from scipy.linalg import blas, lapack
+
+#-------------------------------------------------------------------------
+# implicit Euler LSPG ROM done natively (no pressio4py):
+#   yFom = yRef + phi*yRom
+#   R(yRom) = phi*(yRom - yRomPrev) - dt*f(yFom, t)
+#   A(yRom) = dR/dyRom = phi - dt*J(yFom)*phi
+# and at each step we solve min ||R(yRom)|| with Gauss-Newton.
+# All work buffers are allocated once at construction.
+#
+# For hyper-reduction, appObj is a sample mesh app, yRef and phi hold only
+# the stencil mesh rows, and sampleRows are the positions of the sample
+# cells within the stencil mesh: the residual is then only formed (and
+# minimized) at the sample cells.
+#
+# Precision: the fom side (basis, fom state, app kernels, R and A) is in
+# the dtype of phi, the generalized coordinates in romDtype, see also the
+# solveDtype of the linear solvers (precision.py for the named modes).
+#
+# numParams is for LspgEulerBatchStepper: states and residuals get one
+# column, J*phi and A one slab, per parameter instance.
+#-------------------------------------------------------------------------
+
+class LspgEulerStepper:
+  def __init__(self, appObj, yRef, phi, sampleRows=None, romDtype=np.float64,
+               numParams=None):
+    self.appObj_   = appObj
+    self.yRef_     = yRef
+    self.phi_      = np.asfortranarray(phi)
+    dtype = self.phi_.dtype
+    self.gemv_     = blas.get_blas_funcs('gemv', dtype=dtype)
+    fomSize, romSize = self.phi_.shape
+    # rows of phi where the residual lives
+    self.phiRes_   = self.phi_ if sampleRows is None \
+                     else np.asfortranarray(self.phi_[sampleRows, :])
+    resSize = self.phiRes_.shape[0]
+    shape = lambda *n: n if numParams is None else n + (numParams,)
+    self.yRomPrev_ = np.zeros(shape(romSize), order='F', dtype=romDtype)
+    self.dyRom_    = np.zeros(shape(romSize), order='F', dtype=romDtype)
+    self.yFom_     = np.zeros(shape(fomSize), order='F', dtype=dtype)
+    self.f_        = np.zeros(shape(resSize), order='F', dtype=dtype)
+    self.JB_       = np.zeros(shape(resSize, romSize), order='F', dtype=dtype)
+    self.R_        = np.zeros(shape(resSize), order='F', dtype=dtype)
+    self.A_        = np.zeros(shape(resSize, romSize), order='F', dtype=dtype)
+
+  def residualSize(self): return self.phiRes_.shape[0]
+  def romSize(self): return self.phi_.shape[1]
+
+  # to call before each step, stores the state at the start of the step
+  def setPreviousState(self, yRom):
+    self.yRomPrev_[:] = yRom
+
+  def reconstructFomState(self, yRom):
+    self.yFom_[:] = self.yRef_
+    self.gemv_(1., self.phi_, yRom, 1., self.yFom_, overwrite_y=1)
+    return self.yFom_
+
+  # computes residual and its jacobian wrt yRom at (yRom, t) into R_, A_
+  def residualAndJacobian(self, yRom, t, dt):
+    yFom = self.reconstructFomState(yRom)
+    self.appObj_.velocityAndApplyJacobian(yFom, self.phi_, t, self.f_, self.JB_)
+
+    # R = phi*(yRom - yRomPrev) - dt*f
+    np.subtract(yRom, self.yRomPrev_, out=self.dyRom_)
+    np.multiply(self.f_, -dt, out=self.R_)
+    self.gemv_(1., self.phiRes_, self.dyRom_, 1., self.R_, overwrite_y=1)
+
+    # A = phi - dt*J*phi
+    np.multiply(self.JB_, -dt, out=self.A_)
+    self.A_ += self.phiRes_
+    return self.R_, self.A_
+
+  # residual only into R_, for iterations that reuse a previous jacobian
+  def residual(self, yRom, t, dt):
+    yFom = self.reconstructFomState(yRom)
+    np.subtract(yRom, self.yRomPrev_, out=self.dyRom_)
+    np.multiply(self.appObj_.velocity(yFom, t), -dt, out=self.R_)
+    self.gemv_(1., self.phiRes_, self.dyRom_, 1., self.R_, overwrite_y=1)
+    return self.R_
+
+  # jacobian only into A_, at the yRom of the last residual call (whose
+  # fom state it reuses), for when the residual turns out to need a new A.
+  # J*phi comes from the same fused app kernel as in residualAndJacobian,
+  # which never forms J (the dense app's applyJacobian would); its f goes
+  # to f_, O(N) next to the O(N k) of J*phi, and R_ is left as it is.
+  def jacobian(self, yRom, t, dt):
+    self.appObj_.velocityAndApplyJacobian(self.yFom_, self.phi_, t, self.f_, self.JB_)
+    np.multiply(self.JB_, -dt, out=self.A_)
+    self.A_ += self.phiRes_
+    return self.A_
+
+
+#-------------------------------------------------------------------------
+# same LSPG for a batch of parameter instances (appObj is a
+# burgers1d.Burgers1dBatch, full mesh only): yRom is (romSize x nParams),
+# R is (N x nParams) and A is (N x romSize x nParams), all column-major.
+# The reconstruction and phi*(yRom - yRomPrev) are one dgemm each and f,
+# J*phi one kernel call for the whole batch; the small least-squares
+# problems stay one per instance (see GaussNewtonBatch).
+#-------------------------------------------------------------------------
+class LspgEulerBatchStepper(LspgEulerStepper):
+  def __init__(self, appObj, yRef, phi, numParams):
+    super().__init__(appObj, yRef.reshape(-1, 1), phi, numParams=numParams)
+
+  def reconstructFomState(self, yRom):
+    self.yFom_[:] = self.yRef_
+    blas.dgemm(1., self.phi_, yRom, 1., self.yFom_, overwrite_c=1)
+    return self.yFom_
+
+  def residualAndJacobian(self, yRom, t, dt):
+    yFom = self.reconstructFomState(yRom)
+    self.appObj_.velocityAndApplyJacobian(yFom, self.phi_, t, self.f_, self.JB_)
+
+    # R = phi*(yRom - yRomPrev) - dt*f
+    np.subtract(yRom, self.yRomPrev_, out=self.dyRom_)
+    np.multiply(self.f_, -dt, out=self.R_)
+    blas.dgemm(1., self.phi_, self.dyRom_, 1., self.R_, overwrite_c=1)
+
+    # A = phi - dt*J*phi
+    np.multiply(self.JB_, -dt, out=self.A_)
+    self.A_ += self.phi_[:, :, np.newaxis]
+    return self.R_, self.A_
+
+
+#-------------------------------------------------------------------------
+# linear least-squares solvers for min ||A dy + R||
+#-------------------------------------------------------------------------
+
+# The solvers split factor(A) from solveFactored(R, dy), so that a frozen
+# jacobian is factored once and reused for several residuals (see
+# GaussNewton); solve(A, R, dy) does both. A must not be modified between
+# factor and the solveFactored calls.
+#
+# A and R are in dtype, the least-squares problem is formed (normal
+# equations) and solved in solveDtype (default dtype): the s or d routines
+# are picked from that, and A and R are cast once per factor/solve where
+# the two differ.
+
+# normal equations: (A^T A) dy = -A^T R, A^T A is symmetric positive
+# definite so we form only its upper triangle with syrk and use Cholesky
+class NormalEqCholeskySolver:
+  def __init__(self, residualSize, romSize, dtype=np.float64, solveDtype=None):
+    solveDtype = dtype if solveDtype is None else solveDtype
+    self.syrk_, self.gemv_ = blas.get_blas_funcs(('syrk', 'gemv'), dtype=solveDtype)
+    self.potrf_, self.potrs_ = lapack.get_lapack_funcs(('potrf', 'potrs'), dtype=solveDtype)
+    self.H_ = np.zeros((romSize, romSize), order='F', dtype=solveDtype)
+    self.g_ = np.zeros(romSize, dtype=solveDtype)
+    # copies of A and R in solveDtype, if it differs, so that A^T A and
+    # A^T R are accumulated in solveDtype
+    mixed = np.dtype(solveDtype) != np.dtype(dtype)
+    self.As_ = np.zeros((residualSize, romSize), order='F', dtype=solveDtype) if mixed else None
+    self.Rs_ = np.zeros(residualSize, dtype=solveDtype) if mixed else None
+    self.A_ = None
+    self.cholH_ = None
+
+  def factor(self, A):
+    if self.As_ is not None:
+      self.As_[:] = A
+      A = self.As_
+    self.syrk_(1., A, 0., self.H_, trans=1, lower=0, overwrite_c=1)
+    self.cholH_, info = self.potrf_(self.H_, lower=0, clean=0, overwrite_a=1)
+    if info != 0:
+      raise RuntimeError('{}potrf failed with info = {}'.format(self.potrf_.typecode, info))
+    self.A_ = A
+
+  def solveFactored(self, R, dy):
+    if self.Rs_ is not None:
+      self.Rs_[:] = R
+      R = self.Rs_
+    self.gemv_(-1., self.A_, R, 0., self.g_, trans=1, overwrite_y=1)
+    dy[:], info = self.potrs_(self.cholH_, self.g_, lower=0, overwrite_b=1)
+
+  def solve(self, A, R, dy):
+    self.factor(A)
+    self.solveFactored(R, dy)
+
+
+# QR of A: dy = -R11^{-1} (Q^T R)[:romSize], avoids squaring the condition
+# number at the cost of a more expensive factorization; A is overwritten
+# (unless it is copied to solveDtype first)
+class QRSolver:
+  def __init__(self, residualSize, romSize, dtype=np.float64, solveDtype=None):
+    solveDtype = dtype if solveDtype is None else solveDtype
+    self.geqrf_, self.geqrfLwork_, self.ormqr_, self.trtrs_ = lapack.get_lapack_funcs(
+      ('geqrf', 'geqrf_lwork', 'ormqr', 'trtrs'), dtype=solveDtype)
+    self.romSize_ = romSize
+    self.QtR_ = np.zeros(residualSize, dtype=solveDtype)
+    self.As_ = None if np.dtype(solveDtype) == np.dtype(dtype) \
+               else np.zeros((residualSize, romSize), order='F', dtype=solveDtype)
+    work, info = self.geqrfLwork_(residualSize, romSize)
+    self.lworkQR_ = int(work)
+    self.lworkQtR_ = max(1, romSize)*64
+    self.qr_, self.tau_ = None, None
+
+  def factor(self, A):
+    if self.As_ is not None:
+      self.As_[:] = A
+      A = self.As_
+    self.qr_, self.tau_, work, info = self.geqrf_(A, lwork=self.lworkQR_, overwrite_a=1)
+    if info != 0:
+      raise RuntimeError('{}geqrf failed with info = {}'.format(self.geqrf_.typecode, info))
+
+  def solveFactored(self, R, dy):
+    k = self.romSize_
+    self.QtR_[:] = R
+    QtR, work, info = self.ormqr_('L', 'T', self.qr_, self.tau_, self.QtR_, self.lworkQtR_,
+                                  overwrite_c=1)
+    x, info = self.trtrs_(self.qr_, QtR[:k], lower=0)
+    if info != 0:
+      raise RuntimeError('{}trtrs failed with info = {}'.format(self.trtrs_.typecode, info))
+    np.negative(x, out=dy)
+
+  def solve(self, A, R, dy):
+    self.factor(A)
+    self.solveFactored(R, dy)
+
+
+linearSolvers = {'cholesky': NormalEqCholeskySolver,
+                 'qr'      : QRSolver}
+
+
+#-------------------------------------------------------------------------
+# Gauss-Newton: exits when the norm of the correction is below tolerance
+# (same criterion as the C++ runs) or after maxIt iterations.
+#
+# jacobianPolicy says when A = phi - dt*J*phi is recomputed and refactored,
+# in between only the residual is evaluated and the stored factorization
+# of the frozen A is reused:
+#   'always'     : every iteration (plain Gauss-Newton, default)
+#   'every'      : every jacobianPeriod iterations, counted across steps
+#   'step'       : at the first iteration of each step
+#   'stagnation' : when ||R|| did not drop below stagnationRatio times its
+#                  value at the previous iteration of the step
+# A is always recomputed if dt changed since it was factored.
+# Since the LSPG residual is not zero at the minimum, iterations with a
+# frozen A0 converge to where A0^T R = 0 rather than A^T R = 0: the result
+# differs from plain Gauss-Newton by O(|A - A0| |R|), i.e. more the longer
+# A is kept ('step' more than 'every', 'stagnation' the least).
+# stats_ counts iterations, residual and jacobian evaluations (the fused
+# residualAndJacobian counts once for each) and factorizations.
+# With 'stagnation' the residual of every iteration is evaluated alone,
+# and when it did not drop enough only the jacobian is added at that point.
+# The linear solver works in the dtype of the stepper's basis and solves in
+# that of its generalized coordinates.
+#-------------------------------------------------------------------------
+jacobianPolicies = ['always', 'every', 'step', 'stagnation']
+
+class GaussNewton:
+  def __init__(self, stepper, linSolverName='cholesky', jacobianPolicy='always',
+               jacobianPeriod=1, stagnationRatio=0.5):
+    if jacobianPolicy not in jacobianPolicies:
+      raise ValueError('Unknown jacobian policy {}'.format(jacobianPolicy))
+    self.stepper_  = stepper
+    romDtype = stepper.yRomPrev_.dtype
+    self.linSolver_= linearSolvers[linSolverName](stepper.residualSize(), stepper.romSize(),
+                                                  stepper.phi_.dtype, romDtype)
+    self.nrm2_     = blas.get_blas_funcs('nrm2', dtype=stepper.phi_.dtype)
+    self.dy_       = np.zeros(stepper.romSize(), dtype=romDtype)
+    self.maxIt_    = 20
+    self.tol_      = 1e-13
+    self.jacobianPolicy_  = jacobianPolicy
+    self.jacobianPeriod_  = jacobianPeriod
+    self.stagnationRatio_ = stagnationRatio
+    # dt of the stored factorization (None: nothing stored) and number of
+    # iterations it has been used for
+    self.dtFactored_  = None
+    self.jacobianAge_ = 0
+    self.resetStats()
+
+  def setMaxIterations(self, maxIt): self.maxIt_ = maxIt
+  def setTolerance(self, tol): self.tol_ = tol
+
+  def resetStats(self):
+    self.stats_ = {'iterations': 0, 'residualEvaluations': 0, 'jacobianEvaluations': 0,
+                   'factorizations': 0}
+
+  def canReuseJacobian(self, it, dt):
+    if self.dtFactored_ != dt or self.jacobianPolicy_ == 'always':
+      return False
+    if self.jacobianPolicy_ == 'every':
+      return self.jacobianAge_ < self.jacobianPeriod_
+    if self.jacobianPolicy_ == 'step':
+      return it > 0
+    return True
+
+  def factorJacobian(self, A, dt):
+    self.linSolver_.factor(A)
+    self.dtFactored_, self.jacobianAge_ = dt, 0
+    self.stats_['jacobianEvaluations'] += 1
+    self.stats_['factorizations'] += 1
+
+  def solve(self, yRom, t, dt):
+    resNormPrev = None
+    for it in range(self.maxIt_):
+      self.stats_['iterations'] += 1
+      self.stats_['residualEvaluations'] += 1
+      if self.canReuseJacobian(it, dt):
+        R = self.stepper_.residual(yRom, t, dt)
+        if self.jacobianPolicy_ == 'stagnation':
+          resNorm = self.nrm2_(R)
+          if resNormPrev is not None and resNorm > self.stagnationRatio_*resNormPrev:
+            self.factorJacobian(self.stepper_.jacobian(yRom, t, dt), dt)
+          resNormPrev = resNorm
+      else:
+        R, A = self.stepper_.residualAndJacobian(yRom, t, dt)
+        self.factorJacobian(A, dt)
+        if self.jacobianPolicy_ == 'stagnation':
+          resNormPrev = self.nrm2_(R)
+      self.linSolver_.solveFactored(R, self.dy_)
+      self.jacobianAge_ += 1
+      yRom += self.dy_
+      if blas.dnrm2(self.dy_) < self.tol_:
+        break
+
+
+# Gauss-Newton for LspgEulerBatchStepper: each instance keeps iterating
+# until its own correction is below tolerance, so every instance does the
+# same iterations as it would alone. The residual and jacobian are always
+# evaluated for the whole batch (one kernel call), but only the instances
+# not yet converged are solved for and updated. Hence only the 'always'
+# jacobian policy; stats_ counts the batch iterations and evaluations and
+# the factorizations of each instance.
+class GaussNewtonBatch(GaussNewton):
+  def __init__(self, stepper, linSolverName='cholesky', jacobianPolicy='always',
+               jacobianPeriod=1, stagnationRatio=0.5):
+    if jacobianPolicy != 'always':
+      raise ValueError('GaussNewtonBatch only supports the always jacobian policy, not {}'
+                       .format(jacobianPolicy))
+    super().__init__(stepper, linSolverName, jacobianPolicy, jacobianPeriod, stagnationRatio)
+
+  def solve(self, yRom, t, dt):
+    active = np.ones(yRom.shape[1], dtype=bool)
+    for it in range(self.maxIt_):
+      self.stats_['iterations'] += 1
+      R, A = self.stepper_.residualAndJacobian(yRom, t, dt)
+      self.stats_['residualEvaluations'] += 1
+      self.stats_['jacobianEvaluations'] += 1
+      for p in np.nonzero(active)[0]:
+        self.linSolver_.solve(A[:, :, p], R[:, p], self.dy_)
+        self.stats_['factorizations'] += 1
+        yRom[:, p] += self.dy_
+        if blas.dnrm2(self.dy_) < self.tol_:
+          active[p] = False
+      if not active.any():
+        break
+
+
+def integrateNSteps(stepper, yRom, t0, dt, nsteps, solver):
+  for step in range(nsteps):
+    stepper.setPreviousState(yRom)
+    # implicit: residual is evaluated at the end of the step
+    t = t0 + (step+1)*dt
+    solver.solve(yRom, t, dt)
@@ -0,0 +1,34 @@
+import os, sys
+import numpy as np
+import pytest
+
+# the python sources are flat modules run from python/src (or copied next
+# to each other by the run scripts), not a package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+#-------------------------------------------------------------------------
+# small Burgers1d problem shared by the tests: the basis is the POD of a
+# short FOM RK4 run, snapshots are x - xRef with xRef = ones as in the
+# drivers, and the ROMs start from yRom = 0 (i.e. the same xRef)
+#-------------------------------------------------------------------------
+meshSize = 256
+romSize  = 8
+
+@pytest.fixture(scope="session")
+def fomRun():
+  from burgers1d import Burgers1dBandedJacobian
+  from fom import FomRK4Stepper, SnapshotObserver, integrateNSteps
+  appObj = Burgers1dBandedJacobian(meshSize)
+  x = np.ones(meshSize)
+  obs = SnapshotObserver(400, x, 10)
+  integrateNSteps(FomRK4Stepper(appObj, meshSize), x, 0., 0.01, 400, [obs])
+  return obs.viewSnapshots()
+
+@pytest.fixture(scope="session")
+def basis(fomRun):
+  U, s, Vt = np.linalg.svd(fomRun, full_matrices=False)
+  return np.asfortranarray(U[:, :romSize])
+
+@pytest.fixture
+def yRef():
+  return np.ones(meshSize)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from burgers1d import Burgers1dBandedJacobian
+from rom_galerkin import GalerkinRK4Stepper, integrateNStepsRK4
+import fom
+from adaptive_stepping import DormandPrince45Stepper, StepSizeController, StepSizeHistory, \
+  appRhs, integrateAdaptive
+
+#-------------------------------------------------------------------------
+# Dormand-Prince 5(4) at a tight tolerance against fixed step RK4 with a
+# small enough dt that both are well below the compared tolerance
+#-------------------------------------------------------------------------
+
+def test_dormand_prince_galerkin_matches_fixed_step(basis, yRef):
+  appObj = Burgers1dBandedJacobian(basis.shape[0])
+  galerkin = GalerkinRK4Stepper(appObj, yRef, basis)
+  yExp = np.zeros(basis.shape[1])
+  integrateNStepsRK4(galerkin, yExp, 0., 1e-3, 1000)
+
+  yRom = np.zeros(basis.shape[1])
+  history = StepSizeHistory()
+  integrateAdaptive(DormandPrince45Stepper(galerkin.computeRhs, basis.shape[1]),
+                    StepSizeController(rtol=1e-10, atol=1e-12), yRom, 0., 1., 0.01,
+                    history=history)
+  assert np.max(np.abs(yRom - yExp)) <= 1e-9 * np.max(np.abs(yExp))
+  assert history.numAccepted() < 1000
+
+
+def test_dormand_prince_fom_matches_fixed_step():
+  meshSize = 256
+  appObj = Burgers1dBandedJacobian(meshSize)
+  xExp = np.ones(meshSize)
+  fom.integrateNSteps(fom.FomRK4Stepper(appObj, meshSize), xExp, 0., 1e-3, 1000)
+
+  x = np.ones(meshSize)
+  integrateAdaptive(DormandPrince45Stepper(appRhs(appObj), meshSize),
+                    StepSizeController(rtol=1e-10, atol=1e-12), x, 0., 1., 0.01)
+  assert np.max(np.abs(x - xExp)) <= 1e-9 * np.max(np.abs(xExp))
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from burgers1d import Burgers1dBandedJacobian
+from fom import FomBDF1Stepper, FomBDF1JFNKStepper, integrateNSteps
+
+#-------------------------------------------------------------------------
+# BDF1 with Newton-Krylov against BDF1 with the direct (bidiagonal)
+# Newton solve: both iterate until the correction is below tolerance, so
+# they converge to the same implicit Euler solution
+#-------------------------------------------------------------------------
+
+@pytest.mark.parametrize("jvMode, precond, jacobianLag",
+                         [('analytic', 'bidiag', 1),
+                          ('analytic', 'jacobi', 2),
+                          ('fd', 'bidiag', 1),
+                          ('analytic', 'none', 1)])
+def test_jfnk_matches_direct_bdf1(jvMode, precond, jacobianLag):
+  meshSize = 256
+  appObj = Burgers1dBandedJacobian(meshSize)
+  xExp = np.ones(meshSize)
+  integrateNSteps(FomBDF1Stepper(appObj, meshSize), xExp, 0., 0.05, 10)
+
+  x = np.ones(meshSize)
+  stepper = FomBDF1JFNKStepper(appObj, meshSize, jvMode, precond, jacobianLag)
+  integrateNSteps(stepper, x, 0., 0.05, 10)
+  assert np.max(np.abs(x - xExp)) <= 1e-13 * np.max(np.abs(xExp))
+  assert stepper.stats_['jacobianVectorProducts'] > 0
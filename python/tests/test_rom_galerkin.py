@@ -0,0 +1,63 @@
+import numpy as np
+
+from burgers1d import Burgers1dBandedJacobian, Burgers1dSampleMesh
+from rom_galerkin import GalerkinRK4Stepper, GalerkinRK4ReducedStepper, integrateNStepsRK4, \
+  reducedOperators
+
+#-------------------------------------------------------------------------
+# native Galerkin RK4 against a plain numpy RK4 of
+#   d(yRom)/dt = phi^T f(yRef + phi*yRom, t)
+#-------------------------------------------------------------------------
+
+def referenceGalerkinRK4(appObj, yRef, phi, yRom, t0, dt, nsteps):
+  rhs = lambda y, t: phi.T @ appObj.velocity(yRef + phi @ y, t)
+  y = yRom.copy()
+  for step in range(nsteps):
+    t = t0 + step*dt
+    k1 = rhs(y, t)
+    k2 = rhs(y + 0.5*dt*k1, t + 0.5*dt)
+    k3 = rhs(y + 0.5*dt*k2, t + 0.5*dt)
+    k4 = rhs(y + dt*k3, t + dt)
+    y = y + dt/6.*(k1 + 2.*k2 + 2.*k3 + k4)
+  return y
+
+
+def test_galerkin_rk4_matches_reference(basis, yRef):
+  appObj = Burgers1dBandedJacobian(basis.shape[0])
+  yRom = np.zeros(basis.shape[1])
+  integrateNStepsRK4(GalerkinRK4Stepper(appObj, yRef, basis), yRom, 0., 0.01, 20)
+  yExp = referenceGalerkinRK4(appObj, yRef, basis, np.zeros(basis.shape[1]), 0., 0.01, 20)
+  assert np.max(np.abs(yRom - yExp)) <= 1e-12 * np.max(np.abs(yExp))
+
+
+# sampling every cell with projector = phi^T is the full mesh Galerkin
+def test_galerkin_rk4_full_sample_mesh(basis, yRef):
+  meshSize = basis.shape[0]
+  allCells = np.arange(meshSize)
+  appObj = Burgers1dSampleMesh(meshSize, allCells, allCells)
+  yRom = np.zeros(basis.shape[1])
+  stepper = GalerkinRK4Stepper(appObj, yRef, basis, projector=basis.T)
+  integrateNStepsRK4(stepper, yRom, 0., 0.01, 20)
+  yExp = referenceGalerkinRK4(Burgers1dBandedJacobian(meshSize), yRef, basis,
+                              np.zeros(basis.shape[1]), 0., 0.01, 20)
+  assert np.max(np.abs(yRom - yExp)) <= 1e-12 * np.max(np.abs(yExp))
+
+
+#-------------------------------------------------------------------------
+# Galerkin on the reduced operators c + L a + Q(a, a) against the standard
+# stepper: same ROM, only the rhs is evaluated differently
+#-------------------------------------------------------------------------
+
+def test_reduced_operators_match_galerkin(basis, yRef, tmp_path):
+  # c is formed for the app mu, the basis comes from the default one
+  mu = [4.5, 0.025, 0.018]
+  appObj = Burgers1dBandedJacobian(basis.shape[0], mu=mu)
+  yExp = np.zeros(basis.shape[1])
+  integrateNStepsRK4(GalerkinRK4Stepper(appObj, yRef, basis), yExp, 0., 0.01, 20)
+  # second call loads the operators from the cache
+  for it in range(2):
+    yRom = np.zeros(basis.shape[1])
+    c, L, Q = reducedOperators(appObj, yRef, basis, str(tmp_path))
+    integrateNStepsRK4(GalerkinRK4ReducedStepper(c, L, Q), yRom, 0., 0.01, 20)
+    assert np.max(np.abs(yRom - yExp)) <= 1e-13 * np.max(np.abs(yExp))
+  assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from scipy.optimize import least_squares
+
+from burgers1d import Burgers1dBandedJacobian, Burgers1dBatch, defaultMu
+from rom_lspg import LspgEulerStepper, LspgEulerBatchStepper, GaussNewton, GaussNewtonBatch, \
+  integrateNSteps, linearSolvers
+
+#-------------------------------------------------------------------------
+# native LSPG against references on the same implicit Euler residual
+#   R(y) = phi*(y - yPrev) - dt*f(yRef + phi*y, t)
+# one minimization per step:
+# - numpy Gauss-Newton with lstsq: same iteration, independent linear
+#   algebra, agrees to rounding
+# - scipy least_squares: independent minimizer, but its stopping tests
+#   are on the cost, which for a non zero residual stops resolving y at
+#   ~1e-9, hence the looser tolerance
+# and the linear least-squares solvers against numpy lstsq
+#-------------------------------------------------------------------------
+
+def lspgEulerProblem(appObj, yRef, phi, yPrev, t, dt):
+  def residual(y):
+    return phi @ (y - yPrev) - dt*appObj.velocity(yRef + phi @ y, t)
+  def jacobian(y):
+    return phi - dt*appObj.applyJacobian(yRef + phi @ y, phi, t)
+  return residual, jacobian
+
+
+def gaussNewtonLstsq(residual, jacobian, y):
+  for it in range(50):
+    dy = -np.linalg.lstsq(jacobian(y), residual(y), rcond=None)[0]
+    y = y + dy
+    if np.linalg.norm(dy) < 1e-14:
+      break
+  return y
+
+
+def leastSquares(residual, jacobian, y):
+  return least_squares(residual, y, jac=jacobian, method='lm',
+                       xtol=1e-15, ftol=1e-15, gtol=1e-15).x
+
+
+def referenceLspgEuler(minimize, appObj, yRef, phi, yRom, t0, dt, nsteps):
+  y = yRom.copy()
+  for step in range(nsteps):
+    y = minimize(*lspgEulerProblem(appObj, yRef, phi, y.copy(), t0 + (step+1)*dt, dt), y)
+  return y
+
+
+@pytest.mark.parametrize("linSolverName", ['cholesky', 'qr'])
+@pytest.mark.parametrize("minimize, relTol", [(gaussNewtonLstsq, 1e-13),
+                                              (leastSquares, 1e-8)])
+def test_lspg_matches_reference(basis, yRef, linSolverName, minimize, relTol):
+  appObj = Burgers1dBandedJacobian(basis.shape[0])
+  yRom = np.zeros(basis.shape[1])
+  stepper = LspgEulerStepper(appObj, yRef, basis)
+  integrateNSteps(stepper, yRom, 0., 0.05, 10, GaussNewton(stepper, linSolverName))
+  yExp = referenceLspgEuler(minimize, appObj, yRef, basis, np.zeros(basis.shape[1]),
+                            0., 0.05, 10)
+  assert np.max(np.abs(yRom - yExp)) <= relTol * np.max(np.abs(yExp))
+
+
+@pytest.mark.parametrize("linSolverName", ['cholesky', 'qr'])
+def test_linear_solver_matches_lstsq(linSolverName):
+  rng = np.random.default_rng(0)
+  A = np.asfortranarray(rng.standard_normal((200, 8)))
+  R = rng.standard_normal(200)
+  dyExp = -np.linalg.lstsq(A, R, rcond=None)[0]
+  dy = np.zeros(8)
+  # the QR solver overwrites A
+  linearSolvers[linSolverName](200, 8).solve(A.copy(order='F'), R, dy)
+  assert np.max(np.abs(dy - dyExp)) <= 1e-13 * np.max(np.abs(dyExp))
+
+
+# with a reused jacobian every iteration still evaluates exactly one
+# residual, and the result differs from plain Gauss-Newton by O(|A - A0| |R|),
+# the more the longer A0 is kept
+@pytest.mark.parametrize("jacobianPolicy, relTol", [('every', 1e-7),
+                                                    ('step', 2e-2),
+                                                    ('stagnation', 1e-12)])
+def test_jacobian_policy_stats(basis, yRef, jacobianPolicy, relTol):
+  appObj = Burgers1dBandedJacobian(basis.shape[0])
+  yExp = np.zeros(basis.shape[1])
+  stepper = LspgEulerStepper(appObj, yRef, basis)
+  integrateNSteps(stepper, yExp, 0., 0.05, 10, GaussNewton(stepper))
+
+  yRom = np.zeros(basis.shape[1])
+  solver = GaussNewton(stepper, jacobianPolicy=jacobianPolicy, jacobianPeriod=2)
+  integrateNSteps(stepper, yRom, 0., 0.05, 10, solver)
+  stats = solver.stats_
+  assert stats['residualEvaluations'] == stats['iterations']
+  assert 10 <= stats['jacobianEvaluations'] < stats['iterations']
+  assert stats['factorizations'] == stats['jacobianEvaluations']
+  assert np.max(np.abs(yRom - yExp)) <= relTol * np.max(np.abs(yExp))
+
+
+def test_batch_gauss_newton_policy_and_stats(basis, yRef):
+  appObj = Burgers1dBatch(basis.shape[0], [defaultMu, defaultMu])
+  stepper = LspgEulerBatchStepper(appObj, yRef, basis, 2)
+  with pytest.raises(ValueError):
+    GaussNewtonBatch(stepper, jacobianPolicy='step')
+  solver = GaussNewtonBatch(stepper)
+  integrateNSteps(stepper, np.zeros((basis.shape[1], 2), order='F'), 0., 0.05, 2, solver)
+  assert solver.stats_['iterations'] > 0
+  assert solver.stats_['factorizations'] == 2*solver.stats_['jacobianEvaluations']